@@ -4,14 +4,27 @@ TMDL Best Practices Analyzer - Command Line Interface
 Run this script to analyze a Power BI TMDL model from the command line.
 
 Usage:
-    python run_analyzer.py <path_to_semantic_model> [--ai] [--output report.md]
+    python run_analyzer.py <path_to_semantic_model | model.zip | model.tar | -> [--ai] [--output report.md]
+                           [--fail-fast] [--max-violations-per-rule N]
+                           [--rules ID[,ID...]] [--category NAME] [--cache-db PATH]
+
+Exit codes:
+    0  Analysis completed
+    1  Analysis could not be run
+    2  --fail-fast found an ERROR-severity violation
 
 Examples:
     python run_analyzer.py "Sales Dashboard.SemanticModel"
     python run_analyzer.py "Sales Dashboard.SemanticModel" --ai
     python run_analyzer.py "Sales Dashboard.SemanticModel" --output my_report.md
+    python run_analyzer.py "Sales Dashboard.SemanticModel" --fail-fast
+    python run_analyzer.py "Sales Dashboard.SemanticModel" --category Performance
+    python run_analyzer.py "Sales Dashboard.SemanticModel" --cache-db cache/tmdl-cache.db
+    python run_analyzer.py model.zip
+    tar -cf - "Sales Dashboard.SemanticModel" | python run_analyzer.py -
 """
 
+import os
 import sys
 import argparse
 from pathlib import Path
@@ -20,7 +33,9 @@ from pathlib import Path
 src_path = Path(__file__).parent / 'src'
 sys.path.insert(0, str(src_path))
 
-from tmdl_analyzer import TMDLBestPracticesAgent
+from tmdl_analyzer import ParseCache, TMDLBestPracticesAgent, TMDLParser, configure_logging
+from shared_cache import SharedCache
+from model_fs import open_model_fs
 
 # Try to import AI analyzer
 try:
@@ -30,6 +45,17 @@ except ImportError:
     AI_AVAILABLE = False
 
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a whole number")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Analyze Power BI TMDL files against best practices',
@@ -39,12 +65,31 @@ Examples:
   python run_analyzer.py "Sales Dashboard.SemanticModel"
   python run_analyzer.py "Sales Dashboard.SemanticModel" --ai
   python run_analyzer.py "Sales Dashboard.SemanticModel" --output reports/my_report.md
+  python run_analyzer.py "Sales Dashboard.SemanticModel" --fail-fast
+  python run_analyzer.py "Sales Dashboard.SemanticModel" --max-violations-per-rule 10
+  python run_analyzer.py "Sales Dashboard.SemanticModel" --rules AVOID_FLOATING_POINT_DATA_TYPES
+  python run_analyzer.py "Sales Dashboard.SemanticModel" --category Performance --category Formatting
+  python run_analyzer.py "Sales Dashboard.SemanticModel" --cache-db cache/tmdl-cache.db
+  python run_analyzer.py model.zip
+  tar -cf - "Sales Dashboard.SemanticModel" | python run_analyzer.py -
         """
     )
     
-    parser.add_argument('model_path', help='Path to the .SemanticModel folder')
+    parser.add_argument('model_path',
+                        help='Path to the .SemanticModel folder, a .zip/.tar archive of it, or - to read a tar stream from stdin')
     parser.add_argument('--ai', action='store_true', help='Use AI-enhanced analysis (requires OpenAI API key)')
     parser.add_argument('--output', '-o', help='Output report file path (default: reports/analysis_report.md)')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='Stop at the first ERROR-severity violation and exit with code 2 (for CI gating)')
+    parser.add_argument('--max-violations-per-rule', type=positive_int, metavar='N',
+                        help='Stop evaluating a rule after N violations')
+    parser.add_argument('--rules', metavar='ID[,ID...]',
+                        help='Only check these rule IDs (comma-separated)')
+    parser.add_argument('--category', action='append', metavar='NAME',
+                        help='Only check rules in this category (can be repeated)')
+    parser.add_argument('--cache-db', metavar='PATH', default=os.environ.get('SHARED_CACHE_PATH'),
+                        help='SQLite file caching parsed files across runs and with the web interface; '
+                             'only parses are shared, analysis results are not stored (default: $SHARED_CACHE_PATH)')
     
     args = parser.parse_args()
     
@@ -57,52 +102,87 @@ Examples:
         return 1
     
     # Create analyzer
+    configure_logging()
+    
+    # Parsed files are reused from earlier runs (and the web interface) when a cache is given;
+    # results aren't stored, as the web interface keys them by its own upload paths
+    tmdl_parser = None
+    if args.cache_db:
+        tmdl_parser = TMDLParser(parse_cache=ParseCache(shared=SharedCache(args.cache_db)))
+    
     if args.ai:
         if not AI_AVAILABLE:
             print("Error: AI-enhanced analyzer not available.")
             print("Please install required dependencies and configure OpenAI API key.")
             return 1
         print("Using AI-Enhanced Analyzer...")
-        analyzer = AIEnhancedTMDLAnalyzer(rules_file)
+        analyzer = AIEnhancedTMDLAnalyzer(rules_file, parser=tmdl_parser)
     else:
         print("Using Regular Analyzer...")
-        analyzer = TMDLBestPracticesAgent(rules_file)
+        analyzer = TMDLBestPracticesAgent(rules_file, parser=tmdl_parser)
     
-    # Run analysis
-    print(f"Analyzing model: {args.model_path}")
+    # Open the model folder or archive; archive members are read without extracting them
     try:
-        result = analyzer.analyze_model(args.model_path)
+        fs = open_model_fs(args.model_path)
     except Exception as e:
-        print(f"Error analyzing model: {e}")
+        print(f"Error opening model: {e}")
         return 1
     
-    # Print summary
-    print("\n" + "=" * 60)
-    print("Analysis Complete!")
-    print("=" * 60)
-    print(f"Tables: {result['summary']['object_counts']['tables']}")
-    print(f"Measures: {result['summary']['object_counts']['measures']}")
-    print(f"Columns: {result['summary']['object_counts']['columns']}")
-    print(f"Relationships: {result['summary']['object_counts']['relationships']}")
-    print(f"\nTotal Violations: {result['summary']['violations']['total']}")
-    print("\nBy Severity:")
-    for severity, count in result['summary']['violations']['by_severity'].items():
-        print(f"  {severity}: {count}")
-    
-    # Generate report
-    output_path = args.output or str(project_root / 'reports' / 'analysis_report.md')
-    print(f"\nGenerating report: {output_path}")
+    with fs:
+        # Run analysis
+        print(f"Analyzing model: {args.model_path}")
+        try:
+            result = analyzer.analyze_model(
+                '',
+                fail_fast=args.fail_fast,
+                max_violations_per_rule=args.max_violations_per_rule,
+                rule_ids=[rule_id.strip() for rule_id in args.rules.split(',') if rule_id.strip()] if args.rules else None,
+                categories=args.category,
+                fs=fs
+            )
+        except Exception as e:
+            print(f"Error analyzing model: {e}")
+            return 1
+        
+        # Print summary
+        print("\n" + "=" * 60)
+        print("Analysis Complete!")
+        print("=" * 60)
+        object_counts = result['summary']['object_counts']
+        print(f"Tables: {object_counts.get('tables', 'not parsed')}")
+        print(f"Measures: {object_counts.get('measures', 'not parsed')}")
+        print(f"Columns: {object_counts.get('columns', 'not parsed')}")
+        print(f"Relationships: {object_counts.get('relationships', 'not parsed')}")
+        print(f"\nTotal Violations: {result['summary']['violations']['total']}")
+        suppressed = result['summary']['violations'].get('suppressed', {})
+        if suppressed.get('total'):
+            print(f"Suppressed by annotations: {suppressed['total']}")
+        print("\nBy Severity:")
+        for severity, count in result['summary']['violations']['by_severity'].items():
+            print(f"  {severity}: {count}")
+        
+        early_exit = result['summary'].get('early_exit')
+        if early_exit:
+            rules_checked = result['summary']['rules_checked']
+            print(f"\nRules evaluated: {rules_checked['evaluated']} of {rules_checked['total']}")
+            if early_exit['stopped_early']:
+                print("Stopped early: ERROR-severity violation found (--fail-fast)")
+            if early_exit['truncated_rules']:
+                print(f"Truncated rules (--max-violations-per-rule): {', '.join(early_exit['truncated_rules'])}")
+        
+        # Generate report
+        output_path = args.output or str(project_root / 'reports' / 'analysis_report.md')
+        print(f"\nGenerating report: {output_path}")
+        
+        try:
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            analyzer.generate_report(result, output_path)
+            print(f"✅ Report saved to: {output_path}")
+        except Exception as e:
+            print(f"Warning: Could not generate report: {e}")
     
-    try:
-        analyzer.generate_report(
-            result,
-            output_path,
-            include_summary=True,
-            include_objects=True
-        )
-        print(f"✅ Report saved to: {output_path}")
-    except Exception as e:
-        print(f"Warning: Could not generate report: {e}")
+    if args.fail_fast and result['summary']['violations']['by_severity'].get('ERROR'):
+        return 2
     
     return 0
 
@@ -2,8 +2,35 @@
 TMDL Best Practices Analyzer - Web Interface Launcher
 
 Run this script to start the web interface for analyzing Power BI TMDL files.
+
+Usage:
+    python run_web_interface.py                  # Flask development server
+    python run_web_interface.py --threads M      # Production server
+
+The production mode runs on gunicorn (Linux/macOS) when it is installed, otherwise on
+waitress (any platform). Either way it serves from ONE process with --threads threads:
+analysis jobs and their event streams, uploaded files (see /manifest) and rate-limit
+buckets live in that process's memory, and follow-up requests (/jobs/<id>,
+/jobs/<id>/events, the /analyze after /manifest) must reach the process that holds
+them. Analyses still run in parallel, in the sandbox worker processes
+(ANALYSIS_WORKERS, AI_ANALYSIS_WORKERS).
+
+Every open event stream holds one server thread until its analysis ends, so --threads
+must cover the analyses being followed at once plus the other requests.
+
+Restarting the process (gunicorn --max-requests, off by default) drops queued and
+running jobs, uploaded files and finished results. Set SHARED_CACHE_PATH to a SQLite
+file to keep finished results and parsed files across restarts (parsed files are also
+shared with run_analyzer.py --cache-db).
+
+Admission limits (ANALYSIS_WORKERS, AI_ANALYSIS_WORKERS and their queue sizes,
+RATE_LIMIT_PER_MINUTE and RATE_LIMIT_BURST per client IP, MAX_CONTENT_LENGTH) are
+read from the environment. Behind a reverse proxy, set TRUSTED_PROXIES to the number
+of proxies so client IPs come from X-Forwarded-For.
 """
 
+import argparse
+import signal
 import sys
 from pathlib import Path
 
@@ -12,17 +39,156 @@ src_path = Path(__file__).parent / 'src'
 sys.path.insert(0, str(src_path))
 
 # Import and run the web interface
-from web_interface import app
+from web_interface import app, get_sandbox_pool, get_shared_agent, jobs
 
-if __name__ == '__main__':
+# Production servers are optional; the development server needs neither
+try:
+    import gunicorn.app.base
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    GUNICORN_AVAILABLE = False
+
+try:
+    import waitress
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
+
+def banner(host, port, mode):
     print("=" * 60)
     print("TMDL Best Practices Analyzer - Web Interface")
     print("=" * 60)
     print()
-    print("Starting web server...")
-    print("Open your browser and go to: http://localhost:5000")
+    print(f"Starting {mode}...")
+    print(f"Open your browser and go to: http://{'localhost' if host == '0.0.0.0' else host}:{port}")
     print()
     print("Press CTRL+C to stop the server")
     print("=" * 60)
+
+
+def gunicorn_options(args):
+    """Gunicorn settings for the command line options"""
+    def post_worker_init(worker):
+        # Load and compile the rules and start the analysis processes before the first request
+        get_shared_agent()
+        if app.config['ANALYSIS_SANDBOX']:
+            get_sandbox_pool()
+    
+    def worker_exit(server, worker):
+        # Let running analyses finish within the graceful timeout
+        jobs.shutdown(wait=True)
+        if app.config['ANALYSIS_SANDBOX']:
+            get_sandbox_pool().shutdown()
+    
+    return {
+        'bind': f"{args.host}:{args.port}",
+        'workers': 1,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'worker_connections': args.max_connections,
+        'backlog': args.backlog,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': max(1, args.max_requests // 10) if args.max_requests else 0,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit
+    }
+
+
+def run_gunicorn(args):
+    class WebInterfaceApplication(gunicorn.app.base.BaseApplication):
+        """Gunicorn application serving the already imported Flask app"""
+        
+        def load_config(self):
+            for key, value in gunicorn_options(args).items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            return app
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    WebInterfaceApplication().run()
+
+
+def run_waitress(args):
+    get_shared_agent()
+    if app.config['ANALYSIS_SANDBOX']:
+        get_sandbox_pool()
+    
+    server = waitress.create_server(app, host=args.host, port=args.port, threads=args.threads,
+                                    backlog=args.backlog, connection_limit=args.max_connections,
+                                    channel_timeout=args.timeout)
+    
+    # Stop on SIGTERM as on CTRL+C: close the listening socket, then let running analyses finish
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        jobs.shutdown(wait=True)
+        if app.config['ANALYSIS_SANDBOX']:
+            get_sandbox_pool().shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Start the web interface for analyzing Power BI TMDL files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python run_web_interface.py
+  python run_web_interface.py --threads 16
+  python run_web_interface.py --threads 32 --port 8080
+        """
+    )
+    
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on (default: 5000)')
+    parser.add_argument('--threads', type=int, metavar='M',
+                        help='Serve from one process with M threads on a production server instead of the '
+                             'development server; each followed analysis holds one thread (e.g. 16)')
+    parser.add_argument('--max-requests', type=int, default=0, metavar='N',
+                        help='Restart the server process after N requests, dropping its jobs and uploads; 0 to '
+                             'never (gunicorn; default: 0)')
+    parser.add_argument('--max-connections', type=int, default=100, metavar='N',
+                        help='Connections served at once; others wait in the backlog (default: 100)')
+    parser.add_argument('--backlog', type=int, default=64, metavar='N',
+                        help='Connections waiting to be accepted before new ones are refused (default: 64)')
+    parser.add_argument('--timeout', type=int, default=120, metavar='SECONDS',
+                        help='Restart a gunicorn worker that is silent this long; waitress closes idle connections (default: 120)')
+    parser.add_argument('--graceful-timeout', type=int, default=60, metavar='SECONDS',
+                        help='Time a gunicorn worker gets to finish its requests on shutdown (default: 60)')
+    
+    args = parser.parse_args()
+    
+    if args.threads is None:
+        banner(args.host, args.port, "development server")
+        app.run(debug=True, host=args.host, port=args.port)
+        return 0
+    
+    args.threads = max(1, args.threads)
+    if args.max_requests:
+        print(f"Warning: the server process restarts after about {args.max_requests} requests, dropping queued and "
+              f"running analyses and uploaded files"
+              + ("" if app.config['SHARED_CACHE_PATH'] else ", and finished results (set SHARED_CACHE_PATH to keep them)"))
+    
+    if GUNICORN_AVAILABLE:
+        banner(args.host, args.port, f"gunicorn with {args.threads} threads")
+        run_gunicorn(args)
+    elif WAITRESS_AVAILABLE:
+        banner(args.host, args.port, f"waitress with {args.threads} threads")
+        run_waitress(args)
+    else:
+        print("Error: the production server needs gunicorn (Linux/macOS) or waitress (any platform):")
+        print("   pip install gunicorn   or   pip install waitress")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,9 @@ This extends the base analyzer with AI-powered explanations and suggestions.
 
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from openai import OpenAI
 from typing import List, Optional
@@ -14,7 +17,8 @@ import json
 # Add parent directory to path to import modules
 sys.path.insert(0, str(Path(__file__).parent))
 
-from tmdl_analyzer import TMDLBestPracticesAgent, Violation
+from tmdl_analyzer import BestPracticesChecker, TMDLBestPracticesAgent, TMDLParser, Violation, configure_logging
+from metrics import ANALYSIS_PHASE_SECONDS, OPENAI_REQUEST_SECONDS, OPENAI_TOKENS
 
 # Try to import config file
 try:
@@ -29,11 +33,37 @@ except ImportError:
     DEFAULT_MAX_TOKENS = 300
     DEFAULT_TEMPERATURE = 0.3
 
+# OpenAI clients are thread-safe and keep a connection pool, so one client per API key
+# is shared by every analyzer in the process (the least recently used are dropped)
+MAX_POOLED_CLIENTS = 16
+_client_pool: 'OrderedDict[str, OpenAI]' = OrderedDict()
+_client_pool_lock = threading.Lock()
+
+
+def get_openai_client(api_key: str) -> OpenAI:
+    """Return the pooled OpenAI client for an API key, creating it on first use"""
+    with _client_pool_lock:
+        client = _client_pool.get(api_key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                timeout=30.0,  # 30 second timeout
+                max_retries=2
+            )
+            _client_pool[api_key] = client
+            if len(_client_pool) > MAX_POOLED_CLIENTS:
+                _client_pool.popitem(last=False)
+        else:
+            _client_pool.move_to_end(api_key)
+        return client
+
+
 class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
     """Enhanced analyzer with OpenAI integration"""
     
-    def __init__(self, rules_file: str, openai_api_key: Optional[str] = None):
-        super().__init__(rules_file)
+    def __init__(self, rules_file: str, openai_api_key: Optional[str] = None,
+                 checker: Optional[BestPracticesChecker] = None, parser: Optional[TMDLParser] = None):
+        super().__init__(rules_file, checker, parser)
         
         # Set up OpenAI API key - priority: parameter > config.py > environment variable
         api_key = None
@@ -51,12 +81,7 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
             self.client = None
         else:
             self.ai_enabled = True
-            # Create client with timeout settings
-            self.client = OpenAI(
-                api_key=api_key,
-                timeout=30.0,  # 30 second timeout
-                max_retries=2
-            )
+            self.client = get_openai_client(api_key)
             self.logger.info("OpenAI API key found. AI-enhanced features are enabled.")
         
         # Set model configuration
@@ -64,25 +89,45 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
         self.max_tokens = DEFAULT_MAX_TOKENS
         self.temperature = DEFAULT_TEMPERATURE
     
-    def analyze_model(self, model_path: str):
-        """Override to add AI enhancements to the analysis"""
+    def analyze_model(self, model_path: str, **options):
+        """Override to add AI enhancements to the analysis
+        
+        A ``cancel`` token (see cancellation) also stops the AI enhancement before its
+        next OpenAI request.
+        """
         # First, run the standard analysis
-        result = super().analyze_model(model_path)
+        result = super().analyze_model(model_path, **options)
         
         # If AI is not enabled, return standard result
         if not self.ai_enabled:
             self.logger.info("AI features disabled - returning standard analysis")
             return result
         
+        with ANALYSIS_PHASE_SECONDS.time('ai_enhancement'):
+            return self._enhance(result, options)
+    
+    def _complete(self, **request):
+        """Create a chat completion with the configured model, recording its latency and token usage"""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.client.chat.completions.create(model=self.model, **request)
+            outcome = 'ok'
+        finally:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - start, self.model, outcome)
+        
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            OPENAI_TOKENS.inc(self.model, 'prompt', amount=usage.prompt_tokens or 0)
+            OPENAI_TOKENS.inc(self.model, 'completion', amount=usage.completion_tokens or 0)
+        return response
+    
+    def _enhance(self, result, options):
+        """Add AI explanations per violated rule and strategic recommendations to a result"""
         self.logger.info("Enhancing analysis with AI-powered insights...")
         
         # Group violations by rule ID
-        violations_by_rule = {}
-        for violation in result['violations']:
-            rule_id = violation.rule_id
-            if rule_id not in violations_by_rule:
-                violations_by_rule[rule_id] = []
-            violations_by_rule[rule_id].append(violation)
+        violations_by_rule = result['violations'].group_by_rule()
         
         self.logger.info(f"Found {len(violations_by_rule)} unique violation types across {len(result['violations'])} total violations")
         
@@ -91,8 +136,13 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
         rules_to_enhance = list(violations_by_rule.keys())
         
         self.logger.info(f"Enhancing {len(rules_to_enhance)} violation types with AI strategic guidance...")
+        progress = options.get('progress') or (lambda event, data: None)
+        cancel = options.get('cancel')
         
         for i, rule_id in enumerate(rules_to_enhance):
+            if cancel is not None:
+                cancel.check()
+            progress('ai_explaining', {'rule_id': rule_id, 'explained': i, 'total': len(rules_to_enhance)})
             try:
                 # Get sample violation for this rule
                 sample_violation = violations_by_rule[rule_id][0]
@@ -124,23 +174,22 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
                 self.logger.warning(f"Could not enhance rule {rule_id}: {e}")
                 rule_explanations[rule_id] = None
         
-        # Apply AI explanations to all violations of each rule type
-        enhanced_violations = []
-        for violation in result['violations']:
-            violation.properties = getattr(violation, 'properties', {})
-            if violation.rule_id in rule_explanations and rule_explanations[violation.rule_id]:
-                violation.properties['ai_explanation'] = rule_explanations[violation.rule_id]
-                violation.properties['ai_enhanced'] = True
+        # Apply AI explanations once per rule type; the store shares them with every violation of the rule
+        for rule_id in rules_to_enhance:
+            if rule_explanations.get(rule_id):
+                result['violations'].set_rule_properties(rule_id, {
+                    'ai_explanation': rule_explanations[rule_id],
+                    'ai_enhanced': True
+                })
             else:
-                violation.properties['ai_enhanced'] = False
-            enhanced_violations.append(violation)
-        
-        # Replace violations with enhanced ones
-        result['violations'] = enhanced_violations
+                result['violations'].set_rule_properties(rule_id, {'ai_enhanced': False})
         
         # Add strategic recommendations based on violation types
+        if cancel is not None:
+            cancel.check()
         try:
             self.logger.info("Generating strategic recommendations...")
+            progress('ai_recommendations', {})
             recommendations = self.get_ai_recommendations(violations_by_rule)
             result['ai_recommendations'] = recommendations
             result['ai_enhanced'] = True
@@ -192,8 +241,7 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
             Make it actionable and specific to fixing all violations at once, not just one.
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._complete(
                 messages=[
                     {"role": "system", "content": "You are a Power BI and DAX expert who explains technical concepts clearly and provides strategic guidance."},
                     {"role": "user", "content": prompt}
@@ -235,8 +283,7 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
             Keep it concise but actionable.
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._complete(
                 messages=[
                     {"role": "system", "content": "You are a Power BI and DAX expert who explains technical concepts clearly."},
                     {"role": "user", "content": prompt}
@@ -312,8 +359,7 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
             Be specific, actionable, and reference actual rule names and counts.
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._complete(
                 messages=[
                     {"role": "system", "content": "You are a senior Power BI consultant providing strategic guidance on model optimization."},
                     {"role": "user", "content": prompt}
@@ -363,8 +409,7 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
             Be specific and actionable.
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._complete(
                 messages=[
                     {"role": "system", "content": "You are a senior Power BI consultant providing strategic guidance."},
                     {"role": "user", "content": prompt}
@@ -401,8 +446,7 @@ class AIEnhancedTMDLAnalyzer(TMDLBestPracticesAgent):
             Provide specific, actionable suggestions.
             """
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._complete(
                 messages=[
                     {"role": "system", "content": "You are a DAX expert focused on performance and best practices."},
                     {"role": "user", "content": prompt}
@@ -437,6 +481,7 @@ def create_enhanced_analyzer(api_key: str = None) -> AIEnhancedTMDLAnalyzer:
 
 if __name__ == "__main__":
     # Example usage
+    configure_logging()
     analyzer = create_enhanced_analyzer()
     
     model_path = "Sales Dashboard.SemanticModel"
@@ -456,11 +501,7 @@ if __name__ == "__main__":
         print("-" * 80)
         
         # Group violations by rule to show AI explanations
-        violations_by_rule = {}
-        for v in result['violations']:
-            if v.rule_id not in violations_by_rule:
-                violations_by_rule[v.rule_id] = []
-            violations_by_rule[v.rule_id].append(v)
+        violations_by_rule = result['violations'].group_by_rule()
         
         for rule_id, violations in violations_by_rule.items():
             sample = violations[0]
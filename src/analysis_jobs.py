@@ -0,0 +1,238 @@
+"""
+Analysis Jobs
+
+Runs analyses on a bounded pool of worker threads so web requests can return right
+away. Each job records its progress as a list of events that clients can follow (the
+web interface streams them as Server-Sent Events) and keeps its result until it expires.
+"""
+
+import logging
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue already holds as many jobs as it accepts
+    
+    ``retry_after`` estimates the seconds until a running job finishes and makes room.
+    """
+    
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class AnalysisJob:
+    """An analysis waiting for, running on or finished by the job queue
+    
+    ``status`` is one of 'queued', 'running', 'done', 'failed' or 'cancelled'. A failed
+    job's ``status_code`` is the HTTP status its error carries, if any (e.g. 504 for a
+    timeout). ``on_cancel`` is called when the job is cancelled and should make its work
+    stop (e.g. by cancelling the analysis' cancellation token).
+    """
+    id: str
+    status: str = 'queued'
+    result: Any = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    events: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    on_cancel: Optional[Callable[[str], None]] = field(default=None, repr=False)
+    cancel_requested: bool = False
+    # Number of clients currently following the job's events
+    followers: int = 0
+    _changed: threading.Condition = field(default_factory=threading.Condition, repr=False)
+    
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ('done', 'failed', 'cancelled')
+    
+    def cancel(self, reason: str = "The analysis was cancelled") -> bool:
+        """Ask the job to stop; returns False if it had already finished"""
+        with self._changed:
+            if self.is_finished:
+                return False
+            self.cancel_requested = True
+        if self.on_cancel is not None:
+            self.on_cancel(reason)
+        return True
+    
+    def start(self) -> None:
+        """Mark the job running and tell followers"""
+        with self._changed:
+            self.status = 'running'
+            self.events.append(('running', {}))
+            self._changed.notify_all()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """The job's status and outcome, read together so a finished job is always seen
+        with its result or error"""
+        with self._changed:
+            return {
+                'status': self.status,
+                'result': self.result,
+                'error': self.error,
+                'status_code': self.status_code,
+                'cancel_requested': self.cancel_requested
+            }
+    
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """Record a progress event and wake up followers"""
+        with self._changed:
+            self.events.append((event, data))
+            self._changed.notify_all()
+    
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None,
+               status_code: Optional[int] = None) -> None:
+        with self._changed:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.status_code = status_code
+            self.finished = time.time()
+            data = {'error': error} if error else {}
+            if status_code:
+                data['status'] = status_code
+            self.events.append((status, data))
+            self._changed.notify_all()
+    
+    def follow(self, start: int = 0, timeout: float = 15.0) -> Iterator[Optional[Tuple[int, str, Dict[str, Any]]]]:
+        """Yield (index, event, data) for every event from ``start`` on until the job finishes
+        
+        Yields None whenever no event arrived within ``timeout`` seconds, so callers can
+        send keep-alives. While the generator runs it counts as one of ``followers``;
+        close it (e.g. with contextlib.closing) when the follower goes away.
+        """
+        index = start
+        with self._changed:
+            self.followers += 1
+        try:
+            while True:
+                with self._changed:
+                    if index >= len(self.events) and not self.is_finished:
+                        self._changed.wait(timeout)
+                    pending = self.events[index:]
+                    finished = self.is_finished
+                
+                if not pending:
+                    if finished:
+                        return
+                    yield None
+                
+                for event, data in pending:
+                    yield index, event, data
+                    index += 1
+        finally:
+            with self._changed:
+                self.followers -= 1
+
+
+@dataclass
+class JobLane:
+    """Workers and queue limit of one class of jobs, e.g. the expensive AI analyses"""
+    name: str
+    max_workers: int
+    max_pending: int
+    executor: ThreadPoolExecutor
+    active: int = 0
+    # Moving average of how long a job of the lane runs, for Retry-After estimates
+    average_seconds: float = 30.0
+
+
+class JobQueue:
+    """Bounded pools of worker threads running analysis jobs
+    
+    At most ``max_workers`` jobs run at once and at most ``max_pending`` more wait for a
+    worker; further submissions raise JobQueueFull. ``lanes`` adds classes of jobs with
+    their own limits, ``{name: (max_workers, max_pending)}``, so one kind of job can't
+    take every worker. Finished jobs are kept for ``retention_seconds`` so their
+    results can be fetched.
+    
+    A cancelled job's work is still called when its turn comes, so it can release what
+    it holds; its ``on_cancel`` hook should make it return at once. A job whose work
+    raises after it was cancelled ends 'cancelled' rather than 'failed'.
+    """
+    
+    DEFAULT_LANE = 'default'
+    
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, retention_seconds: float = 600,
+                 lanes: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.logger = logging.getLogger(__name__)
+        self._lanes: Dict[str, JobLane] = {}
+        for name, (workers, pending) in {self.DEFAULT_LANE: (max_workers, max_pending), **(lanes or {})}.items():
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'analysis-{name}')
+            self._lanes[name] = JobLane(name, workers, pending, executor)
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, work: Callable[[Callable[[str, Dict[str, Any]], None]], Any],
+               lane: str = DEFAULT_LANE, on_cancel: Optional[Callable[[str], None]] = None) -> AnalysisJob:
+        """Queue ``work``, which is called with a progress callback and returns the job result"""
+        job_lane = self._lanes[lane]
+        with self._lock:
+            self._expire()
+            active = job_lane.active
+            if active >= job_lane.max_workers + job_lane.max_pending:
+                retry_after = max(1, math.ceil(job_lane.average_seconds / job_lane.max_workers))
+                raise JobQueueFull(f"{active} analyses are already running or queued", retry_after)
+            job_lane.active += 1
+            job = AnalysisJob(id=uuid.uuid4().hex, on_cancel=on_cancel)
+            self._jobs[job.id] = job
+        
+        job.publish('queued', {'ahead': max(0, active - job_lane.max_workers)})
+        job_lane.executor.submit(self._run, job, work, job_lane)
+        return job
+    
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id: str, reason: str = "The analysis was cancelled") -> Optional[AnalysisJob]:
+        """Cancel a queued or running job; returns the job, or None if it is unknown"""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel(reason)
+        return job
+    
+    def _run(self, job: AnalysisJob, work: Callable, lane: JobLane) -> None:
+        job.start()
+        start = time.monotonic()
+        error = None
+        try:
+            result = work(job.publish)
+        except Exception as e:
+            if not job.cancel_requested:
+                self.logger.exception(f"Analysis job {job.id} failed")
+            error = e
+        # Free the job's place before followers learn it finished and submit the next one
+        with self._lock:
+            lane.active -= 1
+            lane.average_seconds = 0.8 * lane.average_seconds + 0.2 * (time.monotonic() - start)
+        if error is not None and job.cancel_requested:
+            self.logger.info(f"Analysis job {job.id} cancelled")
+            job.finish('cancelled', error=str(error))
+        elif error is not None:
+            job.finish('failed', error=str(error), status_code=getattr(error, 'status_code', None))
+        else:
+            job.finish('done', result=result)
+    
+    def _expire(self) -> None:
+        """Forget finished jobs older than the retention period (caller holds the lock)"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+    
+    def shutdown(self, wait: bool = True) -> None:
+        for lane in self._lanes.values():
+            lane.executor.shutdown(wait=wait)
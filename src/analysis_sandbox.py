@@ -0,0 +1,247 @@
+"""
+Analysis Sandbox
+
+Runs analyses in a pool of pre-spawned worker processes, so a pathological model (a
+file the parser's patterns backtrack on for minutes, or one that exhausts memory) only
+costs its own worker. Each worker runs one analysis at a time under resource limits:
+
+- CPU time (``RLIMIT_CPU``), renewed for every analysis; a worker that exceeds it is
+  killed by the operating system.
+- Address space (``RLIMIT_AS``); an analysis that runs out of memory fails with
+  MemoryError.
+- Wall-clock time, enforced by the parent: a worker still busy after ``timeout``
+  seconds is killed.
+
+A killed or out-of-memory worker is replaced by a fresh one. Resource limits need the
+``resource`` module (Linux/macOS); elsewhere only the wall-clock timeout applies.
+
+Work is given as a module-level function, called in the worker with the arguments and
+a ``progress`` callback whose events are relayed to the caller. Metrics the work records
+(see metrics) are merged into the caller's registry when it finishes. A cancellation
+token given to ``run`` stops the work by killing its worker, at once.
+"""
+
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cancellation import CancellationToken
+from metrics import REGISTRY as METRICS
+
+# Resource limits are only available on POSIX systems
+try:
+    import resource
+    RESOURCE_LIMITS_AVAILABLE = True
+except ImportError:
+    RESOURCE_LIMITS_AVAILABLE = False
+
+
+class SandboxError(Exception):
+    """An analysis that failed in the sandbox or that the sandbox had to stop
+    
+    ``status_code`` is the matching HTTP status. For an exception raised by the work,
+    ``error_types`` names its class and base classes (e.g. ('FileNotFoundError',
+    'OSError', ...)), so callers can tell errors of the model from crashes.
+    """
+    status_code = 500
+    
+    def __init__(self, message: str, error_types: Tuple[str, ...] = ()):
+        super().__init__(message)
+        self.error_types = tuple(error_types)
+
+
+class AnalysisTimeout(SandboxError):
+    """The analysis used more CPU or wall-clock time than allowed"""
+    status_code = 504
+
+
+class AnalysisTooLarge(SandboxError):
+    """The analysis needed more memory than allowed"""
+    status_code = 413
+
+
+def _set_cpu_limit(seconds: Optional[float]) -> None:
+    """Allow this process ``seconds`` more CPU time from now on"""
+    if not RESOURCE_LIMITS_AVAILABLE or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn: Connection, memory_bytes: Optional[int]) -> None:
+    """Worker loop: run tasks received on ``conn`` until told to stop (None) or the pipe closes"""
+    if RESOURCE_LIMITS_AVAILABLE and memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    # The parent handles CTRL+C and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    def progress(event: str, data: Dict[str, Any]) -> None:
+        conn.send(('progress', event, data))
+    
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        
+        work, args, kwargs, cpu_seconds = task
+        _set_cpu_limit(cpu_seconds)
+        try:
+            result = work(*args, progress=progress, **kwargs)
+            conn.send(('metrics', METRICS.drain(), None))
+        except MemoryError:
+            # Memory may be fragmented beyond use; report and let the parent replace us
+            conn.send(('memory', None, None))
+            return
+        except Exception as e:
+            conn.send(('metrics', METRICS.drain(), None))
+            conn.send(('error', [cls.__name__ for cls in type(e).__mro__], str(e)))
+        else:
+            conn.send(('done', result, None))
+
+
+class SandboxWorker:
+    """One worker process and the parent's end of its pipe"""
+    
+    def __init__(self, context: Any, memory_bytes: Optional[int]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_bytes),
+                                       name='analysis-sandbox', daemon=True)
+        self.process.start()
+        child_conn.close()
+    
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+
+class SandboxPool:
+    """Pool of ``size`` worker processes running analyses under CPU, memory and time limits
+    
+    ``run`` blocks the calling thread until its analysis finishes, waiting for an idle
+    worker first; callers bound their own concurrency (see analysis_jobs.JobQueue).
+    """
+    
+    def __init__(self, size: int = 2, timeout: Optional[float] = 600,
+                 cpu_seconds: Optional[float] = 300, memory_bytes: Optional[int] = 2 * 1024 * 1024 * 1024):
+        self.size = size
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.logger = logging.getLogger(__name__)
+        # Spawned workers don't inherit the parent's threads or locks
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: 'queue.Queue[SandboxWorker]' = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            self._add_worker()
+    
+    def _add_worker(self) -> None:
+        worker = SandboxWorker(self._context, self.memory_bytes)
+        with self._lock:
+            self._workers.add(worker)
+        self._idle.put(worker)
+    
+    def _replace(self, worker: SandboxWorker) -> None:
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            closed = self._closed
+        if not closed:
+            self._add_worker()
+    
+    # How often a running analysis checks its cancellation token
+    CANCEL_POLL_SECONDS = 0.25
+    
+    def run(self, work: Callable, *args: Any, progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+            cancel: Optional[CancellationToken] = None, **kwargs: Any) -> Any:
+        """Call ``work(*args, progress=..., **kwargs)`` in a worker and return its result
+        
+        Raises AnalysisTimeout, AnalysisTooLarge, or SandboxError if the work failed or
+        its worker died, and AnalysisCancelled if ``cancel`` was cancelled first.
+        """
+        worker = self._idle.get()
+        if cancel is not None and cancel.cancelled:
+            self._idle.put(worker)
+            cancel.check()
+        try:
+            worker.conn.send((work, args, kwargs, self.cpu_seconds))
+        except (OSError, ValueError):
+            self._replace(worker)
+            raise SandboxError("The analysis worker is unavailable; please try again")
+        
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while True:
+            if cancel is not None and cancel.cancelled:
+                self.logger.info(f"Analysis cancelled; killing worker {worker.process.pid}")
+                self._replace(worker)
+                cancel.check()
+            remaining = deadline - time.monotonic() if deadline else None
+            if remaining is not None and remaining <= 0:
+                self.logger.warning(f"Analysis exceeded {self.timeout} s; killing worker {worker.process.pid}")
+                self._replace(worker)
+                raise AnalysisTimeout(f"The analysis did not finish within {self.timeout:g} seconds")
+            wait = remaining
+            if cancel is not None:
+                wait = self.CANCEL_POLL_SECONDS if remaining is None else min(remaining, self.CANCEL_POLL_SECONDS)
+            if not worker.conn.poll(wait):
+                continue
+            try:
+                kind, value, detail = worker.conn.recv()
+            except (EOFError, OSError):
+                return self._worker_died(worker)
+            
+            if kind == 'progress':
+                if progress is not None:
+                    progress(value, detail)
+                continue
+            if kind == 'metrics':
+                METRICS.merge(value)
+                continue
+            if kind == 'memory':
+                self._replace(worker)
+                raise AnalysisTooLarge("The model needs more memory than an analysis may use")
+            self._idle.put(worker)
+            if kind == 'error':
+                raise SandboxError(detail, value)
+            return value
+    
+    def _worker_died(self, worker: SandboxWorker) -> Any:
+        worker.process.join()
+        exitcode = worker.process.exitcode
+        self._replace(worker)
+        if RESOURCE_LIMITS_AVAILABLE and exitcode == -signal.SIGXCPU:
+            raise AnalysisTimeout(f"The analysis used more than {self.cpu_seconds:g} seconds of CPU time")
+        raise SandboxError(f"The analysis worker exited unexpectedly (exit code {exitcode})")
+    
+    def shutdown(self) -> None:
+        """Stop all workers; analyses still running are killed"""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
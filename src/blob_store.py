@@ -0,0 +1,67 @@
+"""
+Blob Store
+
+Content-addressed store for uploaded model files: each file is kept once under the
+SHA-256 of its content, however many uploads contain it. The browser sends a manifest
+of (path, SHA-256) pairs first and uploads only the files whose content the store is
+missing. The store is a least recently used map bounded by the total size of the blobs.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_sha256_hex(value: str) -> bool:
+    """Whether a string looks like a hex SHA-256 digest"""
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+class BlobStore:
+    """Thread-safe, byte-size bounded LRU store of file contents by SHA-256"""
+    
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._blobs: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._blobs)
+    
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._blobs
+    
+    def put(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Store a blob and return its digest (pass ``digest`` if it is already known)"""
+        digest = digest or sha256_hex(data)
+        if len(data) > self.max_bytes:
+            return digest
+        with self._lock:
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+                return digest
+            self._blobs[digest] = data
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._blobs.popitem(last=False)
+                self.total_bytes -= len(evicted)
+        return digest
+    
+    def get(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._blobs.get(digest)
+            if data is not None:
+                self._blobs.move_to_end(digest)
+            return data
+    
+    def missing(self, digests: Iterable[str]) -> List[str]:
+        """The given digests the store doesn't hold, each listed once"""
+        with self._lock:
+            return sorted({digest for digest in digests if digest not in self._blobs})
@@ -0,0 +1,44 @@
+"""
+Cancellation
+
+A token the starter of an analysis keeps to stop it early, e.g. when the browser that
+asked for it went away. The analysis checks the token between units of work (each
+parsed table file, each rule, each OpenAI request) and raises AnalysisCancelled, so it
+stops within one unit and releases its worker.
+
+Tokens live in one process. Analyses in sandbox workers (see analysis_sandbox) are
+cancelled by killing their worker instead.
+"""
+
+import threading
+from typing import Optional
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside an analysis whose cancellation token was cancelled"""
+
+
+class CancellationToken:
+    """Thread-safe flag that asks an analysis to stop"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+    
+    def cancel(self, reason: str = "The analysis was cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def check(self) -> None:
+        """Raise AnalysisCancelled if the token was cancelled"""
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the token is cancelled or ``timeout`` seconds pass; returns whether it was"""
+        return self._event.wait(timeout)
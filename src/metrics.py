@@ -0,0 +1,263 @@
+"""
+Metrics
+
+Counters and histograms in the Prometheus text exposition format, for the web
+interface's /metrics endpoint. Recording a value is a dictionary update under a lock;
+everything else (formatting, ratios, values read from caches) happens only when the
+endpoint is scraped.
+
+Metrics are per process. Analyses running in sandbox workers (see analysis_sandbox)
+record into the worker's registry, which the worker drains after each analysis and the
+parent merges into its own.
+"""
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from fast requests to long AI analyses
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{escape(str(value))}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metric(ABC):
+    """Base class: a named metric with label names, registered in a registry"""
+    kind = ''
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 registry: Optional['Registry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+    
+    @abstractmethod
+    def render(self) -> List[str]:
+        ...
+    
+    @abstractmethod
+    def drain(self) -> Any:
+        """Values recorded since the last drain, for merging into another registry"""
+    
+    @abstractmethod
+    def merge(self, delta: Any) -> None:
+        ...
+
+
+class Counter(Metric):
+    """A value that only goes up, per label values"""
+    kind = 'counter'
+    
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self._drained: Dict[LabelValues, float] = {}
+    
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+    
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+    
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+    
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+                for labels, value in sorted(self.samples().items())]
+    
+    def drain(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            delta = {labels: value - self._drained.get(labels, 0.0) for labels, value in self._values.items()
+                     if value != self._drained.get(labels, 0.0)}
+            self._drained = dict(self._values)
+        return delta
+    
+    def merge(self, delta: Dict[LabelValues, float]) -> None:
+        for labels, amount in delta.items():
+            self.inc(*labels, amount=amount)
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum, per label values"""
+    kind = 'histogram'
+    
+    def __init__(self, *args: Any, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket (+Inf last), sum]
+        self._series: Dict[LabelValues, List[Any]] = {}
+        self._drained: Dict[LabelValues, List[Any]] = {}
+    
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Observe the duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+    
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        lines = []
+        label_names = self.labels + ('le',)
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(label_names, labels + (_format_value(bound),))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+    
+    def drain(self) -> Dict[LabelValues, List[Any]]:
+        with self._lock:
+            delta = {}
+            for labels, (counts, total) in self._series.items():
+                drained_counts, drained_total = self._drained.get(labels, ([0] * len(counts), 0.0))
+                if counts != drained_counts:
+                    delta[labels] = [[a - b for a, b in zip(counts, drained_counts)], total - drained_total]
+            self._drained = {labels: [list(counts), total] for labels, (counts, total) in self._series.items()}
+        return delta
+    
+    def merge(self, delta: Dict[LabelValues, List[Any]]) -> None:
+        with self._lock:
+            for labels, (counts, total) in delta.items():
+                series = self._series.get(labels)
+                if series is None:
+                    series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+
+
+class Gauge(Metric):
+    """A value read when the metrics are scraped: ``read()`` returns {label values: value}"""
+    kind = 'gauge'
+    
+    def __init__(self, name: str, documentation: str, read: Callable[[], Dict[LabelValues, float]],
+                 labels: Sequence[str] = (), registry: Optional['Registry'] = None):
+        super().__init__(name, documentation, labels, registry)
+        self.read = read
+    
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+                for labels, value in sorted(self.read().items())]
+    
+    def drain(self) -> None:
+        return None
+    
+    def merge(self, delta: Any) -> None:
+        pass
+
+
+class Registry:
+    """The metrics of a process, rendered together"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+    
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+    
+    def drain(self) -> Dict[str, Any]:
+        """What every counter and histogram recorded since the last drain"""
+        deltas = {name: metric.drain() for name, metric in self._metrics.items()}
+        return {name: delta for name, delta in deltas.items() if delta}
+    
+    def merge(self, deltas: Dict[str, Any]) -> None:
+        """Add what another process's registry drained"""
+        for name, delta in deltas.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(delta)
+
+
+REGISTRY = Registry()
+
+# Content type of the text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Metrics recorded by the analyzer; the web interface adds its own request metrics
+ANALYSIS_PHASE_SECONDS = Histogram(
+    'tmdl_analysis_phase_seconds', 'Time spent in each phase of an analysis', ['phase'])
+OBJECTS_PARSED = Counter('tmdl_objects_parsed_total', 'Model objects parsed, by collection', ['collection'])
+VIOLATIONS_FOUND = Counter('tmdl_violations_found_total', 'Violations found, by severity', ['severity'])
+CACHE_REQUESTS = Counter('tmdl_cache_requests_total', 'Cache lookups by cache and outcome', ['cache', 'result'])
+OPENAI_REQUEST_SECONDS = Histogram(
+    'tmdl_openai_request_duration_seconds', 'Latency of OpenAI chat completion calls', ['model', 'outcome'])
+OPENAI_TOKENS = Counter('tmdl_openai_tokens_total', 'OpenAI tokens used, by model and type', ['model', 'type'])
+
+
+def _cache_hit_ratios() -> Dict[LabelValues, float]:
+    lookups: Dict[str, List[float]] = {}
+    for (cache, result), count in CACHE_REQUESTS.samples().items():
+        hits_and_total = lookups.setdefault(cache, [0.0, 0.0])
+        hits_and_total[1] += count
+        if result == 'hit':
+            hits_and_total[0] += count
+    return {(cache,): hits / total for cache, (hits, total) in lookups.items() if total}
+
+
+CACHE_HIT_RATIO = Gauge('tmdl_cache_hit_ratio', 'Share of cache lookups that were hits', _cache_hit_ratios, ['cache'])
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
@@ -0,0 +1,310 @@
+"""
+Model File Systems
+
+Read-only views over the files of a Power BI semantic model, so the TMDL parser can
+read a model from a folder on disk, a .zip or .tar archive (including a tar stream on
+stdin) or an in-memory mapping of paths to contents without extracting anything.
+
+Paths are POSIX-style and relative to the root of the file system ('' is the root).
+"""
+
+import io
+import os
+import posixpath
+import sys
+import tarfile
+import zipfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+
+def normalize_path(path: str) -> str:
+    """Normalize an archive or upload path to a relative POSIX path"""
+    path = path.replace('\\', '/')
+    parts = [part for part in path.split('/') if part not in ('', '.')]
+    if '..' in parts:
+        raise ValueError(f"Path escapes the model root: {path}")
+    return '/'.join(parts)
+
+
+class ModelFS(ABC):
+    """Read-only file system holding a semantic model"""
+    
+    name = ""
+    
+    @abstractmethod
+    def isdir(self, path: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def isfile(self, path: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def listdir(self, path: str) -> List[str]:
+        """Names of the entries of a directory"""
+    
+    @abstractmethod
+    def read_bytes(self, path: str) -> bytes:
+        ...
+    
+    @abstractmethod
+    def size(self, path: str) -> int:
+        """Size of a file in bytes"""
+    
+    def exists(self, path: str) -> bool:
+        return self.isdir(path) or self.isfile(path)
+    
+    def digest(self, path: str) -> Optional[str]:
+        """SHA-256 (hex) of a file's content if it is already known, e.g. from an upload manifest"""
+        return None
+    
+    def read_text(self, path: str, encoding: str = 'utf-8') -> str:
+        return self.read_bytes(path).decode(encoding)
+    
+    @staticmethod
+    def join(*parts: str) -> str:
+        return posixpath.join(*[part for part in parts if part])
+    
+    def walk(self, path: str = '') -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Walk the tree top-down like os.walk, yielding (path, dirs, files)"""
+        dirs, files = [], []
+        for entry in sorted(self.listdir(path)):
+            (dirs if self.isdir(self.join(path, entry)) else files).append(entry)
+        yield path, dirs, files
+        for entry in dirs:
+            yield from self.walk(self.join(path, entry))
+    
+    def dirs_containing(self, name: str) -> List[str]:
+        """Directories that contain an entry called ``name``, shallowest first"""
+        return [path for path, dirs, files in self.walk('') if name in dirs or name in files]
+    
+    def display_path(self, path: str) -> str:
+        """Path shown in reports and messages for a file of this file system"""
+        return posixpath.join(self.name, path) if self.name else path
+    
+    def close(self) -> None:
+        pass
+    
+    def __enter__(self) -> 'ModelFS':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class DirectoryFS(ModelFS):
+    """A folder on disk"""
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.name = root
+    
+    def _os_path(self, path: str) -> str:
+        return os.path.join(self.root, *path.split('/')) if path else self.root
+    
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(self._os_path(path))
+    
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(self._os_path(path))
+    
+    def listdir(self, path: str) -> List[str]:
+        return os.listdir(self._os_path(path))
+    
+    def read_bytes(self, path: str) -> bytes:
+        with open(self._os_path(path), 'rb') as f:
+            return f.read()
+    
+    def size(self, path: str) -> int:
+        return os.path.getsize(self._os_path(path))
+    
+    def display_path(self, path: str) -> str:
+        return self._os_path(path)
+
+
+class EntryFS(ModelFS):
+    """File system over a flat set of file entries (archive members, uploads)
+    
+    Directories are implied by the file paths. Subclasses store whatever they need per
+    entry and implement ``_read_entry``.
+    """
+    
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._entries: Dict[str, object] = {}
+        self._sizes: Dict[str, int] = {}
+        self._children: Dict[str, set] = {'': set()}
+    
+    def _add_entry(self, path: str, entry: object, size: int) -> None:
+        path = normalize_path(path)
+        if not path:
+            return
+        self._entries[path] = entry
+        self._sizes[path] = size
+        parent, _, child = path.rpartition('/')
+        while True:
+            self._children.setdefault(parent, set()).add(child)
+            if not parent:
+                break
+            parent, _, child = parent.rpartition('/')
+    
+    @abstractmethod
+    def _read_entry(self, entry: object) -> bytes:
+        ...
+    
+    def isdir(self, path: str) -> bool:
+        return normalize_path(path) in self._children
+    
+    def isfile(self, path: str) -> bool:
+        return normalize_path(path) in self._entries
+    
+    def listdir(self, path: str) -> List[str]:
+        path = normalize_path(path)
+        if path not in self._children:
+            raise FileNotFoundError(f"No such directory: {self.display_path(path)}")
+        return list(self._children[path])
+    
+    def read_bytes(self, path: str) -> bytes:
+        path = normalize_path(path)
+        if path not in self._entries:
+            raise FileNotFoundError(f"No such file: {self.display_path(path)}")
+        return self._read_entry(self._entries[path])
+    
+    def size(self, path: str) -> int:
+        return self._sizes[normalize_path(path)]
+    
+    def dirs_containing(self, name: str) -> List[str]:
+        # Directories are indexed by path, so no walk is needed
+        matches = [path for path, children in self._children.items() if name in children]
+        return sorted(matches, key=lambda path: (path.count('/') if path else -1, path))
+    
+    def files(self) -> List[str]:
+        """Paths of all files"""
+        return sorted(self._entries)
+
+
+class MemoryFS(EntryFS):
+    """Files held in memory, e.g. ``MemoryFS({'Sales.SemanticModel/definition/model.tmdl': b'...'})``"""
+    
+    def __init__(self, files: Optional[Dict[str, Union[bytes, str]]] = None, name: str = ""):
+        super().__init__(name)
+        self._digests: Dict[str, str] = {}
+        for path, data in (files or {}).items():
+            self.add_file(path, data)
+    
+    def add_file(self, path: str, data: Union[bytes, str], digest: Optional[str] = None) -> None:
+        """Add a file; ``digest`` is the SHA-256 of its content when the caller already has it"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._add_entry(path, data, len(data))
+        if digest:
+            self._digests[normalize_path(path)] = digest
+    
+    def digest(self, path: str) -> Optional[str]:
+        return self._digests.get(normalize_path(path))
+    
+    def _read_entry(self, entry: object) -> bytes:
+        return entry
+
+
+class ZipFS(EntryFS):
+    """Members of a .zip archive, read from the archive on demand"""
+    
+    def __init__(self, source: Union[str, bytes, BinaryIO], name: Optional[str] = None):
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        super().__init__(name if name is not None else (source if isinstance(source, str) else '<zip>'))
+        self._zip = zipfile.ZipFile(source)
+        for info in self._zip.infolist():
+            if not info.is_dir():
+                self._add_entry(info.filename, info, info.file_size)
+    
+    def _read_entry(self, entry: object) -> bytes:
+        return self._zip.read(entry)
+    
+    def close(self) -> None:
+        self._zip.close()
+
+
+class TarFS(EntryFS):
+    """Members of a .tar archive (optionally compressed)
+    
+    Seekable archives are read on demand. Streams (e.g. stdin) can only be read once,
+    so their members are buffered while the stream is read; pass ``include`` to keep
+    only the members the parser needs.
+    """
+    
+    def __init__(self, source: Union[str, bytes, BinaryIO], name: Optional[str] = None,
+                 stream: bool = False, include: Optional[Callable[[str], bool]] = None):
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        super().__init__(name if name is not None else (source if isinstance(source, str) else '<tar>'))
+        self._tar = None
+        
+        if stream:
+            with tarfile.open(fileobj=source, mode='r|*') as tar:
+                for member in tar:
+                    if member.isfile() and (include is None or include(member.name)):
+                        self._add_entry(member.name, tar.extractfile(member).read(), member.size)
+        else:
+            if isinstance(source, str):
+                self._tar = tarfile.open(source, mode='r:*')
+            else:
+                self._tar = tarfile.open(fileobj=source, mode='r:*')
+            for member in self._tar.getmembers():
+                if member.isfile() and (include is None or include(member.name)):
+                    self._add_entry(member.name, member, member.size)
+    
+    def _read_entry(self, entry: object) -> bytes:
+        if isinstance(entry, bytes):
+            return entry
+        return self._tar.extractfile(entry).read()
+    
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+
+
+def is_model_file(path: str) -> bool:
+    """Whether a file is read by the parser (TMDL files)"""
+    return path.endswith('.tmdl')
+
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+def open_archive_fs(source: Union[bytes, BinaryIO], name: str = "") -> EntryFS:
+    """Open a .zip or .tar archive from its bytes or a seekable file object (e.g. an upload)"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    is_zip = zipfile.is_zipfile(source)
+    source.seek(0)
+    return ZipFS(source, name) if is_zip else TarFS(source, name)
+
+
+def open_model_fs(source: str) -> ModelFS:
+    """Open a model folder, a .zip/.tar archive or '-' (a tar stream on stdin)"""
+    if source == '-':
+        return TarFS(sys.stdin.buffer, name='<stdin>', stream=True, include=is_model_file)
+    if os.path.isdir(source):
+        return DirectoryFS(source)
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"Model not found: {source}")
+    if zipfile.is_zipfile(source):
+        return ZipFS(source)
+    if tarfile.is_tarfile(source):
+        return TarFS(source)
+    raise ValueError(f"Unsupported model source (expected a folder, .zip or .tar archive): {source}")
+
+
+def find_model_root(fs: ModelFS, path: str = '') -> Optional[str]:
+    """Find the model folder in ``path``: a .SemanticModel folder with a 'definition'
+    subfolder, or else the shallowest folder with a 'definition' subfolder"""
+    prefix = path + '/' if path else ''
+    candidates = [folder for folder in fs.dirs_containing('definition')
+                  if (folder == path or folder.startswith(prefix)) and fs.isdir(fs.join(folder, 'definition'))]
+    for path in candidates:
+        if path.endswith('.SemanticModel'):
+            return path
+    return candidates[0] if candidates else None
@@ -0,0 +1,78 @@
+"""
+Rate Limit
+
+Token buckets per client, so one client can't fill the analysis queue for everyone.
+Each client's bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+second; a request takes one token or is refused with the time until the next one.
+
+Buckets are kept in memory per process, ordered by when each client was last seen.
+Idle clients' buckets are dropped once they would have refilled, and the table never
+holds more than ``max_clients`` buckets: a flood of distinct clients evicts the least
+recently seen ones (which then start over with a full bucket).
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+
+class RateLimiter:
+    """Token-bucket rate limit per client key (e.g. the client's IP address)"""
+    
+    def __init__(self, rate: float, burst: int = 1, max_clients: int = 10000):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # Client key -> [tokens, time of the last update], least recently seen first
+        self._buckets: 'OrderedDict[str, List[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def per_minute(cls, requests: float, burst: int = 1, max_clients: int = 10000) -> 'RateLimiter':
+        return cls(requests / 60.0, burst, max_clients)
+    
+    def acquire(self, client: str) -> float:
+        """Take a token for ``client``; returns 0 if admitted, else the seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._prune(now)
+                bucket = self._buckets[client] = [float(self.burst), now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(client)
+            
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+    
+    def admit(self, client: str) -> int:
+        """Take a token for ``client``; returns 0 if admitted, else whole seconds for Retry-After"""
+        wait = self.acquire(client)
+        return max(1, math.ceil(wait)) if wait else 0
+    
+    def _prune(self, now: float) -> None:
+        """Make room for a new client (caller holds the lock)
+        
+        Drops the buckets that have refilled, i.e. of clients idle long enough; they are
+        the least recently seen. If the table is still full, the least recently seen
+        client is evicted regardless.
+        """
+        while self._buckets:
+            tokens, updated = next(iter(self._buckets.values()))
+            if tokens + (now - updated) * self.rate < self.burst:
+                break
+            self._buckets.popitem(last=False)
+        while len(self._buckets) >= self.max_clients:
+            self._buckets.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
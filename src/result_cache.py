@@ -0,0 +1,153 @@
+"""
+Result Cache
+
+Keeps finished analysis results in memory under a result ID so reports can be rendered
+from them later without the browser sending the violations back. The cache is a least
+recently used map bounded by the approximate size of what it holds: each result counts
+its JSON size, and every artifact rendered from it (e.g. a Markdown report) counts its
+own size once cached.
+
+Results can be stored under a content key (see ``content_key``) so that analyzing the
+same model again is answered from the cache. With a ``shared`` cache (see
+shared_cache.SharedCache) results are also stored on disk, where other processes (other
+web workers, command line runs) find them; artifacts stay in the process that rendered
+them.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from shared_cache import SharedCache
+
+
+def content_key(file_digests: Dict[str, str], **parts: Any) -> str:
+    """Hash a set of files (path -> SHA-256 of the content) and everything else the result
+    depends on into one key; the order files arrived in does not matter"""
+    key = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8'))
+    for path in sorted(file_digests):
+        key.update(f"{path}\0{file_digests[path]}\n".encode('utf-8'))
+    return key.hexdigest()
+
+
+@dataclass
+class CachedResult:
+    """A result and the artifacts rendered from it"""
+    result: Any
+    size: int
+    artifacts: Dict[str, Any] = field(default_factory=dict)
+    artifact_sizes: Dict[str, int] = field(default_factory=dict)
+
+
+class ResultCache:
+    """Thread-safe, byte-size bounded LRU cache of analysis results"""
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, shared: Optional[SharedCache] = None):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.total_bytes = 0
+        self.logger = logging.getLogger(__name__)
+        self._entries: 'OrderedDict[str, CachedResult]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def put(self, result: Any, result_id: Optional[str] = None) -> Optional[str]:
+        """Cache a JSON-serializable result and return its ID
+        
+        Returns None if the result alone is larger than the whole cache.
+        """
+        data = json.dumps(result, default=str).encode('utf-8')
+        if len(data) > self.max_bytes:
+            self.logger.warning(f"Result of {len(data)} bytes exceeds the {self.max_bytes} byte cache; not cached")
+            return None
+        
+        result_id = result_id or uuid.uuid4().hex
+        self._put_local(result_id, result, len(data))
+        if self.shared is not None:
+            self.shared.put('result', result_id, data)
+        return result_id
+    
+    def _put_local(self, result_id: str, result: Any, size: int) -> CachedResult:
+        entry = CachedResult(result, size)
+        with self._lock:
+            self._remove(result_id)
+            self._entries[result_id] = entry
+            self.total_bytes += size
+            self._evict()
+        return entry
+    
+    def _entry(self, result_id: str) -> Optional[CachedResult]:
+        """The cached entry of a result, loaded from the shared cache if another process stored it"""
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is not None:
+                self._entries.move_to_end(result_id)
+                return entry
+        
+        if self.shared is None:
+            return None
+        data = self.shared.get('result', result_id)
+        if data is None:
+            return None
+        return self._put_local(result_id, json.loads(data), len(data))
+    
+    def get(self, result_id: str) -> Optional[Any]:
+        entry = self._entry(result_id)
+        return entry.result if entry is not None else None
+    
+    def artifact(self, result_id: str, key: str, render: Callable[[Any], Any],
+                 size: Callable[[Any], int] = len) -> Optional[Any]:
+        """Return the artifact ``key`` of a result, rendering and caching it on first use
+        
+        Artifacts are usually rendered bytes; anything else (e.g. an index) needs a
+        ``size`` function giving its approximate size in bytes. Returns None if the result
+        is not (or no longer) cached. Rendering happens outside the lock, so two
+        concurrent first requests may both render.
+        """
+        entry = self._entry(result_id)
+        if entry is None:
+            return None
+        with self._lock:
+            data = entry.artifacts.get(key)
+        if data is not None:
+            return data
+        
+        data = render(entry.result)
+        data_size = size(data)
+        with self._lock:
+            if self._entries.get(result_id) is entry and key not in entry.artifacts:
+                entry.artifacts[key] = data
+                entry.artifact_sizes[key] = data_size
+                entry.size += data_size
+                self.total_bytes += data_size
+                self._evict(keep=result_id)
+        return data
+    
+    def _remove(self, result_id: str) -> None:
+        entry = self._entries.pop(result_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+    
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used results until the cache fits (caller holds the lock)"""
+        for result_id in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if result_id != keep:
+                self._remove(result_id)
+        
+        # A single result whose artifacts outgrew the cache keeps only the result itself
+        if self.total_bytes > self.max_bytes and keep in self._entries:
+            entry = self._entries[keep]
+            artifacts_size = sum(entry.artifact_sizes.values())
+            entry.artifacts.clear()
+            entry.artifact_sizes.clear()
+            entry.size -= artifacts_size
+            self.total_bytes -= artifacts_size
@@ -0,0 +1,163 @@
+"""
+Shared Cache
+
+An on-disk cache in a single SQLite file that several processes use at once: the web
+interface's worker processes and command line runs. Entries are byte strings stored
+under a namespace and a key (e.g. parsed files under 'parse', analysis results under
+'result'). The database runs in WAL mode, so readers don't wait for a writer and each
+write is one short transaction.
+
+The cache is bounded by the total size of its values; a running total kept by triggers
+makes the check cheap, and the least recently read entries are evicted first. Reads
+only record their time when the last record is older than ``touch_interval`` seconds,
+so hot entries don't turn every read into a write.
+
+Errors of the database (e.g. a locked or corrupt file) are logged and treated as cache
+misses; the cache never fails an analysis.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from metrics import record_cache_lookup
+
+SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, bytes) VALUES (0, 0);
+
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET bytes = bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET bytes = bytes - OLD.size WHERE id = 0;
+END;
+COMMIT;
+"""
+
+
+class SharedCache:
+    """Size-bounded LRU cache of byte strings in a SQLite file, safe across threads and processes"""
+    
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024,
+                 touch_interval: float = 60.0, timeout: float = 30.0):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._local = threading.local()
+        
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._connection()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(SCHEMA)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection; a forked process opens its own"""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction on this thread's connection, rolled back on errors"""
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+    
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        try:
+            db = self._connection()
+            row = db.execute('SELECT value, accessed FROM entries WHERE namespace = ? AND key = ?',
+                             (namespace, key)).fetchone()
+            if row is None:
+                self.misses += 1
+                record_cache_lookup('shared', False)
+                return None
+            now = time.time()
+            if now - row[1] > self.touch_interval:
+                db.execute('UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?', (now, namespace, key))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Shared cache read failed ({self.path}): {e}")
+            self.misses += 1
+            record_cache_lookup('shared', False)
+            return None
+        self.hits += 1
+        record_cache_lookup('shared', True)
+        return row[0]
+    
+    def put(self, namespace: str, key: str, value: bytes) -> bool:
+        """Store a value, evicting least recently read entries beyond ``max_bytes``
+        
+        Returns False if the value was not stored (too large, or the database failed).
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return False
+        try:
+            with self._transaction() as db:
+                db.execute(
+                    'INSERT INTO entries (namespace, key, value, size, accessed) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (namespace, key) DO UPDATE SET '
+                    'value = excluded.value, size = excluded.size, accessed = excluded.accessed',
+                    (namespace, key, value, size, time.time()))
+                self._evict(db)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Shared cache write failed ({self.path}): {e}")
+            return False
+        return True
+    
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Delete the least recently read entries until the cache fits (inside a transaction)"""
+        excess = self.total_bytes(db) - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for namespace, key, size in db.execute('SELECT namespace, key, size FROM entries ORDER BY accessed'):
+            victims.append((namespace, key))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany('DELETE FROM entries WHERE namespace = ? AND key = ?', victims)
+    
+    def total_bytes(self, db: Optional[sqlite3.Connection] = None) -> int:
+        """Total size of the stored values"""
+        db = db or self._connection()
+        return db.execute('SELECT bytes FROM totals WHERE id = 0').fetchone()[0]
+    
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
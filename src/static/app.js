@@ -0,0 +1,818 @@
+let analysisResults = null;
+
+// File upload handling
+const uploadArea = document.getElementById('uploadArea');
+const fileInput = document.getElementById('fileInput');
+
+uploadArea.addEventListener('dragover', (e) => {
+    e.preventDefault();
+    uploadArea.classList.add('dragover');
+});
+
+uploadArea.addEventListener('dragleave', () => {
+    uploadArea.classList.remove('dragover');
+});
+
+uploadArea.addEventListener('drop', (e) => {
+    e.preventDefault();
+    uploadArea.classList.remove('dragover');
+    fileInput.files = e.dataTransfer.files;
+    updateFileDisplay();
+});
+
+fileInput.addEventListener('change', updateFileDisplay);
+
+// Analyzer type selection handling
+const analyzerRadios = document.querySelectorAll('input[name="analyzer_type"]');
+const aiWarning = document.getElementById('aiWarning');
+const apiKeyConfig = document.getElementById('apiKeyConfig');
+
+analyzerRadios.forEach(radio => {
+    radio.addEventListener('change', function() {
+        if (this.value === 'ai_enhanced') {
+            aiWarning.style.display = 'block';
+            apiKeyConfig.style.display = 'block';
+        } else {
+            aiWarning.style.display = 'none';
+            apiKeyConfig.style.display = 'none';
+        }
+    });
+});
+
+// API Key source selection handling
+const apiKeySourceRadios = document.querySelectorAll('input[name="api_key_source"]');
+const customApiKeyInput = document.getElementById('customApiKeyInput');
+
+apiKeySourceRadios.forEach(radio => {
+    radio.addEventListener('change', function() {
+        if (this.value === 'custom') {
+            customApiKeyInput.style.display = 'block';
+        } else {
+            customApiKeyInput.style.display = 'none';
+        }
+    });
+});
+
+// Rule and category filters
+async function loadRuleFilters() {
+    try {
+        const response = await fetch('/rules');
+        if (!response.ok) return;
+        const rules = await response.json();
+
+        const categories = [...new Set(rules.map(rule => rule.category))];
+        document.getElementById('categoryFilters').innerHTML = categories.map(category => `
+            <label class="filter-chip">
+                <input type="checkbox" name="categories" value="${category}"> ${category}
+            </label>
+        `).join('');
+
+        document.getElementById('ruleFilter').innerHTML = rules.map(rule =>
+            `<option value="${rule.id}">${rule.name}</option>`
+        ).join('');
+    } catch (error) {
+        // Filters are optional; all rules are checked without them
+    }
+}
+
+loadRuleFilters();
+
+// Only the model definition is read by the analyzer: TMDL files under definition/,
+// model.bim, or a single .zip/.tar archive. Everything else (.pbi/cache.abf, reports,
+// images) is left out of the upload.
+function uploadPath(file) {
+    return (file.webkitRelativePath || file.name).replace(/\\/g, '/');
+}
+
+function isModelFile(file) {
+    const path = uploadPath(file);
+    return (/(^|\/)definition\//.test(path) && path.endsWith('.tmdl'))
+        || /(^|\/)model\.bim$/.test(path)
+        || /\.(zip|tar|tgz|tar\.gz|tar\.bz2|tar\.xz)$/i.test(path);
+}
+
+function splitUpload(files) {
+    const upload = { files: [], skippedCount: 0, skippedBytes: 0 };
+    for (const file of files) {
+        if (isModelFile(file)) {
+            upload.files.push(file);
+        } else {
+            upload.skippedCount++;
+            upload.skippedBytes += file.size;
+        }
+    }
+    return upload;
+}
+
+function formatBytes(bytes) {
+    const units = ['B', 'KB', 'MB', 'GB'];
+    let unit = 0;
+    while (bytes >= 1024 && unit < units.length - 1) {
+        bytes /= 1024;
+        unit++;
+    }
+    return `${bytes.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+}
+
+// Object counts leave out the collections the selected rules didn't need parsed
+function countOrNotParsed(count) {
+    return count === undefined ? '<small>not parsed</small>' : count;
+}
+
+function updateFileDisplay() {
+    const files = fileInput.files;
+    if (files.length > 0) {
+        // Check if we have a .SemanticModel structure
+        const fileList = Array.from(files);
+        const hasSemanticModel = fileList.some(file => 
+            file.webkitRelativePath.includes('.SemanticModel')
+        );
+        const hasDefinition = fileList.some(file => 
+            file.webkitRelativePath.includes('definition/')
+        );
+
+        let statusIcon = "✅";
+        let statusText = "Files ready for analysis";
+        let alertClass = "alert-success";
+
+        if (!hasSemanticModel) {
+            statusIcon = "⚠️";
+            statusText = "Warning: No .SemanticModel folder detected";
+            alertClass = "alert-warning";
+        } else if (!hasDefinition) {
+            statusIcon = "❌";
+            statusText = "Error: No definition folder found";
+            alertClass = "alert-danger";
+        }
+
+        // Get the root folder name
+        const rootFolder = fileList[0].webkitRelativePath.split('/')[0] || fileList[0].name;
+        const upload = splitUpload(fileList);
+        const skippedText = upload.skippedCount > 0
+            ? `<br>${upload.skippedCount} unused files (${formatBytes(upload.skippedBytes)}) will not be uploaded`
+            : '';
+
+        uploadArea.innerHTML = `
+            <div class="upload-icon">${statusIcon}</div>
+            <h3>Directory Selected</h3>
+            <p style="color: var(--text-secondary); margin: 15px 0;">
+                <strong>Folder:</strong> ${rootFolder}
+            </p>
+            <div class="alert ${alertClass}" style="display: inline-block; margin: 10px auto;">
+                ${statusText}
+            </div>
+            <p style="font-size: 14px; color: var(--text-muted); margin: 15px 0;">
+                ${upload.files.length} of ${files.length} files will be uploaded${skippedText}
+            </p>
+            <button type="button" class="btn" id="changeDirBtn">
+                📂 Choose Different Directory
+            </button>
+        `;
+
+        // Re-attach event listener for the new button
+        document.getElementById('changeDirBtn').addEventListener('click', function() {
+            // Clear the file input
+            fileInput.value = '';
+            // Trigger the file picker
+            fileInput.click();
+        });
+    }
+}
+
+// Form submission
+document.getElementById('uploadForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const files = fileInput.files;
+    if (files.length === 0) {
+        showError('Please select a directory first');
+        return;
+    }
+
+    const upload = splitUpload(files);
+    if (upload.files.length === 0) {
+        showError('No TMDL files found. Please select a .SemanticModel folder with a definition folder.');
+        return;
+    }
+
+    showProgress();
+
+    try {
+        // Hash the files and ask the server which ones it doesn't have, so after an
+        // edit only the changed files are uploaded
+        const manifest = await buildManifest(upload.files);
+        let filesToSend = upload.files;
+        if (manifest) {
+            filesToSend = await missingFiles(upload.files, manifest);
+            setProgress(5, `Uploading ${filesToSend.length} of ${upload.files.length} files...`);
+        }
+
+        let response = await postAnalysis(filesToSend, manifest);
+        if (response.status === 409) {
+            // The server dropped some files since the check; send them all
+            response = await postAnalysis(upload.files, manifest);
+        }
+
+        if (response.status !== 304) {
+            if (!response.ok) {
+                throw new Error(await response.text());
+            }
+
+            // 200 carries a cached result; 202 a job to follow
+            const data = await response.json();
+            analysisResults = response.status === 200 ? data.result : await followJob(data);
+        }
+        displayResults(analysisResults);
+
+    } catch (error) {
+        showError('Analysis failed: ' + error.message);
+    } finally {
+        hideProgress();
+    }
+});
+
+// Manifest of the upload (path -> SHA-256), or null when the browser can't hash
+// (crypto.subtle needs HTTPS or localhost) or an archive is uploaded
+async function buildManifest(files) {
+    if (!window.crypto || !crypto.subtle) return null;
+    const manifest = {};
+    for (const file of files) {
+        if (/\.(zip|tar|tgz|tar\.gz|tar\.bz2|tar\.xz)$/i.test(file.name)) return null;
+        const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await file.arrayBuffer()));
+        manifest[uploadPath(file)] = Array.from(digest, byte => byte.toString(16).padStart(2, '0')).join('');
+    }
+    return manifest;
+}
+
+// The files whose content the server doesn't have yet
+async function missingFiles(files, manifest) {
+    const response = await fetch('/manifest', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ files: manifest })
+    });
+    if (!response.ok) return files;
+    const missing = new Set((await response.json()).missing);
+    return files.filter(file => missing.has(manifest[uploadPath(file)]));
+}
+
+function analysisForm(files, manifest) {
+    // Send each file under its path relative to the selected folder
+    const formData = new FormData();
+    for (const file of files) {
+        formData.append('files', file, uploadPath(file));
+    }
+    if (manifest) {
+        formData.append('manifest', JSON.stringify(manifest));
+    }
+
+    // Add analyzer type selection
+    const selectedAnalyzer = document.querySelector('input[name="analyzer_type"]:checked').value;
+    formData.append('analyzer_type', selectedAnalyzer);
+
+    // Add rule and category filters
+    document.querySelectorAll('input[name="categories"]:checked').forEach(checkbox => {
+        formData.append('categories', checkbox.value);
+    });
+    Array.from(document.getElementById('ruleFilter').selectedOptions).forEach(option => {
+        formData.append('rules', option.value);
+    });
+
+    // Add API key configuration if AI-enhanced is selected
+    if (selectedAnalyzer === 'ai_enhanced') {
+        const apiKeySource = document.querySelector('input[name="api_key_source"]:checked').value;
+        formData.append('api_key_source', apiKeySource);
+
+        if (apiKeySource === 'custom') {
+            const customApiKey = document.getElementById('customApiKey').value;
+            if (customApiKey) {
+                formData.append('custom_api_key', customApiKey);
+            }
+        }
+    }
+    return formData;
+}
+
+function postAnalysis(files, manifest) {
+    // Results are keyed by content: the server answers 304 if the model and
+    // settings are unchanged since the results already shown
+    const headers = {};
+    if (analysisResults && analysisResults.result_id) {
+        headers['If-None-Match'] = '"' + analysisResults.result_id + '"';
+    }
+    return fetch('/analyze', {
+        method: 'POST',
+        headers: headers,
+        body: analysisForm(files, manifest)
+    });
+}
+
+function showProgress() {
+    document.getElementById('progress').style.display = 'block';
+    document.getElementById('analyzeBtn').disabled = true;
+    document.getElementById('results').style.display = 'none';
+    clearError();
+    setProgress(5, 'Uploading your model...');
+}
+
+function setProgress(percent, text) {
+    document.getElementById('progressFill').style.width = percent + '%';
+    document.getElementById('progressText').textContent = text;
+}
+
+function hideProgress() {
+    document.getElementById('progress').style.display = 'none';
+    document.getElementById('analyzeBtn').disabled = false;
+    document.getElementById('progressFill').style.width = '100%';
+}
+
+// Follow an analysis job's progress events, then fetch its result
+function followJob(job) {
+    return new Promise((resolve, reject) => {
+        const events = new EventSource(job.events_url);
+        const on = (name, handler) => events.addEventListener(name, e => handler(JSON.parse(e.data)));
+
+        // Leaving the page cancels the analysis rather than letting it run for nobody
+        const cancelJob = () => navigator.sendBeacon(job.cancel_url);
+        window.addEventListener('pagehide', cancelJob);
+        const close = () => {
+            events.close();
+            window.removeEventListener('pagehide', cancelJob);
+        };
+
+        on('queued', data => setProgress(10, data.ahead > 0
+            ? `Waiting for ${data.ahead} other analyses...` : 'Starting analysis...'));
+        on('parsing', () => setProgress(15, 'Parsing TMDL files...'));
+        on('parsed', data => {
+            // Only collections with objects are sent, so skipped ones don't read as zero
+            const counts = data.object_counts;
+            const parsed = ['tables', 'measures', 'columns'].filter(name => counts[name])
+                .map(name => `${counts[name]} ${name}`);
+            setProgress(30, `Parsed ${parsed.join(', ') || 'the model'}`);
+        });
+        on('rule_checked', data => setProgress(30 + 40 * data.rules_evaluated / data.rules_total,
+            `Checked ${data.rules_evaluated} of ${data.rules_total} rules (${data.violations} violations)`));
+        on('ai_explaining', data => setProgress(70 + 25 * data.explained / data.total,
+            `AI: explaining rule ${data.explained + 1} of ${data.total}...`));
+        on('ai_recommendations', () => setProgress(95, 'AI: writing strategic recommendations...'));
+        on('failed', data => {
+            close();
+            reject(new Error(data.error));
+        });
+        on('cancelled', data => {
+            close();
+            reject(new Error(data.error));
+        });
+        on('done', async () => {
+            close();
+            try {
+                const response = await fetch(job.result_url);
+                if (!response.ok) throw new Error(await response.text());
+                resolve((await response.json()).result);
+            } catch (error) {
+                reject(error);
+            }
+        });
+
+        // EventSource reconnects by itself; give up only once it stops trying
+        events.onerror = () => {
+            if (events.readyState === EventSource.CLOSED) {
+                window.removeEventListener('pagehide', cancelJob);
+                reject(new Error('Lost connection to the analysis job'));
+            }
+        };
+    });
+}
+
+function showError(message) {
+    const errorElement = document.getElementById('errorMsg');
+    errorElement.textContent = message;
+    errorElement.style.display = message ? 'block' : 'none';
+    document.getElementById('results').style.display = 'none';
+}
+
+function clearError() {
+    const errorElement = document.getElementById('errorMsg');
+    errorElement.textContent = '';
+    errorElement.style.display = 'none';
+}
+
+function displayResults(results) {
+    clearError();
+    const summary = results.summary;
+
+    // Analyzer type info
+    let analyzerInfo = '';
+    const analyzerType = results.analyzer_type || 'regular';
+
+    if (analyzerType === 'ai_enhanced') {
+        analyzerInfo = '<div class="alert alert-success">🤖 <strong>AI-Enhanced Analysis</strong> - Results include strategic recommendations and detailed explanations</div>';
+    } else if (results.ai_fallback_reason) {
+        analyzerInfo = `<div class="alert alert-warning">⚠️ <strong>AI Analysis Failed</strong> - Fell back to regular analysis<br><small>Reason: ${results.ai_fallback_reason}</small></div>`;
+    } else if (results.ai_unavailable_reason) {
+        analyzerInfo = `<div class="alert alert-danger">❌ <strong>AI Analysis Unavailable</strong><br><small>${results.ai_unavailable_reason}</small></div>`;
+    } else {
+        analyzerInfo = '<div class="alert alert-info">⚡ <strong>Regular Analysis</strong> - Fast rule-based checking</div>';
+    }
+
+    // Display summary
+    const summaryHtml = `
+        ${analyzerInfo}
+        <div class="summary-card">
+            <h3>📈 Model Overview</h3>
+            <div class="stats-grid">
+                <div class="stat-item">
+                    <span class="stat-number">${countOrNotParsed(summary.object_counts.tables)}</span>
+                    <span class="stat-label">Tables</span>
+                </div>
+                <div class="stat-item">
+                    <span class="stat-number">${countOrNotParsed(summary.object_counts.measures)}</span>
+                    <span class="stat-label">Measures</span>
+                </div>
+                <div class="stat-item">
+                    <span class="stat-number">${countOrNotParsed(summary.object_counts.columns)}</span>
+                    <span class="stat-label">Columns</span>
+                </div>
+                <div class="stat-item">
+                    <span class="stat-number">${countOrNotParsed(summary.object_counts.relationships)}</span>
+                    <span class="stat-label">Relationships</span>
+                </div>
+            </div>
+        </div>
+
+        <div class="summary-card">
+            <h3>⚠️ Violations Summary</h3>
+            <div style="margin-bottom: 20px;">
+                <div class="stat-item" style="display: inline-block; min-width: 200px;">
+                    <span class="stat-number" style="font-size: 3rem;">${summary.violations.total}</span>
+                    <span class="stat-label">Total Violations</span>
+                </div>
+                ${summary.violations.suppressed && summary.violations.suppressed.total ? `
+                    <p style="color: var(--text-muted); margin-top: 10px;">
+                        🔕 ${summary.violations.suppressed.total} suppressed by BestPracticeAnalyzer_IgnoreRules annotations
+                    </p>
+                ` : ''}
+            </div>
+            <div style="display: flex; gap: 10px; flex-wrap: wrap; justify-content: center;">
+                ${Object.entries(summary.violations.by_severity).map(([severity, count]) => 
+                    `<span class="severity-badge severity-${severity.toLowerCase()}">${severity}: ${count}</span>`
+                ).join('')}
+            </div>
+        </div>
+
+        <div class="summary-card">
+            <h3>✅ Rules Checked</h3>
+            <div class="stats-grid" style="margin-bottom: 20px;">
+                <div class="stat-item">
+                    <span class="stat-number">${summary.rules_checked.total}</span>
+                    <span class="stat-label">Total Rules</span>
+                </div>
+                <div class="stat-item" style="border-color: var(--danger);">
+                    <span class="stat-number" style="color: #f87171;">${summary.rules_checked.rules_with_violations}</span>
+                    <span class="stat-label">With Violations</span>
+                </div>
+                <div class="stat-item" style="border-color: var(--success);">
+                    <span class="stat-number" style="color: #4ade80;">${summary.rules_checked.rules_without_violations}</span>
+                    <span class="stat-label">Passed</span>
+                </div>
+            </div>
+            <details id="rulesDetails">
+                <summary>
+                    📋 View All Rules Checked (${summary.rules_checked.total})
+                </summary>
+                <div class="rules-list" id="rulesList" style="margin-top: 15px;"></div>
+            </details>
+        </div>
+    `;
+
+    document.getElementById('summarySection').innerHTML = summaryHtml;
+
+    // Display AI recommendations if available
+    if (results.ai_recommendations && results.ai_enhanced) {
+        const recommendationsHtml = `
+            <div class="summary-card" style="border: 2px solid var(--primary); background: rgba(99, 102, 241, 0.05);">
+                <h3>🤖 AI Strategic Recommendations</h3>
+                <div class="ai-explanation">
+                    <div style="white-space: pre-wrap; line-height: 1.8;">${results.ai_recommendations}</div>
+                </div>
+            </div>
+        `;
+        document.getElementById('summarySection').insertAdjacentHTML('beforeend', recommendationsHtml);
+    }
+
+    // The rule list is built when it is first opened
+    const rulesDetails = document.getElementById('rulesDetails');
+    rulesDetails.addEventListener('toggle', () => {
+        if (rulesDetails.open && !rulesDetails.dataset.rendered) {
+            rulesDetails.dataset.rendered = 'true';
+            appendInChunks(document.getElementById('rulesList'), summary.rules_checked.all_rules, ruleHtml);
+        }
+    });
+
+    showViolations(results);
+    document.getElementById('results').style.display = 'block';
+}
+
+function violationHtml(violation) {
+    return `
+        <div class="violation-item ${violation.severity.toLowerCase()}">
+            <h4>${violation.rule_name}</h4>
+            <div class="object-info">
+                <span><strong>Object:</strong> ${violation.object_name} (${violation.object_type})</span>
+                <span class="severity-badge severity-${violation.severity.toLowerCase()}">${violation.severity}</span>
+                ${violation.ai_enhanced ? '<span class="severity-badge" style="background: rgba(99, 102, 241, 0.2); color: #818cf8; border: 1px solid rgba(99, 102, 241, 0.3);">🤖 AI Enhanced</span>' : ''}
+            </div>
+            <div class="object-info"><strong>File:</strong> ${violation.file_path}</div>
+            <p style="color: var(--text-secondary); margin: 15px 0;">${violation.description}</p>
+            ${violation.ai_explanation ? `
+                <div class="ai-explanation">
+                    <strong style="color: var(--primary-light);">🤖 AI Expert Analysis:</strong>
+                    <div style="margin-top: 10px; white-space: pre-wrap; line-height: 1.8;">${violation.ai_explanation}</div>
+                </div>
+            ` : ''}
+            ${violation.fix_suggestion ? `
+                <div class="fix-suggestion">
+                    <strong>💡 Fix Suggestion:</strong> ${violation.fix_suggestion}
+                </div>
+            ` : ''}
+        </div>
+    `;
+}
+
+function ruleHtml(rule) {
+    return `
+        <div class="rule-item ${rule.has_violations ? 'failed' : 'passed'}">
+            <div style="flex: 1;">
+                <strong style="color: var(--text-primary);">${rule.name}</strong>
+                <div style="margin-top: 5px;">
+                    <span class="severity-badge severity-${rule.severity.toLowerCase()}">${rule.severity}</span>
+                    <span style="color: var(--text-muted); margin-left: 10px; font-size: 0.9em;">${rule.category}</span>
+                </div>
+            </div>
+            <div style="text-align: right;">
+                ${rule.has_violations 
+                    ? `<span style="color: #f87171; font-weight: bold;">❌ ${rule.violation_count} violation${rule.violation_count > 1 ? 's' : ''}</span>` 
+                    : `<span style="color: #4ade80; font-weight: bold;">✅ Passed</span>`
+                }
+            </div>
+        </div>
+    `;
+}
+
+// Insert items a chunk per animation frame so long lists don't block the page
+function appendInChunks(container, items, render, chunkSize = 50) {
+    let start = 0;
+    const step = () => {
+        container.insertAdjacentHTML('beforeend', items.slice(start, start + chunkSize).map(render).join(''));
+        start += chunkSize;
+        if (start < items.length) requestAnimationFrame(step);
+    };
+    step();
+}
+
+// One compact, fixed-height line of the virtual violation list
+const VIOLATION_ROW_HEIGHT = 92;
+
+function violationRowHtml(violation, row) {
+    if (!violation) {
+        return `<div class="violation-row loading" style="top: ${row * VIOLATION_ROW_HEIGHT}px;">Loading...</div>`;
+    }
+    const severity = violation.severity.toLowerCase();
+    return `
+        <div class="violation-row ${severity}" data-row="${row}" style="top: ${row * VIOLATION_ROW_HEIGHT}px;">
+            <div class="violation-row-title">
+                <span class="severity-badge severity-${severity}">${violation.severity}</span>
+                <strong>${violation.rule_name}</strong>
+                ${violation.ai_enhanced ? '<span title="AI Enhanced">🤖</span>' : ''}
+            </div>
+            <div class="violation-row-line"><strong>${violation.object_name}</strong> (${violation.object_type})${violation.table_name ? ' in ' + violation.table_name : ''} · ${violation.category}</div>
+            <div class="violation-row-line">${violation.description}</div>
+        </div>
+    `;
+}
+
+// Violations arrive as a normalized table: rule fields once per rule, and per
+// violation a row of [rule index, ...own fields]. Each decoded violation inherits
+// its rule's fields instead of copying them.
+function decodeViolations(table) {
+    const fields = table.fields;
+    return table.rows.map(row => {
+        const violation = Object.create(table.rules[row[0]]);
+        for (let i = 1; i < fields.length; i++) {
+            violation[fields[i]] = row[i];
+        }
+        return violation;
+    });
+}
+
+// Violations from the server, fetched a page at a time as they scroll into view
+function serverViolationSource(url, filters, q) {
+    const pageSize = 200;
+    const pages = new Map();
+    return {
+        total: null,
+        get(row) {
+            const page = pages.get(Math.floor(row / pageSize));
+            return page && page.rows ? page.rows[row % pageSize] : undefined;
+        },
+        async load(first, last) {
+            const wanted = [];
+            for (let page = Math.floor(first / pageSize); page <= Math.floor(last / pageSize); page++) {
+                if (!pages.has(page)) wanted.push(page);
+            }
+            await Promise.all(wanted.map(async page => {
+                pages.set(page, {});
+                const params = new URLSearchParams(Object.assign({}, filters, { q: q, offset: page * pageSize, limit: pageSize }));
+                const response = await fetch(url + '?' + params);
+                if (!response.ok) {
+                    pages.delete(page);
+                    throw new Error(await response.text());
+                }
+                const data = await response.json();
+                this.total = data.total;
+                pages.get(page).rows = decodeViolations(data.violation_table);
+            }));
+        }
+    };
+}
+
+// Violations held by the page, filtered through prebuilt per-attribute indexes
+const FILTER_FIELDS = { rule: 'rule_id', severity: 'severity', category: 'category', table: 'table_name' };
+const SEARCH_FIELDS = ['object_name', 'object_type', 'table_name', 'rule_name', 'rule_id', 'file_path'];
+
+function buildViolationIndex(violations) {
+    const postings = {};
+    for (const name in FILTER_FIELDS) postings[name] = new Map();
+    const searchText = new Array(violations.length);
+    violations.forEach((violation, row) => {
+        for (const [name, field] of Object.entries(FILTER_FIELDS)) {
+            const key = String(violation[field] || '').toLowerCase();
+            if (!postings[name].has(key)) postings[name].set(key, []);
+            postings[name].get(key).push(row);
+        }
+        searchText[row] = SEARCH_FIELDS.map(field => violation[field] || '').join('\n').toLowerCase();
+    });
+    return { violations, postings, searchText };
+}
+
+function localViolationSource(index, filters, q) {
+    const wanted = Object.entries(filters).filter(([, value]) => value)
+        .map(([name, value]) => index.postings[name].get(value.toLowerCase()) || [])
+        .sort((a, b) => a.length - b.length);
+    let rows = null;
+    if (wanted.length) {
+        // Start from the filter matching the fewest rows and intersect the others
+        rows = wanted[0];
+        for (const other of wanted.slice(1)) {
+            const keep = new Set(other);
+            rows = rows.filter(row => keep.has(row));
+        }
+    }
+    q = q.toLowerCase();
+    if (q) {
+        rows = (rows || index.violations.map((_, row) => row)).filter(row => index.searchText[row].includes(q));
+    }
+    return {
+        total: rows ? rows.length : index.violations.length,
+        get: row => index.violations[rows ? rows[row] : row],
+        load: async () => {}
+    };
+}
+
+// Renders only the rows in view (plus a margin) of a fixed-row-height list
+function virtualList(viewport, source, onSelect) {
+    const spacer = viewport.querySelector('.violation-spacer');
+    const overscan = 10;
+    let scheduled = false;
+    // Pages still loading for a list that has been replaced must not render
+    const token = {};
+    viewport.currentList = token;
+
+    function render() {
+        scheduled = false;
+        if (viewport.currentList !== token) return;
+        const total = source.total || 0;
+        spacer.style.height = (total * VIOLATION_ROW_HEIGHT) + 'px';
+        const first = Math.max(0, Math.floor(viewport.scrollTop / VIOLATION_ROW_HEIGHT) - overscan);
+        const last = Math.min(total - 1, Math.ceil((viewport.scrollTop + viewport.clientHeight) / VIOLATION_ROW_HEIGHT) + overscan);
+        let html = '';
+        let missing = false;
+        for (let row = first; row <= last; row++) {
+            const violation = source.get(row);
+            missing = missing || !violation;
+            html += violationRowHtml(violation, row);
+        }
+        spacer.innerHTML = html;
+        if (missing) {
+            source.load(first, last).then(schedule).catch(error => showError('Failed to load violations: ' + error.message));
+        }
+    }
+
+    function schedule() {
+        if (!scheduled) {
+            scheduled = true;
+            requestAnimationFrame(render);
+        }
+    }
+
+    viewport.onscroll = schedule;
+    spacer.onclick = event => {
+        const row = event.target.closest('.violation-row[data-row]');
+        if (row) onSelect(source.get(Number(row.dataset.row)));
+    };
+    viewport.scrollTop = 0;
+    return source.load(0, 2 * overscan).then(() => { render(); return source.total; });
+}
+
+function showViolations(results) {
+    const byViolations = results.summary.violations;
+    const ruleNames = {};
+    results.summary.rules_checked.all_rules.forEach(rule => { ruleNames[rule.id] = rule.name; });
+    const options = (label, values, names) => `<option value="">${label}</option>` +
+        values.map(value => `<option value="${value}">${names ? names[value] || value : value}</option>`).join('');
+
+    document.getElementById('violationsSection').innerHTML = `
+        <div class="category-section">
+            <div class="category-header">
+                <h3>Violations <span id="violationCount" style="opacity: 0.8; font-weight: normal;"></span></h3>
+            </div>
+            <div class="violation-filters">
+                <select id="filterSeverity" class="api-key-input">${options('All severities', Object.keys(byViolations.by_severity))}</select>
+                <select id="filterCategory" class="api-key-input">${options('All categories', Object.keys(byViolations.by_category))}</select>
+                <select id="filterRule" class="api-key-input">${options('All rules', Object.keys(byViolations.by_rule), ruleNames)}</select>
+                <select id="filterTable" class="api-key-input">${options('All tables', Object.keys(byViolations.by_table).filter(Boolean).sort())}</select>
+                <input id="filterText" type="search" class="api-key-input" placeholder="Search objects, rules, files...">
+            </div>
+            <div class="violation-viewport" id="violationViewport"><div class="violation-spacer"></div></div>
+            <div id="violationDetail"></div>
+        </div>
+    `;
+
+    // Violations shipped with the result are indexed once; cached results are paged from the server
+    const index = results.violations_url ? null : buildViolationIndex(decodeViolations(results.violation_table));
+    let current = 0;
+
+    function update() {
+        const filters = {
+            severity: document.getElementById('filterSeverity').value,
+            category: document.getElementById('filterCategory').value,
+            rule: document.getElementById('filterRule').value,
+            table: document.getElementById('filterTable').value
+        };
+        const q = document.getElementById('filterText').value;
+        const source = index ? localViolationSource(index, filters, q) : serverViolationSource(results.violations_url, filters, q);
+        const request = ++current;
+        document.getElementById('violationDetail').innerHTML = '';
+        virtualList(document.getElementById('violationViewport'), source, violation => {
+            if (violation) document.getElementById('violationDetail').innerHTML = violationHtml(violation);
+        }).then(total => {
+            if (request === current) {
+                document.getElementById('violationCount').textContent = `(${total} of ${byViolations.total})`;
+            }
+        }).catch(error => showError('Failed to load violations: ' + error.message));
+    }
+
+    ['filterSeverity', 'filterCategory', 'filterRule', 'filterTable'].forEach(id =>
+        document.getElementById(id).addEventListener('change', update));
+    let searchTimer = null;
+    document.getElementById('filterText').addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(update, 250);
+    });
+    update();
+}
+
+async function downloadReport() {
+    if (!analysisResults) return;
+
+    try {
+        // Cached results are rendered on the server; others are posted back
+        const response = analysisResults.report_url
+            ? await fetch(analysisResults.report_url)
+            : await fetch('/generate_report', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(analysisResults)
+            });
+
+        if (!response.ok) {
+            throw new Error('Failed to generate report');
+        }
+
+        const blob = await response.blob();
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = 'TMDL_Analysis_Report.md';
+        document.body.appendChild(a);
+        a.click();
+        window.URL.revokeObjectURL(url);
+        document.body.removeChild(a);
+
+    } catch (error) {
+        showError('Failed to download report: ' + error.message);
+    }
+}
+
@@ -0,0 +1,73 @@
+"""
+Static Assets
+
+The web interface's stylesheet and script, read once at startup and served from memory.
+Each asset is versioned by a hash of its content: pages link to ``/static/<name>?v=<hash>``,
+so browsers may cache a versioned URL for good and fetch the new one after a change.
+The same hash is the asset's ETag, and compressed variants are built once per encoding.
+"""
+
+import hashlib
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+# Types of the assets the web interface ships; anything else is guessed from the name
+ASSET_MIMETYPES = {'.css': 'text/css', '.js': 'application/javascript', '.html': 'text/html'}
+
+
+def content_version(data: bytes) -> str:
+    """Short content hash used as an asset's version and ETag"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+@dataclass
+class StaticAsset:
+    """One static file held in memory with its version and compressed variants"""
+    name: str
+    data: bytes
+    mimetype: str
+    version: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+class StaticAssets:
+    """The files of a static folder by name (forward-slash path relative to the folder)"""
+    
+    def __init__(self, folder: str):
+        self.folder = Path(folder)
+        self._assets: Dict[str, StaticAsset] = {}
+        self._lock = threading.Lock()
+        if self.folder.is_dir():
+            for path in sorted(self.folder.rglob('*')):
+                if path.is_file():
+                    self._add(path)
+    
+    def _add(self, path: Path) -> None:
+        name = path.relative_to(self.folder).as_posix()
+        data = path.read_bytes()
+        mimetype = (ASSET_MIMETYPES.get(path.suffix.lower())
+                    or mimetypes.guess_type(path.name)[0] or 'application/octet-stream')
+        self._assets[name] = StaticAsset(name, data, mimetype, content_version(data))
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._assets
+    
+    def get(self, name: str) -> Optional[StaticAsset]:
+        return self._assets.get(name)
+    
+    def encode(self, asset: StaticAsset, encoding: str, compress: Callable[[bytes, str], bytes]) -> bytes:
+        """An asset compressed with ``encoding``, compressed once on first use"""
+        data = asset.encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = asset.encoded.get(encoding)
+                if data is None:
+                    data = asset.encoded[encoding] = compress(asset.data, encoding)
+        return data
+    
+    def url(self, name: str) -> str:
+        """Versioned URL of an asset, to be linked from pages"""
+        return f"/static/{name}?v={self._assets[name].version}"
@@ -15,12 +15,40 @@ Date: October 2025
 """
 
 import os
+import hashlib
 import json
 import re
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, field
+import textwrap
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
+from dataclasses import dataclass, field, fields
 from enum import Enum
 import logging
+import posixpath
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+# Add parent directory to path to import modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cancellation import AnalysisCancelled, CancellationToken
+from model_fs import DirectoryFS, ModelFS, find_model_root
+from shared_cache import SharedCache
+from metrics import ANALYSIS_PHASE_SECONDS, OBJECTS_PARSED, VIOLATIONS_FOUND, record_cache_lookup
+
+# Receives analysis progress events: (event name, event data)
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Set up console logging for the command line and web entry points"""
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 
 
 class Severity(Enum):
@@ -57,6 +85,18 @@ class TMDLObject:
     properties: Dict[str, Any] = field(default_factory=dict)
     content: str = ""
     file_path: str = ""
+    table_name: str = ""
+    annotations: Dict[str, str] = field(default_factory=dict)
+    parent: Optional['TMDLObject'] = field(default=None, repr=False, compare=False)
+
+
+@dataclass
+class TMDLModel(TMDLObject):
+    """Represents the model itself (definition/model.tmdl)"""
+    culture: str = ""
+    
+    def __post_init__(self):
+        self.object_type = "Model"
 
 
 @dataclass
@@ -65,7 +105,11 @@ class TMDLTable(TMDLObject):
     columns: List['TMDLColumn'] = field(default_factory=list)
     measures: List['TMDLMeasure'] = field(default_factory=list)
     partitions: List['TMDLPartition'] = field(default_factory=list)
+    hierarchies: List['TMDLHierarchy'] = field(default_factory=list)
+    calculation_group: Optional['TMDLCalculationGroup'] = None
     is_hidden: bool = False
+    is_calculated: bool = False
+    expression: str = ""
     
     def __post_init__(self):
         self.object_type = "Table"
@@ -73,13 +117,19 @@ class TMDLTable(TMDLObject):
 
 @dataclass
 class TMDLColumn(TMDLObject):
-    """Represents a TMDL column"""
+    """Represents a TMDL column
+    
+    ``column_type`` distinguishes DataColumn, CalculatedColumn and CalculatedTableColumn.
+    """
     data_type: str = ""
     is_hidden: bool = False
     is_key: bool = False
     format_string: str = ""
     sort_by_column: Optional[str] = None
     source_column: str = ""
+    display_folder: str = ""
+    column_type: str = "DataColumn"
+    expression: str = ""
     
     def __post_init__(self):
         self.object_type = "Column"
@@ -92,11 +142,28 @@ class TMDLMeasure(TMDLObject):
     format_string: str = ""
     is_hidden: bool = False
     display_folder: str = ""
+    kpi: Optional['TMDLKPI'] = None
     
     def __post_init__(self):
         self.object_type = "Measure"
 
 
+@dataclass
+class TMDLKPI(TMDLObject):
+    """Represents the KPI of a measure"""
+    target_expression: str = ""
+    status_expression: str = ""
+    trend_expression: str = ""
+    
+    def __post_init__(self):
+        self.object_type = "KPI"
+    
+    @property
+    def expression(self) -> str:
+        """All DAX expressions of the KPI, for expression-based checks"""
+        return '\n'.join(e for e in (self.target_expression, self.status_expression, self.trend_expression) if e)
+
+
 @dataclass
 class TMDLRelationship(TMDLObject):
     """Represents a TMDL relationship"""
@@ -115,14 +182,151 @@ class TMDLRelationship(TMDLObject):
 
 @dataclass
 class TMDLPartition(TMDLObject):
-    """Represents a TMDL partition"""
+    """Represents a TMDL partition
+    
+    ``query_span`` holds the (start, end) offsets of the source query in the table file.
+    """
     source_type: str = ""
     query: str = ""
+    query_span: Tuple[int, int] = (0, 0)
+    mode: str = ""
     
     def __post_init__(self):
         self.object_type = "Partition"
 
 
+@dataclass
+class TMDLLevel(TMDLObject):
+    """Represents a level of a hierarchy"""
+    column: str = ""
+    ordinal: int = 0
+    
+    def __post_init__(self):
+        self.object_type = "Level"
+
+
+@dataclass
+class TMDLHierarchy(TMDLObject):
+    """Represents a user hierarchy"""
+    levels: List[TMDLLevel] = field(default_factory=list)
+    is_hidden: bool = False
+    
+    def __post_init__(self):
+        self.object_type = "Hierarchy"
+
+
+@dataclass
+class TMDLCalculationItem(TMDLObject):
+    """Represents a calculation item of a calculation group"""
+    expression: str = ""
+    ordinal: int = 0
+    format_string_expression: str = ""
+    
+    def __post_init__(self):
+        self.object_type = "CalculationItem"
+
+
+@dataclass
+class TMDLCalculationGroup(TMDLObject):
+    """Represents the calculation group of a table"""
+    precedence: int = 0
+    calculation_items: List[TMDLCalculationItem] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self.object_type = "CalculationGroup"
+
+
+@dataclass
+class TMDLTablePermission(TMDLObject):
+    """Represents a role's row-level security filter on a table"""
+    expression: str = ""
+    
+    def __post_init__(self):
+        self.object_type = "TablePermission"
+
+
+@dataclass
+class TMDLRole(TMDLObject):
+    """Represents a model role (roles/*.tmdl)"""
+    model_permission: str = ""
+    table_permissions: List[TMDLTablePermission] = field(default_factory=list)
+    members: List[str] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self.object_type = "ModelRole"
+
+
+@dataclass
+class TMDLCulture(TMDLObject):
+    """Represents a culture file (cultures/*.tmdl)
+    
+    Culture files carry multi-megabyte linguistic schemas that few rules need, so they
+    are only indexed by path and size; ``loader`` reads and parses the file the first
+    time its linguistic metadata or translations are accessed.
+    """
+    size: int = 0
+    loader: Optional[Callable[[], Dict[str, Any]]] = field(default=None, repr=False, compare=False)
+    _parsed: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.object_type = "Culture"
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the culture file has been parsed"""
+        return self._parsed is not None
+    
+    def load(self) -> Dict[str, Any]:
+        """Parse the culture file if that hasn't happened yet"""
+        if self._parsed is None:
+            self._parsed = self.loader() if self.loader else {'linguistic_metadata': '', 'translations': {}}
+        return self._parsed
+    
+    @property
+    def linguistic_metadata(self) -> str:
+        """The linguistic schema (JSON) of the culture"""
+        return self.load()['linguistic_metadata']
+    
+    @property
+    def translations(self) -> Dict[str, Dict[str, str]]:
+        """Translated properties by object path, e.g. ``'table Sales/measure Revenue'``"""
+        return self.load()['translations']
+
+
+@dataclass
+class TMDLNode:
+    """A declaration in a TMDL file with its properties and child declarations
+    
+    Produced by ``TMDLParser.scan``. ``start`` and ``end`` are character offsets of the
+    whole block in the file; ``value_span`` and ``property_spans`` locate expressions.
+    """
+    keyword: str
+    name: str = ""
+    value: str = ""
+    value_span: Tuple[int, int] = (0, 0)
+    properties: Dict[str, str] = field(default_factory=dict)
+    property_spans: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    children: List['TMDLNode'] = field(default_factory=list)
+    start: int = 0
+    end: int = 0
+    description: str = ""
+    
+    def children_of(self, keyword: str) -> List['TMDLNode']:
+        """Child declarations with the given keyword"""
+        return [child for child in self.children if child.keyword == keyword]
+    
+    def child(self, keyword: str) -> Optional['TMDLNode']:
+        """First child declaration with the given keyword"""
+        for child in self.children:
+            if child.keyword == keyword:
+                return child
+        return None
+    
+    def flag(self, key: str) -> bool:
+        """Read a boolean property (``isHidden`` or ``isHidden: true``)"""
+        return self.properties.get(key, 'false').strip().lower() == 'true'
+
+
 @dataclass
 class Violation:
     """Represents a best practice rule violation"""
@@ -136,43 +340,738 @@ class Violation:
     file_path: str
     details: str = ""
     fix_suggestion: Optional[str] = None
+    table_name: str = ""
 
 
-class TMDLParser:
-    """Parser for TMDL files"""
+class SummaryAccumulator:
+    """Builds the analysis summary incrementally while violations are emitted
+    
+    The checker feeds every violation through ``add`` as it is produced, so the
+    summary never needs another pass over the violation list. Severity and
+    category totals are folded from the per-rule counts when ``build`` is called.
+    """
+    
+    def __init__(self, rules: List[BestPracticeRule]):
+        self.rules = rules
+        self.total = 0
+        self.by_rule: Dict[str, int] = {}
+        self.by_table: Dict[str, int] = {}
+        self.by_file: Dict[str, int] = {}
+        self.by_rule_object_type: Dict[str, Dict[str, int]] = {}
+        self.suppressed: Dict[str, int] = {}
+        self.evaluated_rules: Optional[set] = None
+        self.truncated_rules: List[str] = []
+        self.stopped_early = False
+    
+    def add(self, rule_id: str, object_type: str, table_name: str, file_path: str) -> None:
+        """Record a single violation"""
+        self.total += 1
+        self.by_rule[rule_id] = self.by_rule.get(rule_id, 0) + 1
+        
+        table = table_name or '(model)'
+        self.by_table[table] = self.by_table.get(table, 0) + 1
+        self.by_file[file_path] = self.by_file.get(file_path, 0) + 1
+        
+        object_types = self.by_rule_object_type.get(rule_id)
+        if object_types is None:
+            object_types = self.by_rule_object_type[rule_id] = {}
+        object_types[object_type] = object_types.get(object_type, 0) + 1
+    
+    def add_suppressed(self, rule_id: str, count: int) -> None:
+        """Record (rule, object) pairs skipped because of ignore annotations"""
+        if count:
+            self.suppressed[rule_id] = self.suppressed.get(rule_id, 0) + count
+    
+    def add_violation(self, violation: Violation) -> None:
+        """Record an already materialized violation"""
+        self.add(violation.rule_id, violation.object_type, violation.table_name, violation.file_path)
+    
+    # Collections counted in the summary's ``object_counts``
+    COUNTED_COLLECTIONS = (
+        'tables', 'measures', 'columns', 'relationships', 'calculated_tables', 'kpis', 'partitions',
+        'hierarchies', 'calculation_groups', 'calculation_items', 'roles', 'cultures'
+    )
+    
+    def build(self, objects: Dict[str, List[TMDLObject]],
+              projection: Optional['ParseProjection'] = None) -> Dict[str, Any]:
+        """Produce the summary dictionary from the accumulated counts
+        
+        ``object_counts`` leaves out the collections the parse ``projection`` skipped,
+        since their (empty) lists say nothing about the model.
+        """
+        by_severity: Dict[str, int] = {}
+        by_category: Dict[str, int] = {}
+        by_rule: Dict[str, Dict[str, Any]] = {}
+        all_rules = []
+        rules_with_violations = 0
+        
+        for rule in self.rules:
+            severity = rule.severity_level.name
+            count = self.by_rule.get(rule.id, 0)
+            
+            if count:
+                by_severity[severity] = by_severity.get(severity, 0) + count
+                by_category[rule.category] = by_category.get(rule.category, 0) + count
+                by_rule[rule.id] = {
+                    'count': count,
+                    'name': rule.name,
+                    'category': rule.category,
+                    'severity': severity
+                }
+                rules_with_violations += 1
+            
+            all_rules.append({
+                'id': rule.id,
+                'name': rule.name,
+                'category': rule.category,
+                'severity': severity,
+                'violation_count': count,
+                'has_violations': count > 0,
+                'suppressed_count': self.suppressed.get(rule.id, 0)
+            })
+        
+        summary = {
+            'object_counts': {
+                collection: len(objects.get(collection, []))
+                for collection in self.COUNTED_COLLECTIONS
+                if projection is None or projection.parses(collection)
+            },
+            'violations': {
+                'total': self.total,
+                'by_severity': by_severity,
+                'by_category': by_category,
+                'by_rule': by_rule,
+                'by_table': dict(self.by_table),
+                'by_file': dict(self.by_file),
+                'by_rule_object_type': {rule_id: dict(counts) for rule_id, counts in self.by_rule_object_type.items()},
+                'suppressed': {
+                    'total': sum(self.suppressed.values()),
+                    'by_rule': dict(self.suppressed)
+                }
+            },
+            'rules_checked': {
+                'total': len(self.rules),
+                'rules_with_violations': rules_with_violations,
+                'rules_without_violations': len(self.rules) - rules_with_violations,
+                'all_rules': all_rules
+            }
+        }
+        
+        # Fail-fast and top-N runs record which rules were actually evaluated
+        if self.evaluated_rules is not None:
+            for rule_info in all_rules:
+                rule_info['evaluated'] = rule_info['id'] in self.evaluated_rules
+            summary['rules_checked']['evaluated'] = len(self.evaluated_rules)
+            summary['early_exit'] = {
+                'stopped_early': self.stopped_early,
+                'truncated_rules': list(self.truncated_rules)
+            }
+        
+        return summary
+
+
+class IgnoreIndex:
+    """Rules suppressed through ``BestPracticeAnalyzer_IgnoreRules`` annotations
+    
+    Follows Tabular Editor's convention: an annotation on the model suppresses the
+    listed rules for every object, an annotation on any other object suppresses them
+    for that object only. The index is built once before checking so suppressed
+    (rule, object) pairs are skipped without being evaluated.
+    """
+    
+    ANNOTATION = 'BestPracticeAnalyzer_IgnoreRules'
     
     def __init__(self):
-        self.logger = logging.getLogger(__name__)
+        self.model_rules: Set[str] = set()
+        self.rule_objects: Dict[str, Set[Tuple[str, str, str]]] = {}
+    
+    @staticmethod
+    def object_key(obj: TMDLObject) -> Tuple[str, str, str]:
+        """Key identifying an object across the model"""
+        return (obj.object_type, obj.table_name, obj.name)
+    
+    @classmethod
+    def parse_rule_ids(cls, value: str) -> List[str]:
+        """Extract rule IDs from an annotation value such as ``{"RuleIDs":["RULE_A","RULE_B"]}``"""
+        try:
+            data = json.loads(value)
+            if isinstance(data, dict):
+                return [str(rule_id) for rule_id in data.get('RuleIDs', [])]
+        except ValueError:
+            pass
+        # Tolerate hand-edited values that are not valid JSON
+        return re.findall(r'"([A-Za-z0-9_]+)"', value.split('RuleIDs', 1)[-1])
+    
+    @classmethod
+    def from_objects(cls, objects: Dict[str, List[TMDLObject]]) -> 'IgnoreIndex':
+        """Build the index from the annotations of all parsed objects"""
+        index = cls()
+        seen = set()
+        for collection in objects.values():
+            for obj in collection:
+                if not obj.annotations or id(obj) in seen:
+                    continue
+                seen.add(id(obj))
+                value = obj.annotations.get(cls.ANNOTATION)
+                if value is None:
+                    continue
+                rule_ids = cls.parse_rule_ids(value)
+                if obj.object_type == "Model":
+                    index.model_rules.update(rule_ids)
+                else:
+                    key = cls.object_key(obj)
+                    for rule_id in rule_ids:
+                        index.rule_objects.setdefault(rule_id, set()).add(key)
+        return index
+    
+    def ignores_everywhere(self, rule_id: str) -> bool:
+        """Whether the model suppresses a rule for all objects"""
+        return rule_id in self.model_rules
+    
+    def suppressed_objects(self, rule_id: str) -> Set[Tuple[str, str, str]]:
+        """Keys of the objects that suppress a rule"""
+        return self.rule_objects.get(rule_id, set())
+    
+    def is_ignored(self, rule_id: str, obj: TMDLObject) -> bool:
+        """Whether a rule is suppressed for an object"""
+        return rule_id in self.model_rules or self.object_key(obj) in self.rule_objects.get(rule_id, ())
+
+
+class ViolationStore:
+    """Columnar, rule-normalized collection of violations
+    
+    Rule metadata (name, category, description, fix suggestion) is kept once per
+    rule and each violation is stored as a row in parallel arrays of rule index,
+    object index and severity. The store behaves like a read-only list of
+    ``Violation`` objects, which are materialized on access, so existing code that
+    iterates, indexes or slices the violations keeps working.
+    
+    Subsets returned by ``filter`` and the ``group_by_*`` helpers share the rule
+    and object tables of the store they were taken from.
+    
+    Parsed objects are registered once per object. Objects rebuilt from materialized
+    violations or records are registered once per (type, table, name, file path), so
+    an object with many violations is stored once either way.
+    """
+    
+    def __init__(self):
+        self.rules: List[BestPracticeRule] = []
+        self.objects: List[TMDLObject] = []
+        self.rule_properties: Dict[int, Dict[str, Any]] = {}
+        self.details: Dict[int, str] = {}
+        self.rule_indexes = array('I')
+        self.object_indexes = array('I')
+        self.severities = array('B')
+        self._rule_lookup: Dict[str, int] = {}
+        self._object_lookup: Dict[int, int] = {}
+        self._described_objects: Dict[Tuple[str, str, str, str], int] = {}
+    
+    def _subset(self, rows) -> 'ViolationStore':
+        """Create a store sharing this store's tables, holding only the given rows"""
+        subset = ViolationStore.__new__(ViolationStore)
+        subset.rules = self.rules
+        subset.objects = self.objects
+        subset.rule_properties = self.rule_properties
+        subset._rule_lookup = self._rule_lookup
+        subset._object_lookup = self._object_lookup
+        subset._described_objects = self._described_objects
+        subset.rule_indexes = array('I', (self.rule_indexes[i] for i in rows))
+        subset.object_indexes = array('I', (self.object_indexes[i] for i in rows))
+        subset.severities = array('B', (self.severities[i] for i in rows))
+        subset.details = {new: self.details[old] for new, old in enumerate(rows) if old in self.details}
+        return subset
+    
+    def add_rule(self, rule: BestPracticeRule) -> int:
+        """Register a rule and return its index"""
+        index = self._rule_lookup.get(rule.id)
+        if index is None:
+            index = self._rule_lookup[rule.id] = len(self.rules)
+            self.rules.append(rule)
+        return index
+    
+    def add_object(self, obj: TMDLObject) -> int:
+        """Register an object and return its index"""
+        key = id(obj)
+        index = self._object_lookup.get(key)
+        if index is None:
+            index = self._object_lookup[key] = len(self.objects)
+            self.objects.append(obj)
+        return index
+    
+    def add(self, rule_index: int, obj: TMDLObject, details: str = "") -> None:
+        """Append a violation of a registered rule by an object"""
+        self._append(rule_index, self.add_object(obj), details)
+    
+    def _append(self, rule_index: int, object_index: int, details: str) -> None:
+        if details:
+            self.details[len(self.rule_indexes)] = details
+        self.rule_indexes.append(rule_index)
+        self.object_indexes.append(object_index)
+        self.severities.append(self.rules[rule_index].severity)
+    
+    def add_violation(self, violation: Violation) -> None:
+        """Append a materialized violation, registering its rule and object"""
+        rule_index = self._rule_lookup.get(violation.rule_id)
+        if rule_index is None:
+            rule_index = self.add_rule(BestPracticeRule(
+                id=violation.rule_id,
+                name=violation.rule_name,
+                category=violation.category,
+                description=violation.description,
+                severity=violation.severity.value,
+                scope='',
+                expression='',
+                fix_expression=violation.fix_suggestion
+            ))
+        key = (violation.object_type, violation.table_name, violation.object_name, violation.file_path)
+        object_index = self._described_objects.get(key)
+        if object_index is None:
+            object_index = self._described_objects[key] = self.add_object(TMDLObject(
+                name=violation.object_name,
+                object_type=violation.object_type,
+                file_path=violation.file_path,
+                table_name=violation.table_name
+            ))
+        self._append(rule_index, object_index, violation.details)
     
-    def parse_model_directory(self, model_path: str) -> Dict[str, List[TMDLObject]]:
-        """Parse all TMDL files in a model directory"""
-        result = {
-            'tables': [],
-            'relationships': [],
-            'measures': [],
-            'columns': []
+    @classmethod
+    def from_violations(cls, violations) -> 'ViolationStore':
+        """Build a store from any iterable of Violation objects"""
+        if isinstance(violations, cls):
+            return violations
+        store = cls()
+        for violation in violations:
+            store.add_violation(violation)
+        return store
+    
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> 'ViolationStore':
+        """Build a store from violation dictionaries as produced by ``to_records``"""
+        store = cls()
+        for record in records:
+            store.add_violation(Violation(
+                rule_id=record['rule_id'],
+                rule_name=record['rule_name'],
+                category=record['category'],
+                severity=Severity[record['severity']],
+                description=record['description'],
+                object_name=record['object_name'],
+                object_type=record['object_type'],
+                file_path=record['file_path'],
+                fix_suggestion=record.get('fix_suggestion'),
+                table_name=record.get('table_name', '')
+            ))
+        return store
+    
+    def __len__(self) -> int:
+        return len(self.rule_indexes)
+    
+    def __iter__(self):
+        for row in range(len(self.rule_indexes)):
+            yield self.violation(row)
+    
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self._subset(range(*item.indices(len(self))))
+        if item < 0:
+            item += len(self)
+        return self.violation(item)
+    
+    def violation(self, row: int) -> Violation:
+        """Materialize the violation stored at a row"""
+        rule_index = self.rule_indexes[row]
+        rule = self.rules[rule_index]
+        obj = self.objects[self.object_indexes[row]]
+        violation = Violation(
+            rule_id=rule.id,
+            rule_name=rule.name,
+            category=rule.category,
+            severity=Severity(self.severities[row]),
+            description=rule.description,
+            object_name=obj.name,
+            object_type=obj.object_type,
+            file_path=obj.file_path,
+            details=self.details.get(row, ""),
+            fix_suggestion=rule.fix_expression,
+            table_name=obj.table_name
+        )
+        violation.properties = dict(self.rule_properties.get(rule_index, {}))
+        return violation
+    
+    def rule_of(self, row: int) -> BestPracticeRule:
+        """Return the rule violated at a row"""
+        return self.rules[self.rule_indexes[row]]
+    
+    def object_of(self, row: int) -> TMDLObject:
+        """Return the object that violates the rule at a row"""
+        return self.objects[self.object_indexes[row]]
+    
+    def set_rule_properties(self, rule_id: str, properties: Dict[str, Any]) -> None:
+        """Attach extra properties (e.g. AI explanations) to every violation of a rule"""
+        rule_index = self._rule_lookup.get(rule_id)
+        if rule_index is not None:
+            self.rule_properties.setdefault(rule_index, {}).update(properties)
+    
+    def filter(self, rule_id: Optional[str] = None, severity=None, category: Optional[str] = None,
+               table: Optional[str] = None, object_type: Optional[str] = None) -> 'ViolationStore':
+        """Return the violations matching all of the given criteria"""
+        allowed_rules = None
+        if rule_id is not None or category is not None:
+            allowed_rules = {
+                index for index, rule in enumerate(self.rules)
+                if (rule_id is None or rule.id == rule_id) and (category is None or rule.category == category)
+            }
+        if isinstance(severity, str):
+            severity = Severity[severity.upper()]
+        severity_value = severity.value if isinstance(severity, Severity) else severity
+        
+        allowed_objects = None
+        if table is not None or object_type is not None:
+            allowed_objects = {
+                index for index, obj in enumerate(self.objects)
+                if (table is None or obj.table_name == table) and (object_type is None or obj.object_type == object_type)
+            }
+        
+        rows = [
+            row for row in range(len(self.rule_indexes))
+            if (allowed_rules is None or self.rule_indexes[row] in allowed_rules)
+            and (severity_value is None or self.severities[row] == severity_value)
+            and (allowed_objects is None or self.object_indexes[row] in allowed_objects)
+        ]
+        return self._subset(rows)
+    
+    def _group(self, key_of_rule) -> Dict[Any, 'ViolationStore']:
+        """Group rows by a key derived from their rule, in order of first appearance"""
+        rule_keys = [key_of_rule(rule) for rule in self.rules]
+        groups: Dict[Any, List[int]] = {}
+        for row, rule_index in enumerate(self.rule_indexes):
+            key = rule_keys[rule_index]
+            rows = groups.get(key)
+            if rows is None:
+                rows = groups[key] = []
+            rows.append(row)
+        return {key: self._subset(rows) for key, rows in groups.items()}
+    
+    def group_by_rule(self) -> Dict[str, 'ViolationStore']:
+        """Group violations by rule ID"""
+        return self._group(lambda rule: rule.id)
+    
+    def group_by_category(self) -> Dict[str, 'ViolationStore']:
+        """Group violations by rule category"""
+        return self._group(lambda rule: rule.category)
+    
+    def record(self, row: int) -> Dict[str, Any]:
+        """Return a JSON-serializable dictionary for the violation at a row"""
+        rule_index = self.rule_indexes[row]
+        rule = self.rules[rule_index]
+        obj = self.objects[self.object_indexes[row]]
+        properties = self.rule_properties.get(rule_index, {})
+        return {
+            'rule_id': rule.id,
+            'rule_name': rule.name,
+            'category': rule.category,
+            'severity': Severity(self.severities[row]).name,
+            'description': rule.description,
+            'object_name': obj.name,
+            'object_type': obj.object_type,
+            'table_name': obj.table_name,
+            'file_path': obj.file_path,
+            'fix_suggestion': rule.fix_expression,
+            'ai_explanation': properties.get('ai_explanation', ''),
+            'ai_enhanced': properties.get('ai_enhanced', False)
         }
+    
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Return all violations as JSON-serializable dictionaries"""
+        return [self.record(row) for row in range(len(self.rule_indexes))]
+
+
+@dataclass
+class ParseProjection:
+    """Object collections and properties the selected rules need from the parser
+    
+    ``collections`` maps a collection name of the parsed model (``'measures'``,
+    ``'columns'``, ``'relationships'``) to the object properties that must be
+    extracted. ``None`` means everything is needed.
+    """
+    collections: Optional[Dict[str, Set[str]]] = None
+    
+    # Collections filled from every table file whatever the projection asks for
+    ALWAYS_PARSED = frozenset({'model', 'tables', 'calculated_tables', 'partitions'})
+    
+    def wants(self, collection: str) -> bool:
+        """Whether any object of a collection is needed"""
+        return self.collections is None or collection in self.collections
+    
+    def parses(self, collection: str) -> bool:
+        """Whether the parser fills a collection completely under this projection"""
+        return collection in self.ALWAYS_PARSED or self.wants(collection)
+    
+    def wants_property(self, collection: str, prop: str) -> bool:
+        """Whether a property of a collection's objects is needed"""
+        if self.collections is None:
+            return True
+        return prop in self.collections.get(collection, ())
+    
+    def cache_key(self) -> Optional[Tuple[Tuple[str, Tuple[str, ...]], ...]]:
+        """Hashable form of the projection, for caching parse results"""
+        if self.collections is None:
+            return None
+        return tuple(sorted((name, tuple(sorted(props))) for name, props in self.collections.items()))
+
+
+# Version of the parser's output: bump it whenever parsing or the TMDL object classes
+# change, so parses and results cached on disk by an older version are not reused
+PARSER_VERSION = 1
+
+# Object classes that parsed files may contain, by name (see encode_parsed)
+PARSED_TYPES = {cls.__name__: cls for cls in (
+    TMDLModel, TMDLTable, TMDLColumn, TMDLMeasure, TMDLKPI, TMDLRelationship, TMDLPartition, TMDLLevel,
+    TMDLHierarchy, TMDLCalculationItem, TMDLCalculationGroup, TMDLTablePermission, TMDLRole
+)}
+
+
+def encode_parsed(parsed: Any) -> Any:
+    """JSON-ready, data-only form of a parsed file (objects, lists, tuples, dicts, scalars)
+    
+    Objects are written as ``{"__object__": class name, "fields": {...}}`` without their
+    ``parent``, which decode_parsed restores from the containing object.
+    """
+    if isinstance(parsed, TMDLObject):
+        type_name = type(parsed).__name__
+        if type_name not in PARSED_TYPES:
+            raise TypeError(f"{type_name} objects can't be cached")
+        values = {f.name: encode_parsed(getattr(parsed, f.name)) for f in fields(parsed)
+                  if f.init and f.name != 'parent'}
+        return {'__object__': type_name, 'fields': values}
+    if isinstance(parsed, tuple):
+        return {'__tuple__': [encode_parsed(item) for item in parsed]}
+    if isinstance(parsed, list):
+        return [encode_parsed(item) for item in parsed]
+    if isinstance(parsed, dict):
+        return {str(key): encode_parsed(value) for key, value in parsed.items()}
+    if parsed is None or isinstance(parsed, (str, int, float, bool)):
+        return parsed
+    raise TypeError(f"{type(parsed).__name__} values can't be cached")
+
+
+def decode_parsed(data: Any, parent: Optional[TMDLObject] = None) -> Any:
+    """Rebuild a parsed file from encode_parsed output; only known object classes are created"""
+    if isinstance(data, list):
+        return [decode_parsed(item, parent) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if '__tuple__' in data:
+        return tuple(decode_parsed(item, parent) for item in data['__tuple__'])
+    if '__object__' not in data:
+        return {key: decode_parsed(value, parent) for key, value in data.items()}
+    
+    cls = PARSED_TYPES.get(data['__object__'])
+    if cls is None:
+        raise ValueError(f"Unknown object type in cached parse: {data['__object__']}")
+    values = data['fields']
+    obj = cls(name=values['name'], object_type=values['object_type'], parent=parent)
+    for name, value in values.items():
+        if name not in ('name', 'object_type'):
+            setattr(obj, name, decode_parsed(value, obj))
+    return obj
+
+
+class ParseCache:
+    """Parsed files by content digest, path and projection, shared by analyses
+    
+    Entries are bounded by the total size of the source files they were parsed from and
+    evicted least recently used first. Cached objects are shared between analyses, so
+    nothing may modify parsed objects after parsing.
+    
+    With a ``shared`` cache (see shared_cache.SharedCache), parsed files are also stored
+    on disk for other processes. Those entries are keyed by parser version, content,
+    kind and projection only; a file parsed under another path has its objects'
+    ``file_path`` rewritten. They are stored as JSON (see encode_parsed), not pickled:
+    reading another process's entry only creates the object classes in PARSED_TYPES.
+    Keys are ``(digest, file_path, kind, projection key)``.
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, shared: Optional['SharedCache'] = None):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._entries: 'OrderedDict[Tuple, Tuple[Any, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                record_cache_lookup('parse', True)
+                return entry[0]
         
-        self.logger.info(f"Looking for definition folder in: {model_path}")
-        
-        definition_path = os.path.join(model_path, 'definition')
-        if not os.path.exists(definition_path):
-            # Try to find definition folder in subdirectories (for uploaded files)
-            found_definition = False
-            for root, dirs, files in os.walk(model_path):
-                if 'definition' in dirs:
-                    definition_path = os.path.join(root, 'definition')
-                    self.logger.info(f"Found definition folder at: {definition_path}")
-                    found_definition = True
-                    break
-            
-            if not found_definition:
+        parsed = self._get_shared(key)
+        with self._lock:
+            if parsed is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache_lookup('parse', parsed is not None)
+        return parsed
+    
+    def put(self, key: Tuple, parsed: Any, size: int) -> None:
+        if parsed is None or size > self.max_bytes:
+            return
+        self._put_local(key, parsed, size)
+        if self.shared is not None:
+            try:
+                value = json.dumps({'file_path': key[1], 'size': size, 'parsed': encode_parsed(parsed)},
+                                   separators=(',', ':')).encode('utf-8')
+            except (TypeError, ValueError) as e:
+                self.logger.warning(f"Parsed {key[2]} {key[1]} can't be stored in the shared cache: {e}")
+                return
+            self.shared.put('parse', self._shared_key(key), value)
+    
+    def _put_local(self, key: Tuple, parsed: Any, size: int) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (parsed, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+    
+    @staticmethod
+    def _shared_key(key: Tuple) -> str:
+        digest, _, kind, projection_key = key
+        return f"v{PARSER_VERSION}:{digest}:{kind}:{projection_key!r}"
+    
+    def _get_shared(self, key: Tuple) -> Optional[Any]:
+        """Load a parse from the shared cache into memory, moved to the key's path"""
+        if self.shared is None:
+            return None
+        value = self.shared.get('parse', self._shared_key(key))
+        if value is None:
+            return None
+        try:
+            entry = json.loads(value)
+            file_path, size, parsed = entry['file_path'], entry['size'], decode_parsed(entry['parsed'])
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable shared cache entry for {key[1]}: {e}")
+            return None
+        if file_path != key[1]:
+            self._move(parsed, file_path, key[1])
+        self._put_local(key, parsed, size)
+        return parsed
+    
+    @staticmethod
+    def _move(parsed: Any, old_path: str, new_path: str) -> None:
+        """Point the ``file_path`` of every parsed object from ``old_path`` to ``new_path``"""
+        seen = set()
+        pending = [parsed]
+        while pending:
+            item = pending.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            if isinstance(item, (list, tuple)):
+                pending.extend(item)
+            elif isinstance(item, dict):
+                pending.extend(item.values())
+            elif isinstance(item, TMDLObject):
+                if item.file_path == old_path:
+                    item.file_path = new_path
+                pending.extend(value for name, value in vars(item).items() if name != 'parent')
+
+
+class TMDLParser:
+    """Parser for TMDL files
+    
+    TMDL is indentation based: a declaration owns the lines below it that are indented
+    deeper than itself. ``scan`` turns a file into a tree of ``TMDLNode`` declarations in
+    a single pass over its lines, and the ``parse_*`` methods build typed objects from it.
+    """
+    
+    # Declarations that take no name
+    NAMELESS_OBJECTS = {'kpi', 'calculationGroup', 'translations'}
+    
+    # Collections returned by parse_model_directory, each indexing one object type
+    COLLECTIONS = (
+        'model', 'tables', 'calculated_tables', 'columns', 'data_columns', 'calculated_columns',
+        'calculated_table_columns', 'measures', 'kpis', 'partitions', 'hierarchies', 'levels',
+        'calculation_groups', 'calculation_items', 'relationships', 'roles', 'table_permissions', 'cultures'
+    )
+    COLUMN_COLLECTIONS = {
+        'DataColumn': 'data_columns',
+        'CalculatedColumn': 'calculated_columns',
+        'CalculatedTableColumn': 'calculated_table_columns'
+    }
+    
+    # TMDL properties copied onto object attributes: (attribute, TMDL property)
+    COLUMN_PROPERTIES = (('data_type', 'dataType'), ('format_string', 'formatString'),
+                         ('source_column', 'sourceColumn'), ('sort_by_column', 'sortByColumn'),
+                         ('display_folder', 'displayFolder'))
+    COLUMN_FLAGS = (('is_hidden', 'isHidden'), ('is_key', 'isKey'))
+    MEASURE_PROPERTIES = (('format_string', 'formatString'), ('display_folder', 'displayFolder'))
+    MEASURE_FLAGS = (('is_hidden', 'isHidden'),)
+    
+    PROPERTY_PATTERN = re.compile(r'([A-Za-z_]\w*)\s*:\s*(.*)$')
+    EXPRESSION_PROPERTY_PATTERN = re.compile(r'([A-Za-z_]\w*)\s*=\s*(.*)$')
+    DECLARATION_PATTERN = re.compile(r'([A-Za-z_]\w*)\s+(.*)$')
+    BARE_PROPERTY_PATTERN = re.compile(r'[A-Za-z_]\w*$')
+    QUALIFIED_NAME_PATTERN = re.compile(r"\s*('(?:[^']|'')*'|[^.]+)\.(.+)$")
+    
+    def __init__(self, parse_cache: Optional[ParseCache] = None):
+        """With a ``parse_cache``, files are parsed once per content and reused by later
+        parses; the digest comes from the model file system (see ModelFS.digest) or from
+        hashing the file as it is read"""
+        self.logger = logging.getLogger(__name__)
+        self.parse_cache = parse_cache
+    
+    def parse_model_directory(self, model_path: str, projection: Optional[ParseProjection] = None,
+                              cancel: Optional[CancellationToken] = None) -> Dict[str, List[TMDLObject]]:
+        """Parse all TMDL files in a model directory on disk"""
+        return self.parse_model(DirectoryFS(model_path), '', projection, cancel)
+    
+    def parse_model(self, fs: ModelFS, model_path: str = '', projection: Optional[ParseProjection] = None,
+                    cancel: Optional[CancellationToken] = None) -> Dict[str, List[TMDLObject]]:
+        """Parse all TMDL files of a model held in a model file system
+        
+        ``model_path`` is the model folder within ``fs`` (a folder on disk, an archive or
+        in-memory files, see model_fs). The file system is passed along rather than kept
+        on the parser, so one parser can parse several models at the same time.
+        
+        Returns one list per object type (see ``COLLECTIONS``); objects link to their
+        containing object through ``parent``. When a projection is given, only the
+        collections and properties it asks for are parsed.
+        
+        With a ``cancel`` token, parsing raises AnalysisCancelled before the next table or
+        role file once the token is cancelled.
+        """
+        if projection is None:
+            projection = ParseProjection()
+        
+        result = {collection: [] for collection in self.COLLECTIONS}
+        
+        self.logger.info(f"Looking for definition folder in: {fs.display_path(model_path)}")
+        
+        definition_path = fs.join(model_path, 'definition')
+        if not fs.isdir(definition_path):
+            # Try to find the model folder in subdirectories (uploads, PBIP projects with a
+            # .Report folder that also has a definition folder)
+            model_root = find_model_root(fs, model_path)
+            if model_root is not None:
+                definition_path = fs.join(model_root, 'definition')
+                self.logger.info(f"Found definition folder at: {fs.display_path(definition_path)}")
+            else:
                 # List directory contents for debugging
                 contents = []
                 try:
-                    for item in os.listdir(model_path):
-                        item_path = os.path.join(model_path, item)
-                        if os.path.isdir(item_path):
+                    for item in sorted(fs.listdir(model_path)):
+                        if fs.isdir(fs.join(model_path, item)):
                             contents.append(f"📁 {item}/")
                         else:
                             contents.append(f"📄 {item}")
@@ -181,288 +1080,957 @@ class TMDLParser:
                 
                 contents_str = '\n'.join(contents)
                 raise FileNotFoundError(
-                    f"Definition folder not found in: {model_path}\n"
+                    f"Definition folder not found in: {fs.display_path(model_path)}\n"
                     f"Directory contents:\n{contents_str}\n\n"
                     f"Expected: A .SemanticModel folder with a 'definition' subfolder containing TMDL files."
                 )
         
-        self.logger.info(f"Using definition path: {definition_path}")
+        self.logger.info(f"Using definition path: {fs.display_path(definition_path)}")
+        
+        # Parse the model file (model-level annotations such as ignored rules)
+        model_file = fs.join(definition_path, 'model.tmdl')
+        if fs.isfile(model_file):
+            model = self._parse_fs_file(fs, model_file, self.parse_model_content, "model file")
+            if model:
+                result['model'].append(model)
         
         # Parse tables
-        tables_path = os.path.join(definition_path, 'tables')
-        if os.path.exists(tables_path):
-            for file_name in os.listdir(tables_path):
-                if file_name.endswith('.tmdl'):
-                    file_path = os.path.join(tables_path, file_name)
-                    table = self.parse_table_file(file_path)
-                    if table:
-                        result['tables'].append(table)
-                        result['measures'].extend(table.measures)
-                        result['columns'].extend(table.columns)
+        for file_path in self._tmdl_files(fs, fs.join(definition_path, 'tables')):
+            if cancel is not None:
+                cancel.check()
+            table = self._parse_fs_file(
+                fs, file_path, lambda content, path: self.parse_table_content(content, path, projection), "table file",
+                projection=projection
+            )
+            if table:
+                self._index_table(result, table)
         
         # Parse relationships
-        relationships_file = os.path.join(definition_path, 'relationships.tmdl')
-        if os.path.exists(relationships_file):
-            relationships = self.parse_relationships_file(relationships_file)
+        relationships_file = fs.join(definition_path, 'relationships.tmdl')
+        if projection.wants('relationships') and fs.isfile(relationships_file):
+            relationships = self._parse_fs_file(
+                fs, relationships_file, self.parse_relationships_content, "relationships file", []
+            )
             result['relationships'].extend(relationships)
         
+        # Parse roles
+        if projection.wants('roles'):
+            for file_path in self._tmdl_files(fs, fs.join(definition_path, 'roles')):
+                if cancel is not None:
+                    cancel.check()
+                role = self._parse_fs_file(fs, file_path, self.parse_role_content, "role file")
+                if role:
+                    result['roles'].append(role)
+                    result['table_permissions'].extend(role.table_permissions)
+        
+        # Index culture files by path and size; they are parsed on first access
+        if projection.wants('cultures'):
+            for file_path in self._tmdl_files(fs, fs.join(definition_path, 'cultures')):
+                result['cultures'].append(self.index_culture_file(fs, file_path))
+        
         return result
     
-    def parse_table_file(self, file_path: str) -> Optional[TMDLTable]:
-        """Parse a single table TMDL file"""
+    @staticmethod
+    def _tmdl_files(fs: ModelFS, folder: str) -> List[str]:
+        """Paths of the TMDL files directly inside a folder, if it exists"""
+        if not fs.isdir(folder):
+            return []
+        return [fs.join(folder, name) for name in sorted(fs.listdir(folder)) if name.endswith('.tmdl')]
+    
+    def _parse_fs_file(self, fs: ModelFS, path: str, parse: Callable[[str, str], Any],
+                       kind: str, default: Any = None, projection: Optional[ParseProjection] = None) -> Any:
+        """Read a file from a model file system and parse its content, logging failures
+        
+        ``projection`` is the projection ``parse`` applies, if any; it is part of the
+        parse cache key.
+        """
+        file_path = fs.display_path(path)
+        if self.parse_cache is None:
+            try:
+                return parse(fs.read_text(path), file_path)
+            except Exception as e:
+                self.logger.error(f"Error parsing {kind} {file_path}: {e}")
+                return default
+        
+        # Files without a known digest (e.g. on disk) are hashed as they are read
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            digest = fs.digest(path)
+            data = None if digest else fs.read_bytes(path)
+            digest = digest or hashlib.sha256(data).hexdigest()
+            cache_key = (digest, file_path, kind, projection.cache_key() if projection else None)
+            parsed = self.parse_cache.get(cache_key)
+            if parsed is not None:
+                return parsed
             
-            # Extract table name
-            table_match = re.search(r'table\s+([^\s\r\n]+)', content)
-            if not table_match:
-                return None
+            content = (fs.read_bytes(path) if data is None else data).decode('utf-8')
+            parsed = parse(content, file_path)
+        except Exception as e:
+            self.logger.error(f"Error parsing {kind} {file_path}: {e}")
+            return default
+        
+        self.parse_cache.put(cache_key, parsed, len(content))
+        return parsed
+    
+    def _index_table(self, result: Dict[str, List[TMDLObject]], table: 'TMDLTable') -> None:
+        """Add a parsed table and everything it contains to the per-type collections"""
+        result['tables'].append(table)
+        if table.is_calculated:
+            result['calculated_tables'].append(table)
+        
+        result['columns'].extend(table.columns)
+        for column in table.columns:
+            result[self.COLUMN_COLLECTIONS[column.column_type]].append(column)
+        
+        result['measures'].extend(table.measures)
+        result['kpis'].extend(measure.kpi for measure in table.measures if measure.kpi)
+        result['partitions'].extend(table.partitions)
+        
+        result['hierarchies'].extend(table.hierarchies)
+        for hierarchy in table.hierarchies:
+            result['levels'].extend(hierarchy.levels)
+        
+        if table.calculation_group:
+            result['calculation_groups'].append(table.calculation_group)
+            result['calculation_items'].extend(table.calculation_group.calculation_items)
+    
+    def scan(self, content: str, skip_keywords: Set[str] = frozenset()) -> List[TMDLNode]:
+        """Scan TMDL content into a tree of declarations
+        
+        Declarations whose keyword is in ``skip_keywords`` are stepped over together with
+        everything nested under them, without building nodes or expressions for them.
+        """
+        lines = content.splitlines(keepends=True)
+        offsets = []
+        position = 0
+        for line in lines:
+            offsets.append(position)
+            position += len(line)
+        
+        roots: List[TMDLNode] = []
+        stack: List[Tuple[int, TMDLNode]] = []
+        description: List[str] = []
+        count = len(lines)
+        i = 0
+        
+        while i < count:
+            line = lines[i]
+            text = line.strip()
+            if not text:
+                i += 1
+                continue
             
-            table_name = table_match.group(1)
-            table = TMDLTable(name=table_name, object_type="Table", content=content, file_path=file_path)
+            width = self._indent_width(line)
+            while stack and stack[-1][0] >= width:
+                stack.pop()[1].end = offsets[i]
+            parent = stack[-1][1] if stack else None
             
-            # Parse measures
-            table.measures = self._parse_measures(content, table_name, file_path)
+            # Descriptions (///) belong to the declaration that follows them
+            if text.startswith('///'):
+                description.append(text[3:].strip())
+                i += 1
+                continue
             
-            # Parse columns
-            table.columns = self._parse_columns(content, table_name, file_path)
+            # Property: "dataType: double"
+            match = self.PROPERTY_PATTERN.match(text)
+            if match:
+                if parent is not None:
+                    parent.properties[match.group(1)] = match.group(2).strip()
+                i += 1
+                continue
             
-            # Parse table properties
-            table.is_hidden = 'isHidden: true' in content
+            # Expression property: "source = ..." (inline or on the following lines)
+            match = self.EXPRESSION_PROPERTY_PATTERN.match(text)
+            if match:
+                value, span, i = self._read_expression(content, lines, offsets, i, width, match.group(2).strip())
+                if parent is not None:
+                    parent.properties[match.group(1)] = value
+                    parent.property_spans[match.group(1)] = span
+                continue
             
-            return table
+            match = self.DECLARATION_PATTERN.match(text)
+            if match:
+                keyword, rest = match.groups()
+            elif text in self.NAMELESS_OBJECTS:
+                keyword, rest = text, ''
+            else:
+                # Bare boolean property: "isHidden"
+                if parent is not None and self.BARE_PROPERTY_PATTERN.match(text):
+                    parent.properties[text] = 'true'
+                i += 1
+                continue
+            
+            if keyword in skip_keywords:
+                i += 1
+                while i < count and (not lines[i].strip() or self._indent_width(lines[i]) > width):
+                    i += 1
+                description = []
+                continue
+            
+            name, value = self._split_declaration(rest)
+            node = TMDLNode(keyword=keyword, name=name, start=offsets[i], description='\n'.join(description))
+            description = []
+            if value is None:
+                i += 1
+            else:
+                node.value, node.value_span, i = self._read_expression(content, lines, offsets, i, width, value)
             
+            (parent.children if parent is not None else roots).append(node)
+            stack.append((width, node))
+        
+        for _, node in stack:
+            node.end = len(content)
+        
+        return roots
+    
+    @staticmethod
+    def _indent_width(line: str) -> int:
+        """Width of a line's indentation, counting a tab as four spaces"""
+        indent = len(line) - len(line.lstrip(' \t'))
+        return indent + 3 * line.count('\t', 0, indent)
+    
+    @staticmethod
+    def _split_declaration(rest: str) -> Tuple[str, Optional[str]]:
+        """Split "Name = expression" (name optionally quoted) into name and expression"""
+        if rest[:1] in ("'", '"'):
+            quote = rest[0]
+            chars = []
+            position = 1
+            while position < len(rest):
+                if rest[position] == quote:
+                    if rest[position + 1:position + 2] == quote:
+                        chars.append(quote)
+                        position += 2
+                        continue
+                    break
+                chars.append(rest[position])
+                position += 1
+            name = ''.join(chars)
+            remainder = rest[position + 1:].strip()
+        elif '=' in rest:
+            name, remainder = rest.split('=', 1)
+            name = name.strip()
+            remainder = '=' + remainder
+        else:
+            return rest.strip(), None
+        
+        if remainder.startswith('='):
+            return name, remainder[1:].strip()
+        return name, None
+    
+    def _read_expression(self, content: str, lines: List[str], offsets: List[int], i: int,
+                         width: int, value: str) -> Tuple[str, Tuple[int, int], int]:
+        """Read the expression that follows ``=`` on line ``i``
+        
+        The expression is either inline, fenced with ```, or made of the following lines
+        indented deeper than the declaration (blank lines included). Returns the
+        expression, its (start, end) offsets in the content and the index of the next line.
+        """
+        line_end = offsets[i] + len(lines[i].rstrip())
+        
+        if value.startswith('```'):
+            start = line_end - len(value) + 3
+            end = content.find('```', start)
+            if end < 0:
+                end = len(content)
+            next_line = i + 1
+            while next_line < len(lines) and offsets[next_line] <= end:
+                next_line += 1
+            return textwrap.dedent(content[start:end]).strip(), (start, end), next_line
+        
+        if value:
+            return value, (line_end - len(value), line_end), i + 1
+        
+        first = i + 1
+        while first < len(lines) and not lines[first].strip():
+            first += 1
+        if first >= len(lines) or self._indent_width(lines[first]) <= width:
+            return '', (line_end, line_end), i + 1
+        
+        expression_width = self._indent_width(lines[first])
+        last = first
+        position = first + 1
+        while position < len(lines):
+            if lines[position].strip():
+                if self._indent_width(lines[position]) < expression_width:
+                    break
+                last = position
+            position += 1
+        
+        start = offsets[first]
+        end = offsets[last] + len(lines[last].rstrip())
+        return textwrap.dedent(content[start:end]).strip(), (start, end), last + 1
+    
+    @classmethod
+    def _split_qualified_name(cls, reference: str) -> Tuple[str, str]:
+        """Split a "Table.Column" reference (either part optionally quoted)"""
+        match = cls.QUALIFIED_NAME_PATTERN.match(reference)
+        if not match:
+            return '', ''
+        return cls._unquote(match.group(1)), cls._unquote(match.group(2))
+    
+    @staticmethod
+    def _unquote(name: str) -> str:
+        """Remove TMDL name quoting"""
+        name = name.strip()
+        if len(name) >= 2 and name[0] == name[-1] == "'":
+            return name[1:-1].replace("''", "'")
+        return name
+    
+    @staticmethod
+    def _annotations(node: TMDLNode) -> Dict[str, str]:
+        """Annotations declared directly on a node"""
+        return {child.name: child.value for child in node.children if child.keyword == 'annotation'}
+    
+    @staticmethod
+    def _to_int(value: Any, default: int = 0) -> int:
+        """Parse an integer property, falling back to a default"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+    
+    @staticmethod
+    def _assign(obj: TMDLObject, collection: str, projection: ParseProjection, node: TMDLNode,
+                properties: Tuple = (), flags: Tuple = ()) -> None:
+        """Copy the TMDL properties the projection asks for onto object attributes"""
+        for attr, key in properties:
+            if key in node.properties and projection.wants_property(collection, attr):
+                setattr(obj, attr, node.properties[key])
+        for attr, key in flags:
+            if projection.wants_property(collection, attr):
+                setattr(obj, attr, node.flag(key))
+    
+    def _read_file(self, file_path: str) -> str:
+        """Read a TMDL file"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def parse_model_file(self, file_path: str) -> Optional[TMDLModel]:
+        """Parse the model.tmdl file"""
+        try:
+            return self.parse_model_content(self._read_file(file_path), file_path)
+        except Exception as e:
+            self.logger.error(f"Error parsing model file {file_path}: {e}")
+            return None
+    
+    def parse_model_content(self, content: str, file_path: str) -> Optional[TMDLModel]:
+        """Parse the content of a model.tmdl file"""
+        model_node = next((node for node in self.scan(content, {'ref'}) if node.keyword == 'model'), None)
+        if model_node is None:
+            return None
+        
+        return TMDLModel(
+            name=model_node.name or 'Model',
+            object_type="Model",
+            properties=model_node.properties,
+            content=content,
+            file_path=file_path,
+            annotations=self._annotations(model_node),
+            culture=model_node.properties.get('culture', '')
+        )
+    
+    def parse_table_file(self, file_path: str, projection: Optional[ParseProjection] = None) -> Optional[TMDLTable]:
+        """Parse a single table TMDL file"""
+        try:
+            return self.parse_table_content(self._read_file(file_path), file_path, projection)
         except Exception as e:
             self.logger.error(f"Error parsing table file {file_path}: {e}")
             return None
     
-    def _parse_measures(self, content: str, table_name: str, file_path: str) -> List[TMDLMeasure]:
-        """Parse measures from table content"""
-        measures = []
+    def parse_table_content(self, content: str, file_path: str,
+                            projection: Optional[ParseProjection] = None) -> Optional[TMDLTable]:
+        """Parse the content of a table TMDL file into a table and its child objects"""
+        if projection is None:
+            projection = ParseProjection()
         
-        # Find all measure definitions
-        measure_pattern = r'measure\s+([\'"]?)([^\'"\r\n]+)\1\s*=\s*(.*?)(?=\n\s*(?:measure|column|partition|annotation|\Z))'
+        # Step over whole blocks the projection doesn't need
+        skip = set()
+        if not projection.wants('measures'):
+            skip.add('measure')
+        if not projection.wants('columns'):
+            skip.add('column')
+        if not projection.wants('hierarchies'):
+            skip.add('hierarchy')
+        if not projection.wants('calculation_groups'):
+            skip.add('calculationGroup')
         
-        for match in re.finditer(measure_pattern, content, re.DOTALL | re.MULTILINE):
-            measure_name = match.group(2).strip()
-            measure_content = match.group(3).strip()
-            
-            measure = TMDLMeasure(
-                name=measure_name,
-                object_type="Measure",
-                content=measure_content,
-                file_path=file_path
-            )
-            
-            # Extract expression (DAX code)
-            expr_match = re.search(r'```(.*?)```', measure_content, re.DOTALL)
-            if expr_match:
-                measure.expression = expr_match.group(1).strip()
-            else:
-                # Single line expression
-                lines = measure_content.split('\n')
-                if lines:
-                    measure.expression = lines[0].strip()
-            
-            # Extract format string
-            format_match = re.search(r'formatString:\s*([^\r\n]+)', measure_content)
-            if format_match:
-                measure.format_string = format_match.group(1).strip()
-            
-            # Extract display folder
-            folder_match = re.search(r'displayFolder:\s*([^\r\n]+)', measure_content)
-            if folder_match:
-                measure.display_folder = folder_match.group(1).strip()
-            
-            measures.append(measure)
+        table_node = next((node for node in self.scan(content, skip) if node.keyword == 'table'), None)
+        if table_node is None:
+            return None
         
-        return measures
-    
-    def _parse_columns(self, content: str, table_name: str, file_path: str) -> List[TMDLColumn]:
-        """Parse columns from table content"""
-        columns = []
+        table_name = table_node.name
+        table = TMDLTable(
+            name=table_name,
+            object_type="Table",
+            properties=table_node.properties,
+            content=content,
+            file_path=file_path,
+            table_name=table_name,
+            annotations=self._annotations(table_node),
+            is_hidden=table_node.flag('isHidden')
+        )
         
-        # Find all column definitions
-        column_pattern = r'column\s+([\'"]?)([^\'"\r\n]+)\1\s*(.*?)(?=\n\s*(?:measure|column|partition|annotation|\Z))'
+        def child_object(cls, node, parent, **fields):
+            return cls(
+                name=node.name,
+                object_type="",
+                properties=node.properties,
+                content=content[node.start:node.end],
+                file_path=file_path,
+                table_name=table_name,
+                annotations=self._annotations(node),
+                parent=parent,
+                **fields
+            )
         
-        for match in re.finditer(column_pattern, content, re.DOTALL | re.MULTILINE):
-            column_name = match.group(2).strip()
-            column_content = match.group(3).strip()
-            
-            column = TMDLColumn(
-                name=column_name,
-                object_type="Column",
-                content=column_content,
-                file_path=file_path
+        # Partitions first: a calculated partition makes this a calculated table
+        for node in table_node.children_of('partition'):
+            partition = child_object(
+                TMDLPartition, node, table,
+                source_type=node.value,
+                mode=node.properties.get('mode', ''),
+                query_span=node.property_spans.get('source', (0, 0))
             )
+            if projection.wants_property('partitions', 'query'):
+                partition.query = node.properties.get('source', '')
+            table.partitions.append(partition)
             
-            # Extract data type
-            datatype_match = re.search(r'dataType:\s*([^\r\n]+)', column_content)
-            if datatype_match:
-                column.data_type = datatype_match.group(1).strip()
-            
-            # Extract format string
-            format_match = re.search(r'formatString:\s*([^\r\n]+)', column_content)
-            if format_match:
-                column.format_string = format_match.group(1).strip()
-            
-            # Extract source column
-            source_match = re.search(r'sourceColumn:\s*([^\r\n]+)', column_content)
-            if source_match:
-                column.source_column = source_match.group(1).strip()
-            
-            # Check if hidden
-            column.is_hidden = 'isHidden: true' in column_content
-            
-            # Check if key
-            column.is_key = 'isKey: true' in column_content
+            if partition.source_type == 'calculated':
+                table.is_calculated = True
+                table.expression = node.properties.get('source', '')
+        
+        default_column_type = 'CalculatedTableColumn' if table.is_calculated else 'DataColumn'
+        for node in table_node.children_of('column'):
+            column = child_object(
+                TMDLColumn, node, table,
+                column_type='CalculatedColumn' if node.value else default_column_type
+            )
+            if projection.wants_property('columns', 'expression'):
+                column.expression = node.value
+            self._assign(column, 'columns', projection, node, self.COLUMN_PROPERTIES, self.COLUMN_FLAGS)
+            table.columns.append(column)
+        
+        for node in table_node.children_of('measure'):
+            measure = child_object(TMDLMeasure, node, table)
+            if projection.wants_property('measures', 'expression'):
+                measure.expression = node.value
+            self._assign(measure, 'measures', projection, node, self.MEASURE_PROPERTIES, self.MEASURE_FLAGS)
             
-            columns.append(column)
+            kpi_node = node.child('kpi')
+            if kpi_node is not None and projection.wants('kpis'):
+                kpi_node.name = measure.name
+                measure.kpi = child_object(
+                    TMDLKPI, kpi_node, measure,
+                    target_expression=kpi_node.properties.get('targetExpression', ''),
+                    status_expression=kpi_node.properties.get('statusExpression', ''),
+                    trend_expression=kpi_node.properties.get('trendExpression', '')
+                )
+            table.measures.append(measure)
+        
+        for node in table_node.children_of('hierarchy'):
+            hierarchy = child_object(TMDLHierarchy, node, table, is_hidden=node.flag('isHidden'))
+            for ordinal, level_node in enumerate(node.children_of('level')):
+                hierarchy.levels.append(child_object(
+                    TMDLLevel, level_node, hierarchy,
+                    column=level_node.properties.get('column', ''),
+                    ordinal=self._to_int(level_node.properties.get('ordinal'), ordinal)
+                ))
+            table.hierarchies.append(hierarchy)
         
-        return columns
+        group_node = table_node.child('calculationGroup')
+        if group_node is not None:
+            group_node.name = table_name
+            group = child_object(
+                TMDLCalculationGroup, group_node, table,
+                precedence=self._to_int(group_node.properties.get('precedence'))
+            )
+            for ordinal, item_node in enumerate(group_node.children_of('calculationItem')):
+                item = child_object(
+                    TMDLCalculationItem, item_node, group,
+                    ordinal=self._to_int(item_node.properties.get('ordinal'), ordinal),
+                    format_string_expression=item_node.properties.get('formatStringDefinition', '')
+                )
+                if projection.wants_property('calculation_items', 'expression'):
+                    item.expression = item_node.value
+                group.calculation_items.append(item)
+            table.calculation_group = group
+        
+        return table
     
     def parse_relationships_file(self, file_path: str) -> List[TMDLRelationship]:
         """Parse relationships from relationships.tmdl file"""
+        try:
+            return self.parse_relationships_content(self._read_file(file_path), file_path)
+        except Exception as e:
+            self.logger.error(f"Error parsing relationships file {file_path}: {e}")
+            return []
+    
+    def parse_relationships_content(self, content: str, file_path: str) -> List[TMDLRelationship]:
+        """Parse the content of a relationships.tmdl file"""
         relationships = []
         
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+        for node in self.scan(content):
+            if node.keyword != 'relationship':
+                continue
             
-            # Find all relationship definitions
-            rel_pattern = r'relationship\s+([^\r\n]+)\s*(.*?)(?=\n\s*relationship|\Z)'
+            relationship = TMDLRelationship(
+                name=node.name,
+                object_type="Relationship",
+                properties=node.properties,
+                content=content[node.start:node.end],
+                file_path=file_path,
+                annotations=self._annotations(node)
+            )
             
-            for match in re.finditer(rel_pattern, content, re.DOTALL | re.MULTILINE):
-                rel_name = match.group(1).strip()
-                rel_content = match.group(2).strip()
-                
-                relationship = TMDLRelationship(
-                    name=rel_name,
-                    object_type="Relationship",
-                    content=rel_content,
-                    file_path=file_path
-                )
-                
-                # Extract from column
-                from_match = re.search(r'fromColumn:\s*([^\r\n]+)', rel_content)
-                if from_match:
-                    from_parts = from_match.group(1).strip().split('.')
-                    if len(from_parts) == 2:
-                        relationship.from_table = from_parts[0]
-                        relationship.from_column = from_parts[1]
-                
-                # Extract to column
-                to_match = re.search(r'toColumn:\s*([^\r\n]+)', rel_content)
-                if to_match:
-                    to_parts = to_match.group(1).strip().split('.')
-                    if len(to_parts) == 2:
-                        relationship.to_table = to_parts[0]
-                        relationship.to_column = to_parts[1]
-                
-                relationships.append(relationship)
-                
-        except Exception as e:
-            self.logger.error(f"Error parsing relationships file {file_path}: {e}")
+            if 'fromColumn' in node.properties:
+                relationship.from_table, relationship.from_column = self._split_qualified_name(node.properties['fromColumn'])
+            if 'toColumn' in node.properties:
+                relationship.to_table, relationship.to_column = self._split_qualified_name(node.properties['toColumn'])
+            
+            relationship.is_active = node.properties.get('isActive', 'true').lower() != 'false'
+            relationship.cross_filter_direction = node.properties.get('crossFilteringBehavior', relationship.cross_filter_direction)
+            relationship.from_cardinality = node.properties.get('fromCardinality', relationship.from_cardinality)
+            relationship.to_cardinality = node.properties.get('toCardinality', relationship.to_cardinality)
+            
+            relationships.append(relationship)
         
         return relationships
+    
+    def parse_role_file(self, file_path: str) -> Optional[TMDLRole]:
+        """Parse a role from a roles/*.tmdl file"""
+        try:
+            return self.parse_role_content(self._read_file(file_path), file_path)
+        except Exception as e:
+            self.logger.error(f"Error parsing role file {file_path}: {e}")
+            return None
+    
+    def parse_role_content(self, content: str, file_path: str) -> Optional[TMDLRole]:
+        """Parse the content of a role file into a role and its table permissions"""
+        role_node = next((node for node in self.scan(content) if node.keyword == 'role'), None)
+        if role_node is None:
+            return None
+        
+        role = TMDLRole(
+            name=role_node.name,
+            object_type="ModelRole",
+            properties=role_node.properties,
+            content=content,
+            file_path=file_path,
+            annotations=self._annotations(role_node),
+            model_permission=role_node.properties.get('modelPermission', ''),
+            members=[node.name for node in role_node.children_of('member')]
+        )
+        
+        for node in role_node.children_of('tablePermission'):
+            role.table_permissions.append(TMDLTablePermission(
+                name=node.name,
+                object_type="TablePermission",
+                properties=node.properties,
+                content=content[node.start:node.end],
+                file_path=file_path,
+                table_name=node.name,
+                annotations=self._annotations(node),
+                parent=role,
+                expression=node.value
+            ))
+        
+        return role
+    
+    def index_culture_file(self, fs: ModelFS, path: str) -> TMDLCulture:
+        """Index a culture file without reading it
+        
+        The file is read from ``fs`` when the culture is first accessed, so the file
+        system must still be open at that point.
+        """
+        def load() -> Dict[str, Any]:
+            self.logger.info(f"Parsing culture file: {fs.display_path(path)}")
+            return self._parse_fs_file(fs, path, self.parse_culture_content, "culture file",
+                                       {'linguistic_metadata': '', 'translations': {}})
+        
+        return TMDLCulture(
+            name=posixpath.splitext(posixpath.basename(path))[0],
+            object_type="Culture",
+            file_path=fs.display_path(path),
+            size=fs.size(path),
+            loader=load
+        )
+    
+    def parse_culture_content(self, content: str, file_path: str) -> Dict[str, Any]:
+        """Parse the content of a culture file"""
+        result = {'linguistic_metadata': '', 'translations': {}}
+        culture_node = next(
+            (node for node in self.scan(content) if node.keyword in ('cultureInfo', 'culture')), None
+        )
+        if culture_node is None:
+            return result
+        
+        result['linguistic_metadata'] = culture_node.properties.get('linguisticMetadata', '')
+        
+        def collect(node: TMDLNode, path: Tuple[str, ...]) -> None:
+            for child in node.children:
+                child_path = path + (f"{child.keyword} {child.name}",)
+                translated = {key: value for key, value in child.properties.items() if key.startswith('translated')}
+                if translated:
+                    result['translations']['/'.join(child_path)] = translated
+                collect(child, child_path)
+        
+        for translations_node in culture_node.children_of('translations'):
+            collect(translations_node, ())
+        
+        return result
 
 
 class BestPracticesChecker:
-    """Checks TMDL objects against best practice rules"""
+    """Checks TMDL objects against best practice rules
+    
+    A checker can be shared by concurrent analyses: each check keeps its state in locals,
+    and reloading the rules swaps in a new list rather than changing the current one.
+    """
+    
+    # Estimated cost of each implemented check in microseconds per object, used to
+    # order rules in fail-fast and top-N modes until a measured cost is available
+    RULE_COST_ESTIMATES = {
+        'AVOID_FLOATING_POINT_DATA_TYPES': 1.0,
+        'PROVIDE_FORMAT_STRING_FOR_MEASURES': 1.0,
+        'AVOID_USING_THE_IFERROR_FUNCTION': 5.0,
+        'USE_THE_DIVIDE_FUNCTION_FOR_DIVISION': 5.0,
+        'HIDE_FOREIGN_KEYS': 10.0,
+        'DAX_COLUMNS_FULLY_QUALIFIED': 20.0
+    }
+    DEFAULT_RULE_COST = 1.0
+    
+    # Rule scope object types and the parser collection indexing each of them
+    SCOPE_COLLECTIONS = {
+        'Model': 'model',
+        'Table': 'tables',
+        'CalculatedTable': 'calculated_tables',
+        'DataColumn': 'data_columns',
+        'CalculatedColumn': 'calculated_columns',
+        'CalculatedTableColumn': 'calculated_table_columns',
+        'Measure': 'measures',
+        'KPI': 'kpis',
+        'Partition': 'partitions',
+        'Hierarchy': 'hierarchies',
+        'Level': 'levels',
+        'CalculationGroup': 'calculation_groups',
+        'CalculationItem': 'calculation_items',
+        'Relationship': 'relationships',
+        'ModelRole': 'roles',
+        'TablePermission': 'table_permissions',
+        'Culture': 'cultures'
+    }
+    
+    # Collection dictionaries that don't split columns by type (e.g. built by hand)
+    # resolve column scopes to all columns
+    SCOPE_FALLBACKS = {
+        'data_columns': 'columns',
+        'calculated_columns': 'columns',
+        'calculated_table_columns': 'columns'
+    }
+    
+    # Collections that are only produced while parsing their containing collection
+    PARSE_DEPENDENCIES = {
+        'calculated_tables': 'tables',
+        'data_columns': 'columns',
+        'calculated_columns': 'columns',
+        'calculated_table_columns': 'columns',
+        'kpis': 'measures',
+        'partitions': 'tables',
+        'levels': 'hierarchies',
+        'calculation_items': 'calculation_groups',
+        'table_permissions': 'roles'
+    }
+    
+    # Object properties and extra collections each implemented check reads, on top of
+    # the collections in its scope; rules without an entry are not evaluated yet and
+    # need nothing from the parser
+    RULE_REQUIREMENTS = {
+        'AVOID_FLOATING_POINT_DATA_TYPES': {'properties': {'data_type'}},
+        'PROVIDE_FORMAT_STRING_FOR_MEASURES': {'properties': {'format_string', 'is_hidden'}},
+        'USE_THE_DIVIDE_FUNCTION_FOR_DIVISION': {'properties': {'expression'}},
+        'AVOID_USING_THE_IFERROR_FUNCTION': {'properties': {'expression'}},
+        'HIDE_FOREIGN_KEYS': {'properties': {'is_hidden'}, 'collections': {'relationships': {'from_column'}}},
+        'DAX_COLUMNS_FULLY_QUALIFIED': {'properties': {'expression'}}
+    }
     
     def __init__(self, rules_file: str):
-        self.rules = self._load_rules(rules_file)
         self.logger = logging.getLogger(__name__)
+        self.rules_file = rules_file
+        # Taken before reading so a change made while loading is picked up by the next reload
+        self._rules_stamp = self._file_stamp(rules_file)
+        self.rules, self.rules_version = self._load_rules(rules_file)
+        self._reload_lock = threading.Lock()
+        # Measured cost per rule in microseconds per object (exponential moving average).
+        # Concurrent checks may race on an update; losing one sample of an estimate is harmless.
+        self.measured_costs: Dict[str, float] = {}
+        # Collections each rule scope string resolves to
+        self._scope_cache: Dict[str, List[str]] = {}
     
-    def _load_rules(self, rules_file: str) -> List[BestPracticeRule]:
+    @staticmethod
+    def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+        """Modification time and size of a file, or None if it can't be read"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _load_rules(self, rules_file: str) -> Tuple[List[BestPracticeRule], str]:
         """Load best practice rules from JSON file"""
         try:
-            with open(rules_file, 'r', encoding='utf-8') as f:
-                rules_data = json.load(f)
-            
-            rules = []
-            for rule_data in rules_data:
-                rule = BestPracticeRule(
-                    id=rule_data['ID'],
-                    name=rule_data['Name'],
-                    category=rule_data['Category'],
-                    description=rule_data['Description'],
-                    severity=rule_data['Severity'],
-                    scope=rule_data['Scope'],
-                    expression=rule_data['Expression'],
-                    fix_expression=rule_data.get('FixExpression'),
-                    compatibility_level=rule_data.get('CompatibilityLevel', 1200)
-                )
-                rules.append(rule)
-            
-            return rules
-            
+            return self._read_rules(rules_file)
         except Exception as e:
             self.logger.error(f"Error loading rules from {rules_file}: {e}")
-            return []
+            return [], ''
     
-    def check_objects(self, objects: Dict[str, List[TMDLObject]]) -> List[Violation]:
-        """Check all objects against best practice rules"""
-        violations = []
+    @staticmethod
+    def _read_rules(rules_file: str) -> Tuple[List[BestPracticeRule], str]:
+        """Read the rules and a version identifying the rules file's content"""
+        with open(rules_file, 'rb') as f:
+            content = f.read()
+        rules_data = json.loads(content.decode('utf-8'))
         
-        for rule in self.rules:
-            rule_violations = self._check_rule(rule, objects)
-            violations.extend(rule_violations)
+        rules = []
+        for rule_data in rules_data:
+            rule = BestPracticeRule(
+                id=rule_data['ID'],
+                name=rule_data['Name'],
+                category=rule_data['Category'],
+                description=rule_data['Description'],
+                severity=rule_data['Severity'],
+                scope=rule_data['Scope'],
+                expression=rule_data['Expression'],
+                fix_expression=rule_data.get('FixExpression'),
+                compatibility_level=rule_data.get('CompatibilityLevel', 1200)
+            )
+            rules.append(rule)
+        
+        return rules, hashlib.sha256(content).hexdigest()[:16]
+    
+    def reload_if_changed(self) -> bool:
+        """Reload the rules if the rules file changed since they were loaded
+        
+        Only a stat is done when nothing changed. A file that fails to load (e.g. one
+        caught mid-write) leaves the current rules in place.
+        """
+        stamp = self._file_stamp(self.rules_file)
+        if stamp == self._rules_stamp:
+            return False
+        
+        with self._reload_lock:
+            stamp = self._file_stamp(self.rules_file)
+            if stamp == self._rules_stamp:
+                return False
+            self._rules_stamp = stamp
+            try:
+                rules, version = self._read_rules(self.rules_file)
+            except Exception as e:
+                self.logger.error(f"Error reloading rules from {self.rules_file}, keeping current rules: {e}")
+                return False
+            self.rules, self.rules_version = rules, version
+        
+        self.logger.info(f"Reloaded {len(rules)} rules from {self.rules_file}")
+        return True
+    
+    def select_rules(self, rule_ids: Optional[List[str]] = None,
+                     categories: Optional[List[str]] = None) -> List[BestPracticeRule]:
+        """Return the rules matching the given IDs and categories (all rules if neither is given)"""
+        all_rules = self.rules
+        if rule_ids:
+            known = {rule.id for rule in all_rules}
+            unknown = [rule_id for rule_id in rule_ids if rule_id not in known]
+            if unknown:
+                raise ValueError(f"Unknown rule ID(s): {', '.join(unknown)}")
+        
+        wanted_categories = {category.lower() for category in categories} if categories else None
+        return [
+            rule for rule in all_rules
+            if (not rule_ids or rule.id in rule_ids)
+            and (wanted_categories is None or rule.category.lower() in wanted_categories)
+        ]
+    
+    def projection_for(self, rules: List[BestPracticeRule]) -> ParseProjection:
+        """Build the parse projection covering everything the given rules read"""
+        collections: Dict[str, Set[str]] = {}
+        
+        def want(collection: str, properties: Set[str]) -> None:
+            while collection:
+                collections.setdefault(collection, set()).update(properties)
+                collection = self.PARSE_DEPENDENCIES.get(collection)
+        
+        for rule in rules:
+            requirements = self.RULE_REQUIREMENTS.get(rule.id)
+            if requirements is None:
+                continue
+            for collection in self._scope_collections(rule.scope):
+                want(collection, requirements.get('properties', set()))
+            for collection, properties in requirements.get('collections', {}).items():
+                want(collection, properties)
+        return ParseProjection(collections)
+    
+    def rule_cost(self, rule: BestPracticeRule) -> float:
+        """Return the measured, or else estimated, cost of evaluating a rule per object"""
+        measured = self.measured_costs.get(rule.id)
+        if measured is not None:
+            return measured
+        return self.RULE_COST_ESTIMATES.get(rule.id, self.DEFAULT_RULE_COST)
+    
+    def ordered_rules(self, rules: Optional[List[BestPracticeRule]] = None) -> List[BestPracticeRule]:
+        """Return rules ordered by severity (highest first), then by evaluation cost"""
+        if rules is None:
+            rules = self.rules
+        return sorted(rules, key=lambda rule: (-rule.severity, self.rule_cost(rule)))
+    
+    def check_objects(self, objects: Dict[str, List[TMDLObject]],
+                      summary: Optional[SummaryAccumulator] = None,
+                      fail_fast: bool = False,
+                      max_violations_per_rule: Optional[int] = None,
+                      rules: Optional[List[BestPracticeRule]] = None,
+                      ignore_index: Optional[IgnoreIndex] = None,
+                      progress: Optional[ProgressCallback] = None,
+                      cancel: Optional[CancellationToken] = None) -> ViolationStore:
+        """Check all objects against best practice rules (or only the given subset of rules)
+        
+        If a summary accumulator is given, every violation is fed into it as it is emitted.
+        If a progress callback is given, it receives a 'rule_checked' event after each rule.
+        
+        With ``fail_fast`` the check stops at the first ERROR-severity violation, and with
+        ``max_violations_per_rule`` each rule stops after that many violations. In both
+        modes rules run in severity-then-cost order so cheap, severe checks come first.
+        
+        Rules suppressed by ignore annotations are skipped before evaluation; the ignore
+        index is built from the objects' annotations unless one is given.
+        
+        With a ``cancel`` token, the check raises AnalysisCancelled before the next rule
+        once the token is cancelled.
+        """
+        violations = ViolationStore()
+        if ignore_index is None:
+            ignore_index = IgnoreIndex.from_objects(objects)
+        early_exit = fail_fast or max_violations_per_rule is not None
+        if rules is None:
+            rules = self.rules
+        if early_exit:
+            rules = self.ordered_rules(rules)
+        
+        if early_exit and summary is not None:
+            summary.evaluated_rules = set()
+        
+        for rules_evaluated, rule in enumerate(rules, 1):
+            if cancel is not None:
+                cancel.check()
+            limit = max_violations_per_rule
+            if fail_fast and rule.severity_level == Severity.ERROR:
+                limit = 1 if limit is None else min(limit, 1)
+            
+            found = self._check_rule(rule, objects, violations, summary, limit, ignore_index)
+            
+            if progress is not None:
+                progress('rule_checked', {
+                    'rule_id': rule.id,
+                    'rules_evaluated': rules_evaluated,
+                    'rules_total': len(rules),
+                    'violations': len(violations)
+                })
+            
+            if summary is not None and summary.evaluated_rules is not None:
+                summary.evaluated_rules.add(rule.id)
+                if max_violations_per_rule is not None and found >= max_violations_per_rule:
+                    summary.truncated_rules.append(rule.id)
+            
+            if fail_fast and found and rule.severity_level == Severity.ERROR:
+                self.logger.info(f"Fail-fast: stopping after ERROR-severity violation of {rule.id}")
+                if summary is not None:
+                    summary.stopped_early = True
+                break
         
         return violations
     
-    def _check_rule(self, rule: BestPracticeRule, objects: Dict[str, List[TMDLObject]]) -> List[Violation]:
-        """Check a specific rule against objects"""
-        violations = []
+    def _check_rule(self, rule: BestPracticeRule, objects: Dict[str, List[TMDLObject]],
+                    violations: ViolationStore, summary: Optional[SummaryAccumulator] = None,
+                    limit: Optional[int] = None, ignore_index: Optional[IgnoreIndex] = None) -> int:
+        """Check a specific rule against objects, appending violations to the store
+        
+        (Rule, object) pairs suppressed by the ignore index are skipped without being
+        evaluated. Stops once ``limit`` violations have been found. Returns the number of
+        violations found for the rule.
+        """
+        rule_index = violations.add_rule(rule)
+        found = 0
         
         # Determine which objects to check based on rule scope
         target_objects = self._get_objects_by_scope(rule.scope, objects)
         
+        suppressed_keys = set()
+        if ignore_index is not None:
+            if ignore_index.ignores_everywhere(rule.id):
+                if summary is not None:
+                    summary.add_suppressed(rule.id, len(target_objects))
+                return 0
+            suppressed_keys = ignore_index.suppressed_objects(rule.id)
+        
+        started = time.perf_counter()
+        evaluated = 0
+        suppressed = 0
         for obj in target_objects:
+            if suppressed_keys and (obj.object_type, obj.table_name, obj.name) in suppressed_keys:
+                suppressed += 1
+                continue
+            evaluated += 1
             if self._evaluate_rule_expression(rule, obj, objects):
-                violation = Violation(
-                    rule_id=rule.id,
-                    rule_name=rule.name,
-                    category=rule.category,
-                    severity=rule.severity_level,
-                    description=rule.description,
-                    object_name=obj.name,
-                    object_type=obj.object_type,
-                    file_path=obj.file_path,
-                    fix_suggestion=rule.fix_expression
-                )
-                violations.append(violation)
+                violations.add(rule_index, obj)
+                found += 1
+                if summary is not None:
+                    summary.add(rule.id, obj.object_type, obj.table_name, obj.file_path)
+                if limit is not None and found >= limit:
+                    break
         
-        return violations
+        if evaluated:
+            self._record_cost(rule, (time.perf_counter() - started) * 1e6 / evaluated)
+        if suppressed and summary is not None:
+            summary.add_suppressed(rule.id, suppressed)
+        
+        return found
+    
+    def _record_cost(self, rule: BestPracticeRule, cost: float) -> None:
+        """Fold a measured per-object cost into the moving average for a rule"""
+        previous = self.measured_costs.get(rule.id)
+        self.measured_costs[rule.id] = cost if previous is None else 0.8 * previous + 0.2 * cost
+    
+    def _scope_collections(self, scope: str) -> List[str]:
+        """Resolve a rule scope such as "Measure, KPI" to the collections indexing it"""
+        collections = self._scope_cache.get(scope)
+        if collections is None:
+            collections = []
+            for scope_part in scope.split(','):
+                collection = self.SCOPE_COLLECTIONS.get(scope_part.strip())
+                if collection is None:
+                    self.logger.warning(f"Unknown rule scope: {scope_part.strip()}")
+                elif collection not in collections:
+                    collections.append(collection)
+            self._scope_cache[scope] = collections
+        return collections
     
     def _get_objects_by_scope(self, scope: str, objects: Dict[str, List[TMDLObject]]) -> List[TMDLObject]:
         """Get objects that match the rule scope"""
-        target_objects = []
-        
-        scope_parts = [s.strip() for s in scope.split(',')]
-        
-        for scope_part in scope_parts:
-            if 'Measure' in scope_part:
-                target_objects.extend(objects['measures'])
-            if 'Column' in scope_part or 'DataColumn' in scope_part or 'CalculatedColumn' in scope_part:
-                target_objects.extend(objects['columns'])
-            if 'Table' in scope_part:
-                target_objects.extend(objects['tables'])
-            if 'Relationship' in scope_part:
-                target_objects.extend(objects['relationships'])
+        collections = [
+            collection if collection in objects else self.SCOPE_FALLBACKS.get(collection, collection)
+            for collection in self._scope_collections(scope)
+        ]
+        if len(collections) == 1:
+            return objects.get(collections[0], [])
         
-        # Remove duplicates by converting to set and back to list
-        # Use object id to ensure uniqueness since TMDLObject might not be hashable
+        # Objects can be indexed under more than one scope type (e.g. a calculated
+        # table is also a table), so keep each object once
         seen = set()
-        unique_objects = []
-        for obj in target_objects:
-            obj_key = (obj.name, obj.object_type, obj.file_path)
-            if obj_key not in seen:
-                seen.add(obj_key)
-                unique_objects.append(obj)
+        target_objects = []
+        for collection in collections:
+            for obj in objects.get(collection, []):
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    target_objects.append(obj)
         
-        return unique_objects
+        return target_objects
     
     def _evaluate_rule_expression(self, rule: BestPracticeRule, obj: TMDLObject, all_objects: Dict[str, List[TMDLObject]]) -> bool:
         """Evaluate if an object violates a rule"""
@@ -485,7 +2053,7 @@ class BestPracticesChecker:
                 return self._check_floating_point_datatype(obj)
             
             return False
-            
+        
         except Exception as e:
             self.logger.error(f"Error evaluating rule {rule.id} for object {obj.name}: {e}")
             return False
@@ -496,25 +2064,38 @@ class BestPracticesChecker:
             return not obj.format_string or obj.format_string.strip() == ""
         return False
     
+    @staticmethod
+    def _dax_expression(obj: TMDLObject) -> Optional[str]:
+        """DAX expression of an object, or None if the object has no DAX expression"""
+        if isinstance(obj, (TMDLMeasure, TMDLKPI, TMDLCalculationItem, TMDLTablePermission)):
+            return obj.expression
+        if isinstance(obj, TMDLColumn) and obj.column_type == 'CalculatedColumn':
+            return obj.expression
+        if isinstance(obj, TMDLTable) and obj.is_calculated:
+            return obj.expression
+        return None
+    
     def _check_divide_function(self, obj: TMDLObject) -> bool:
-        """Check if measure uses / instead of DIVIDE function"""
-        if isinstance(obj, TMDLMeasure):
+        """Check if a DAX expression uses / instead of DIVIDE function"""
+        expression = self._dax_expression(obj)
+        if expression:
             # Look for division operators
             pattern = r'\]\s*/(?!//)(?!/\*)'
-            return bool(re.search(pattern, obj.expression))
+            return bool(re.search(pattern, expression))
         return False
     
     def _check_iferror_function(self, obj: TMDLObject) -> bool:
-        """Check if measure uses IFERROR function"""
-        if isinstance(obj, TMDLMeasure):
-            return bool(re.search(r'IFERROR\s*\(', obj.expression, re.IGNORECASE))
+        """Check if a DAX expression uses IFERROR function"""
+        expression = self._dax_expression(obj)
+        if expression:
+            return bool(re.search(r'IFERROR\s*\(', expression, re.IGNORECASE))
         return False
     
     def _check_foreign_key_hidden(self, obj: TMDLObject, all_objects: Dict[str, List[TMDLObject]]) -> bool:
         """Check if foreign key column is hidden"""
         if isinstance(obj, TMDLColumn):
             # Check if column is used in relationships as foreign key and not hidden
-            for rel in all_objects['relationships']:
+            for rel in all_objects.get('relationships', []):
                 if isinstance(rel, TMDLRelationship):
                     if rel.from_column == obj.name and not obj.is_hidden:
                         return True
@@ -522,13 +2103,12 @@ class BestPracticesChecker:
     
     def _check_column_references(self, obj: TMDLObject) -> bool:
         """Check if DAX expression uses fully qualified column references"""
-        if isinstance(obj, TMDLMeasure):
+        expression = self._dax_expression(obj)
+        if expression:
             # Check for unqualified column references
             # Qualified: 'TableName'[ColumnName] or TableName[ColumnName] 
             # Unqualified: [ColumnName] (standalone, not preceded by table name)
             
-            expression = obj.expression
-            
             # Pattern to find unqualified column references:
             # [ColumnName] that is NOT preceded by a table name
             # Negative lookbehind to ensure it's not: 'TableName'[Column] or TableName[Column]
@@ -570,33 +2150,81 @@ class BestPracticesChecker:
 class TMDLBestPracticesAgent:
     """Main agent class for analyzing TMDL files"""
     
-    def __init__(self, rules_file: str):
-        self.parser = TMDLParser()
-        self.checker = BestPracticesChecker(rules_file)
+    def __init__(self, rules_file: str, checker: Optional[BestPracticesChecker] = None,
+                 parser: Optional[TMDLParser] = None):
+        """Pass ``checker`` and ``parser`` to share one checker (and its loaded rules) and
+        one parser (and its parse cache) between agents"""
+        self.parser = parser if parser is not None else TMDLParser()
+        self.checker = checker if checker is not None else BestPracticesChecker(rules_file)
         self.logger = logging.getLogger(__name__)
-        
-        # Setup logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
     
-    def analyze_model(self, model_path: str) -> Dict[str, Any]:
-        """Analyze a TMDL model and return findings"""
-        self.logger.info(f"Starting analysis of model: {model_path}")
+    def analyze_model(self, model_path: str, fail_fast: bool = False,
+                      max_violations_per_rule: Optional[int] = None,
+                      rule_ids: Optional[List[str]] = None,
+                      categories: Optional[List[str]] = None,
+                      fs: Optional[ModelFS] = None,
+                      progress: Optional[ProgressCallback] = None,
+                      cancel: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """Analyze a TMDL model and return findings
+        
+        ``fail_fast`` and ``max_violations_per_rule`` are passed to the checker to stop work early.
+        ``rule_ids`` and ``categories`` restrict the rules that are checked; the parser then
+        only extracts the objects and properties those rules read.
+        When ``fs`` is given (an archive or in-memory files, see model_fs), ``model_path`` is
+        the model folder within it; otherwise it is a folder on disk.
+        ``progress`` receives 'parsing', 'parsed', 'checking', 'rule_checked' and 'checked'
+        events with the counts of parsed objects and evaluated rules.
+        ``cancel`` stops parsing and checking within one file or rule once it is cancelled;
+        the analysis then raises AnalysisCancelled.
+        """
+        if fs is None:
+            fs = DirectoryFS(model_path)
+            model_path = ''
+        display_path = fs.display_path(model_path)
+        self.logger.info(f"Starting analysis of model: {display_path}")
         
         try:
+            self.checker.reload_if_changed()
+            rules = self.checker.select_rules(rule_ids, categories)
+            projection = None
+            if rule_ids or categories:
+                projection = self.checker.projection_for(rules)
+                self.logger.info(f"Checking {len(rules)} selected rules")
+            
+            if progress is None:
+                progress = lambda event, data: None
+            
             # Parse TMDL files
-            objects = self.parser.parse_model_directory(model_path)
+            progress('parsing', {'model_path': display_path})
+            with ANALYSIS_PHASE_SECONDS.time('parse'):
+                objects = self.parser.parse_model(fs, model_path, projection, cancel)
+            for name, items in objects.items():
+                if items:
+                    OBJECTS_PARSED.inc(name, amount=len(items))
             
             self.logger.info(f"Parsed {len(objects['tables'])} tables, {len(objects['measures'])} measures, "
                            f"{len(objects['columns'])} columns, {len(objects['relationships'])} relationships")
+            progress('parsed', {'object_counts': {name: len(items) for name, items in objects.items() if items}})
             
-            # Check best practices
-            violations = self.checker.check_objects(objects)
+            # Check best practices, accumulating the summary as violations are emitted
+            progress('checking', {'rules_total': len(rules)})
+            accumulator = SummaryAccumulator(rules)
+            with ANALYSIS_PHASE_SECONDS.time('rule_check'):
+                violations = self.checker.check_objects(
+                    objects, accumulator,
+                    fail_fast=fail_fast,
+                    max_violations_per_rule=max_violations_per_rule,
+                    rules=rules,
+                    progress=progress,
+                    cancel=cancel
+                )
+            progress('checked', {'violations': len(violations)})
             
             # Generate summary
-            summary = self._generate_summary(objects, violations)
+            with ANALYSIS_PHASE_SECONDS.time('summary'):
+                summary = self._generate_summary(objects, violations, accumulator, projection)
+            for severity, count in summary['violations']['by_severity'].items():
+                VIOLATIONS_FOUND.inc(severity, amount=count)
             
             self.logger.info(f"Analysis complete. Found {len(violations)} violations.")
             
@@ -604,80 +2232,35 @@ class TMDLBestPracticesAgent:
                 'summary': summary,
                 'objects': objects,
                 'violations': violations,
-                'model_path': model_path
+                'model_path': display_path
             }
-            
+        
+        except AnalysisCancelled:
+            self.logger.info(f"Analysis of {display_path} cancelled")
+            raise
         except Exception as e:
             self.logger.error(f"Error analyzing model: {e}")
             raise
     
-    def _generate_summary(self, objects: Dict[str, List[TMDLObject]], violations: List[Violation]) -> Dict[str, Any]:
-        """Generate analysis summary"""
-        summary = {
-            'object_counts': {
-                'tables': len(objects['tables']),
-                'measures': len(objects['measures']),
-                'columns': len(objects['columns']),
-                'relationships': len(objects['relationships'])
-            },
-            'violations': {
-                'total': len(violations),
-                'by_severity': {},
-                'by_category': {},
-                'by_rule': {}
-            },
-            'rules_checked': {
-                'total': len(self.checker.rules),
-                'rules_with_violations': 0,
-                'rules_without_violations': 0,
-                'all_rules': []
-            }
-        }
-        
-        # Count violations by severity
-        for violation in violations:
-            severity = violation.severity.name
-            summary['violations']['by_severity'][severity] = summary['violations']['by_severity'].get(severity, 0) + 1
-        
-        # Count violations by category
-        for violation in violations:
-            category = violation.category
-            summary['violations']['by_category'][category] = summary['violations']['by_category'].get(category, 0) + 1
-        
-        # Count violations by rule
-        for violation in violations:
-            rule_id = violation.rule_id
-            if rule_id not in summary['violations']['by_rule']:
-                summary['violations']['by_rule'][rule_id] = {
-                    'count': 0,
-                    'name': violation.rule_name,
-                    'category': violation.category,
-                    'severity': violation.severity.name
-                }
-            summary['violations']['by_rule'][rule_id]['count'] += 1
+    def _generate_summary(self, objects: Dict[str, List[TMDLObject]], violations: List[Violation],
+                          accumulator: Optional[SummaryAccumulator] = None,
+                          projection: Optional[ParseProjection] = None) -> Dict[str, Any]:
+        """Generate analysis summary
         
-        # Add information about all rules checked
-        for rule in self.checker.rules:
-            rule_info = {
-                'id': rule.id,
-                'name': rule.name,
-                'category': rule.category,
-                'severity': rule.severity_level.name,
-                'violation_count': summary['violations']['by_rule'].get(rule.id, {}).get('count', 0),
-                'has_violations': rule.id in summary['violations']['by_rule']
-            }
-            summary['rules_checked']['all_rules'].append(rule_info)
-            
-            if rule_info['has_violations']:
-                summary['rules_checked']['rules_with_violations'] += 1
-            else:
-                summary['rules_checked']['rules_without_violations'] += 1
+        Uses the accumulator fed by the checker when available; otherwise the
+        violations are folded into a fresh accumulator in a single pass. ``projection``
+        is the parse projection of a rule selection, if any.
+        """
+        if accumulator is None:
+            accumulator = SummaryAccumulator(self.checker.rules)
+            for violation in violations:
+                accumulator.add_violation(violation)
         
-        return summary
+        return accumulator.build(objects, projection)
     
     def generate_report(self, analysis_result: Dict[str, Any], output_file: Optional[str] = None) -> str:
         """Generate a detailed analysis report"""
-        violations = analysis_result['violations']
+        violations = ViolationStore.from_violations(analysis_result['violations'])
         summary = analysis_result['summary']
         
         report_lines = []
@@ -687,11 +2270,13 @@ class TMDLBestPracticesAgent:
         
         # Summary section
         report_lines.append("\n## Summary")
-        report_lines.append(f"- Tables: {summary['object_counts']['tables']}")
-        report_lines.append(f"- Measures: {summary['object_counts']['measures']}")
-        report_lines.append(f"- Columns: {summary['object_counts']['columns']}")
-        report_lines.append(f"- Relationships: {summary['object_counts']['relationships']}")
+        for label, collection in (('Tables', 'tables'), ('Measures', 'measures'), ('Columns', 'columns'),
+                                  ('Relationships', 'relationships')):
+            report_lines.append(f"- {label}: {summary['object_counts'].get(collection, 'not parsed')}")
         report_lines.append(f"- Total Violations: {summary['violations']['total']}")
+        suppressed = summary['violations'].get('suppressed', {})
+        if suppressed.get('total'):
+            report_lines.append(f"- Suppressed by annotations: {suppressed['total']}")
         
         # Violations by severity
         report_lines.append("\n### Violations by Severity")
@@ -708,12 +2293,7 @@ class TMDLBestPracticesAgent:
             report_lines.append("\n## Detailed Violations")
             
             # Group by category
-            violations_by_category = {}
-            for violation in violations:
-                category = violation.category
-                if category not in violations_by_category:
-                    violations_by_category[category] = []
-                violations_by_category[category].append(violation)
+            violations_by_category = violations.group_by_category()
             
             for category, category_violations in violations_by_category.items():
                 report_lines.append(f"\n### {category}")
@@ -750,6 +2330,7 @@ if __name__ == "__main__":
     output_file = sys.argv[3] if len(sys.argv) > 3 else None
     
     # Create and run the agent
+    configure_logging()
     agent = TMDLBestPracticesAgent(rules_file)
     
     try:
@@ -760,7 +2341,7 @@ if __name__ == "__main__":
             print(f"Report saved to: {output_file}")
         else:
             print(report)
-            
+    
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
\ No newline at end of file
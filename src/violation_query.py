@@ -0,0 +1,114 @@
+"""
+Violation Queries
+
+Filtering and paging over the violation records of an analysis result, so the web
+interface can show a page of a large result at a time. An index built once per result
+maps each value of the filterable attributes to the rows holding it; a query starts
+from the shortest of the matching row lists and checks the remaining filters on those
+rows only.
+
+Violations are sent to the browser as a normalized table: each rule's fields once,
+and one row per violation holding the rule's index and the violation's own fields.
+"""
+
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ViolationIndex:
+    """Per-attribute row indexes over a list of violation records (see ViolationStore.to_records)"""
+    
+    # Query parameter -> record field; values match case-insensitively
+    FILTERS = {
+        'rule': 'rule_id',
+        'severity': 'severity',
+        'category': 'category',
+        'table': 'table_name'
+    }
+    
+    # Record fields searched by the free-text query
+    SEARCH_FIELDS = ('object_name', 'object_type', 'table_name', 'rule_name', 'rule_id', 'file_path')
+    
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.records = records
+        self.postings: Dict[str, Dict[str, array]] = {name: {} for name in self.FILTERS}
+        self._search_text: List[str] = []
+        
+        for row, record in enumerate(records):
+            for name, field in self.FILTERS.items():
+                key = str(record.get(field) or '').lower()
+                rows = self.postings[name].get(key)
+                if rows is None:
+                    rows = self.postings[name][key] = array('I')
+                rows.append(row)
+            self._search_text.append('\n'.join(str(record.get(field) or '') for field in self.SEARCH_FIELDS).lower())
+        
+        # Approximate memory held by the index, for cache accounting
+        self.nbytes = (len(records) * 4 * len(self.FILTERS)
+                       + sum(len(text) for text in self._search_text))
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def query(self, filters: Optional[Dict[str, str]] = None, q: str = '',
+              offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return the number of matching violations and the records of one page
+        
+        ``filters`` maps names from ``FILTERS`` to the wanted value; ``q`` matches any
+        part of the searched fields. Rows keep their order in the result.
+        """
+        wanted = {name: value.lower() for name, value in (filters or {}).items() if value and name in self.FILTERS}
+        q = q.lower()
+        
+        if wanted:
+            # Start from the filter matching the fewest rows and check the others on those
+            first, *others = sorted(wanted, key=lambda name: len(self.postings[name].get(wanted[name], ())))
+            rows = self.postings[first].get(wanted[first], ())
+            if others:
+                checks = [(self.FILTERS[name], wanted[name]) for name in others]
+                rows = [row for row in rows
+                        if all(str(self.records[row].get(field) or '').lower() == value for field, value in checks)]
+        else:
+            rows = range(len(self.records))
+        
+        if q:
+            rows = [row for row in rows if q in self._search_text[row]]
+        
+        page = rows[offset:offset + limit]
+        return len(rows), [self.records[row] for row in page]
+
+
+# Fields of a violation record that depend only on its rule
+RULE_FIELDS = ('rule_id', 'rule_name', 'category', 'description', 'fix_suggestion', 'ai_explanation', 'ai_enhanced')
+
+# Fields of a violation record stored per row of a normalized table, after the rule index
+ROW_FIELDS = ('severity', 'object_name', 'object_type', 'table_name', 'file_path')
+
+
+def normalize_violations(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Turn violation records into ``{'rules': [...], 'fields': [...], 'rows': [...]}``
+    
+    ``rules`` lists the rule fields of each rule once; every row is the index of its
+    rule followed by the values of ``fields[1:]``.
+    """
+    rules: List[Dict[str, Any]] = []
+    rule_lookup: Dict[str, int] = {}
+    rows = []
+    for record in records:
+        index = rule_lookup.get(record['rule_id'])
+        if index is None:
+            index = rule_lookup[record['rule_id']] = len(rules)
+            rules.append({field: record.get(field) for field in RULE_FIELDS})
+        rows.append([index] + [record.get(field) for field in ROW_FIELDS])
+    return {'rules': rules, 'fields': ['rule'] + list(ROW_FIELDS), 'rows': rows}
+
+
+def denormalize_violations(table: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn a normalized violation table back into violation records"""
+    fields = table['fields'][1:]
+    records = []
+    for row in table['rows']:
+        record = dict(table['rules'][row[0]])
+        record.update(zip(fields, row[1:]))
+        records.append(record)
+    return records
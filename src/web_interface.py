@@ -4,19 +4,45 @@ Simple web interface for the TMDL Best Practices Analyzer Agent
 This provides an easy-to-use web interface for analyzing Power BI TMDL files.
 """
 
-from flask import Flask, render_template_string, request, jsonify, send_file
+from contextlib import closing
+from flask import Flask, Request, Response, abort, g, request, jsonify, send_file, url_for
+import gzip
+import hashlib
+import io
 import os
 import sys
 import json
+import threading
+import time
 from pathlib import Path
-import tempfile
 import traceback
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 
 # Add parent directory to path to import modules
 sys.path.insert(0, str(Path(__file__).parent))
 
-from tmdl_analyzer import TMDLBestPracticesAgent
+from tmdl_analyzer import PARSER_VERSION, ParseCache, TMDLBestPracticesAgent, TMDLParser, ViolationStore, configure_logging
+from model_fs import ARCHIVE_SUFFIXES, MemoryFS, find_model_root, is_model_file, normalize_path, open_archive_fs
+from analysis_jobs import JobQueue, JobQueueFull
+from rate_limit import RateLimiter
+from cancellation import AnalysisCancelled, CancellationToken
+from analysis_sandbox import AnalysisTimeout, AnalysisTooLarge, SandboxError, SandboxPool
+from result_cache import ResultCache, content_key
+from blob_store import BlobStore, is_sha256_hex
+from violation_query import ViolationIndex, denormalize_violations, normalize_violations
+from static_assets import StaticAssets, content_version
+from shared_cache import SharedCache
+from metrics import (ANALYSIS_PHASE_SECONDS, CACHE_REQUESTS, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+                     REGISTRY as METRICS, Counter, Histogram, record_cache_lookup)
+
+# Brotli compression of responses is optional; gzip is always available
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
 
 # Try to import AI-enhanced analyzer (optional)
 try:
@@ -25,8 +51,233 @@ try:
 except ImportError:
     AI_AVAILABLE = False
 
-app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
+
+class DiscardedUpload(io.RawIOBase):
+    """Upload sink for file parts the analyzer never reads: counts the bytes and drops them
+    
+    Parts larger than ``limit`` bytes abort the request with 413 as soon as the limit is
+    crossed, instead of the whole part being received first.
+    """
+    
+    def __init__(self, filename=None, limit=None):
+        super().__init__()
+        self.filename = filename
+        self.limit = limit
+        self.size = 0
+    
+    def readable(self):
+        return True
+    
+    def writable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def write(self, data):
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise RequestEntityTooLarge(oversized_part_message(self.filename, self.limit))
+        return len(data)
+    
+    def readinto(self, buffer):
+        return 0
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        return 0
+
+
+class HashingUpload(io.BytesIO):
+    """In-memory upload part that hashes its content as it is received"""
+    
+    def __init__(self):
+        super().__init__()
+        self.sha256 = hashlib.sha256()
+    
+    def write(self, data):
+        self.sha256.update(data)
+        return super().write(data)
+
+
+def is_upload_part(filename):
+    """Whether an uploaded file belongs to the model definition (TMDL files and model.bim)"""
+    return is_model_file(filename) or filename.replace('\\', '/').rsplit('/', 1)[-1] == 'model.bim'
+
+
+def oversized_part_message(filename, limit):
+    return (f"{filename} is larger than {limit // 1024} KB and is not read by the analyzer. "
+            f"Please upload only the .SemanticModel 'definition' folder.")
+
+
+class UploadRequest(Request):
+    """Request that keeps uploaded TMDL files in memory instead of spooling them to disk
+    
+    Archives are stored as usual; any other file part is dropped as it is received and
+    rejected once it grows beyond MAX_SKIPPED_PART_SIZE.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if filename and is_upload_part(filename):
+            return HashingUpload()
+        if filename and filename.lower().endswith(ARCHIVE_SUFFIXES):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        
+        limit = app.config['MAX_SKIPPED_PART_SIZE']
+        if limit is not None and content_length and content_length > limit:
+            raise RequestEntityTooLarge(oversized_part_message(filename, limit))
+        return DiscardedUpload(filename, limit)
+
+
+# Static files are served from memory by serve_static, not by Flask's static route
+app = Flask(__name__, static_folder=None)
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))  # 50MB max upload size
+app.config['MAX_SKIPPED_PART_SIZE'] = 1024 * 1024  # Non-TMDL files are never read; reject large ones
+app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', 2))  # Analyses running at once
+app.config['ANALYSIS_QUEUE_SIZE'] = int(os.environ.get('ANALYSIS_QUEUE_SIZE', 8))  # Analyses waiting for a worker
+app.config['AI_ANALYSIS_WORKERS'] = int(os.environ.get('AI_ANALYSIS_WORKERS', 1))  # AI analyses running at once
+app.config['AI_ANALYSIS_QUEUE_SIZE'] = int(os.environ.get('AI_ANALYSIS_QUEUE_SIZE', 2))  # AI analyses waiting
+app.config['RATE_LIMIT_PER_MINUTE'] = float(os.environ.get('RATE_LIMIT_PER_MINUTE', 0))  # /analyze per client IP; 0 = no limit
+app.config['RATE_LIMIT_BURST'] = int(os.environ.get('RATE_LIMIT_BURST', 5))  # /analyze requests a client may send at once
+app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))  # Proxies whose X-Forwarded-For is trusted
+app.config['ANALYSIS_SANDBOX'] = os.environ.get('ANALYSIS_SANDBOX', '1') != '0'  # Analyze in worker processes
+app.config['ANALYSIS_TIMEOUT'] = float(os.environ.get('ANALYSIS_TIMEOUT', 600))  # Wall-clock seconds per analysis
+app.config['ANALYSIS_CPU_SECONDS'] = float(os.environ.get('ANALYSIS_CPU_SECONDS', 300))  # CPU seconds per analysis
+app.config['ANALYSIS_MEMORY_BYTES'] = int(os.environ.get('ANALYSIS_MEMORY_BYTES', 2 * 1024 * 1024 * 1024))  # Per worker process
+app.config['RESULT_CACHE_BYTES'] = int(os.environ.get('RESULT_CACHE_BYTES', 64 * 1024 * 1024))  # Results kept for reports
+app.config['BLOB_STORE_BYTES'] = int(os.environ.get('BLOB_STORE_BYTES', 128 * 1024 * 1024))  # Uploaded files kept for delta uploads
+app.config['PARSE_CACHE_BYTES'] = int(os.environ.get('PARSE_CACHE_BYTES', 64 * 1024 * 1024))  # Source size of cached parses
+app.config['SHARED_CACHE_PATH'] = os.environ.get('SHARED_CACHE_PATH')  # SQLite file shared by workers and CLI runs
+app.config['SHARED_CACHE_BYTES'] = int(os.environ.get('SHARED_CACHE_BYTES', 512 * 1024 * 1024))  # Size of the shared cache
+app.config['MAX_VIOLATIONS_PAGE'] = 500  # Largest page of /results/<id>/violations
+app.config['COMPRESS_MIN_SIZE'] = 1024  # Smaller responses are sent uncompressed
+app.config['STATIC_MAX_AGE'] = 365 * 24 * 3600  # Versioned static URLs never change
+app.config['DISCONNECT_GRACE_SECONDS'] = float(os.environ.get('DISCONNECT_GRACE_SECONDS', 10))  # Before abandoned jobs are cancelled
+
+# Analyses run in the background; /analyze returns a job ID to follow. AI analyses,
+# far more expensive, have their own smaller lane so they can't take every worker.
+jobs = JobQueue(app.config['ANALYSIS_WORKERS'], app.config['ANALYSIS_QUEUE_SIZE'],
+                lanes={'ai': (app.config['AI_ANALYSIS_WORKERS'], app.config['AI_ANALYSIS_QUEUE_SIZE'])})
+
+# Per-client limit on /analyze requests, by IP address
+rate_limiter = (RateLimiter.per_minute(app.config['RATE_LIMIT_PER_MINUTE'], app.config['RATE_LIMIT_BURST'])
+                if app.config['RATE_LIMIT_PER_MINUTE'] > 0 else None)
+
+# Behind a reverse proxy the client address comes from X-Forwarded-For
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+# Parses and results shared with other worker processes and command line runs (optional)
+shared_cache = (SharedCache(app.config['SHARED_CACHE_PATH'], app.config['SHARED_CACHE_BYTES'])
+                if app.config['SHARED_CACHE_PATH'] else None)
+
+# Finished results by result ID, so reports are rendered (once) without re-uploading them
+results = ResultCache(app.config['RESULT_CACHE_BYTES'], shared=shared_cache)
+
+# Uploaded TMDL files by SHA-256; browsers upload only the files missing here (see /manifest)
+blobs = BlobStore(app.config['BLOB_STORE_BYTES'])
+
+configure_logging()
+
+RULES_FILE = str(Path(__file__).parent.parent / 'data' / 'BPARules.json')
+
+# One agent serves every request. Its checker holds the loaded rules, reloads them when
+# BPARules.json changes and is shared by concurrent analyses (AI analyzers included).
+# Its parser caches parsed files by content, so unchanged files aren't parsed again.
+_shared_agent = None
+_shared_agent_lock = threading.Lock()
+
+
+def get_shared_agent():
+    """Return the process-wide analyzer, creating it on first use"""
+    global _shared_agent
+    with _shared_agent_lock:
+        if _shared_agent is None:
+            parser = TMDLParser(parse_cache=ParseCache(app.config['PARSE_CACHE_BYTES'], shared=shared_cache))
+            _shared_agent = TMDLBestPracticesAgent(RULES_FILE, parser=parser)
+        return _shared_agent
+
+
+# Analyses run in sandboxed worker processes (see analysis_sandbox), one per job worker of either lane
+_sandbox_pool = None
+_sandbox_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool():
+    """Return the process-wide sandbox pool, spawning its workers on first use"""
+    global _sandbox_pool
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None:
+            size = app.config['ANALYSIS_WORKERS'] + app.config['AI_ANALYSIS_WORKERS']
+            _sandbox_pool = SandboxPool(size, timeout=app.config['ANALYSIS_TIMEOUT'],
+                                        cpu_seconds=app.config['ANALYSIS_CPU_SECONDS'],
+                                        memory_bytes=app.config['ANALYSIS_MEMORY_BYTES'])
+        return _sandbox_pool
+
+# Request metrics, by route pattern so IDs in URLs don't create new series (see /metrics)
+REQUESTS = Counter('tmdl_http_requests_total', 'HTTP requests by route, method and status',
+                   ['route', 'method', 'status'])
+REQUEST_SECONDS = Histogram('tmdl_http_request_duration_seconds', 'Time to produce a response, by route', ['route'])
+UPLOAD_BYTES = Counter('tmdl_upload_bytes_total', 'Bytes received by /analyze')
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS.inc(route, request.method, str(response.status_code))
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route)
+    return response
+
+# Responses of these types are compressed when the client accepts it
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/javascript', 'text/css', 'text/html',
+                          'text/markdown', 'text/plain'}
+
+
+def preferred_encoding():
+    """The best content encoding the client accepts: 'br', 'gzip' or None"""
+    accepted = request.accept_encodings
+    if BROTLI_AVAILABLE and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+@app.after_request
+def compress_response(response):
+    """Compress text responses with brotli or gzip, as negotiated through Accept-Encoding"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = preferred_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The body differs per encoding, so an entity tag can only be weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
 
 # HTML template for the web interface - Modern UI Design
 HTML_TEMPLATE = """
@@ -39,668 +290,7 @@ HTML_TEMPLATE = """
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --primary: #6366f1;
-            --primary-dark: #4f46e5;
-            --primary-light: #818cf8;
-            --secondary: #10b981;
-            --danger: #ef4444;
-            --warning: #f59e0b;
-            --info: #3b82f6;
-            --success: #22c55e;
-            --bg-primary: #0f172a;
-            --bg-secondary: #1e293b;
-            --bg-tertiary: #334155;
-            --text-primary: #f1f5f9;
-            --text-secondary: #cbd5e1;
-            --text-muted: #94a3b8;
-            --border: #334155;
-            --card-bg: #1e293b;
-            --shadow: rgba(0, 0, 0, 0.3);
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-            background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-            color: var(--text-primary);
-            min-height: 100vh;
-            padding: 20px;
-            line-height: 1.6;
-        }
-        
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-        }
-        
-        .header {
-            text-align: center;
-            margin-bottom: 40px;
-            padding: 40px 20px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            border-radius: 20px;
-            box-shadow: 0 20px 60px var(--shadow);
-            animation: fadeInDown 0.6s ease;
-        }
-        
-        @keyframes fadeInDown {
-            from {
-                opacity: 0;
-                transform: translateY(-20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .header h1 {
-            font-size: 3rem;
-            font-weight: 700;
-            margin-bottom: 15px;
-            background: linear-gradient(to right, #fff, #e0e7ff);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }
-        
-        .header p {
-            font-size: 1.1rem;
-            color: var(--text-secondary);
-            margin-bottom: 20px;
-        }
-        
-        .header-links {
-            display: flex;
-            gap: 20px;
-            justify-content: center;
-            flex-wrap: wrap;
-        }
-        
-        .header-link {
-            color: white;
-            text-decoration: none;
-            padding: 10px 20px;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            transition: all 0.3s ease;
-            backdrop-filter: blur(10px);
-        }
-        
-        .header-link:hover {
-            background: rgba(255, 255, 255, 0.2);
-            transform: translateY(-2px);
-        }
-        
-        .main-card {
-            background: var(--card-bg);
-            border-radius: 20px;
-            padding: 40px;
-            box-shadow: 0 20px 60px var(--shadow);
-            border: 1px solid var(--border);
-            animation: fadeInUp 0.6s ease;
-        }
-        
-        @keyframes fadeInUp {
-            from {
-                opacity: 0;
-                transform: translateY(20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .upload-area {
-            border: 3px dashed var(--border);
-            border-radius: 16px;
-            padding: 60px 40px;
-            text-align: center;
-            margin-bottom: 30px;
-            background: linear-gradient(135deg, rgba(99, 102, 241, 0.05) 0%, rgba(79, 70, 229, 0.05) 100%);
-            transition: all 0.3s ease;
-            cursor: pointer;
-        }
-        
-        .upload-area:hover {
-            border-color: var(--primary);
-            background: linear-gradient(135deg, rgba(99, 102, 241, 0.1) 0%, rgba(79, 70, 229, 0.1) 100%);
-            transform: translateY(-2px);
-        }
-        
-        .upload-area.dragover {
-            border-color: var(--primary-light);
-            background: linear-gradient(135deg, rgba(99, 102, 241, 0.15) 0%, rgba(79, 70, 229, 0.15) 100%);
-            transform: scale(1.02);
-        }
-        
-        .upload-icon {
-            font-size: 4rem;
-            margin-bottom: 20px;
-            animation: bounce 2s infinite;
-        }
-        
-        @keyframes bounce {
-            0%, 100% { transform: translateY(0); }
-            50% { transform: translateY(-10px); }
-        }
-        
-        .upload-area h3 {
-            font-size: 1.5rem;
-            font-weight: 600;
-            margin-bottom: 10px;
-            color: var(--text-primary);
-        }
-        
-        .btn {
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            padding: 14px 32px;
-            border: none;
-            border-radius: 12px;
-            cursor: pointer;
-            font-size: 16px;
-            font-weight: 600;
-            margin: 10px;
-            transition: all 0.3s ease;
-            box-shadow: 0 4px 15px rgba(99, 102, 241, 0.3);
-        }
-        
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 6px 20px rgba(99, 102, 241, 0.4);
-        }
-        
-        .btn:active {
-            transform: translateY(0);
-        }
-        
-        .btn:disabled {
-            background: var(--bg-tertiary);
-            cursor: not-allowed;
-            transform: none;
-            box-shadow: none;
-        }
-        
-        .btn-success {
-            background: linear-gradient(135deg, var(--secondary) 0%, #059669 100%);
-            box-shadow: 0 4px 15px rgba(16, 185, 129, 0.3);
-        }
-        
-        .btn-success:hover {
-            box-shadow: 0 6px 20px rgba(16, 185, 129, 0.4);
-        }
-        
-        .analyzer-selection {
-            margin: 30px 0;
-            padding: 30px;
-            background: var(--bg-primary);
-            border-radius: 16px;
-            border: 1px solid var(--border);
-        }
-        
-        .analyzer-selection h3 {
-            font-size: 1.3rem;
-            margin-bottom: 20px;
-            color: var(--text-primary);
-        }
-        
-        .api-key-config {
-            padding: 25px;
-            background: var(--card-bg);
-            border-radius: 12px;
-            border: 1px solid var(--border);
-        }
-        
-        .api-key-config h4 {
-            font-size: 1.1rem;
-            margin-bottom: 15px;
-            color: var(--text-primary);
-        }
-        
-        .api-key-input {
-            width: 100%;
-            padding: 12px;
-            background: var(--bg-primary);
-            border: 1px solid var(--border);
-            border-radius: 8px;
-            color: var(--text-primary);
-            font-family: monospace;
-            font-size: 0.9rem;
-            transition: all 0.3s ease;
-        }
-        
-        .api-key-input:focus {
-            outline: none;
-            border-color: var(--primary);
-            box-shadow: 0 0 0 3px rgba(99, 102, 241, 0.1);
-        }
-        
-        .api-key-input::placeholder {
-            color: var(--text-muted);
-        }
-        
-        .radio-group {
-            display: flex;
-            flex-direction: column;
-            gap: 15px;
-        }
-        
-        .radio-option {
-            display: flex;
-            align-items: center;
-            padding: 20px;
-            background: var(--card-bg);
-            border: 2px solid var(--border);
-            border-radius: 12px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        
-        .radio-option:hover {
-            border-color: var(--primary);
-            transform: translateX(5px);
-        }
-        
-        .radio-option input[type="radio"] {
-            width: 20px;
-            height: 20px;
-            margin-right: 15px;
-            cursor: pointer;
-            accent-color: var(--primary);
-        }
-        
-        .radio-option label {
-            cursor: pointer;
-            flex: 1;
-        }
-        
-        .radio-option strong {
-            display: block;
-            font-size: 1.1rem;
-            margin-bottom: 5px;
-            color: var(--text-primary);
-        }
-        
-        .alert {
-            padding: 16px 20px;
-            border-radius: 12px;
-            margin: 15px 0;
-            border-left: 4px solid;
-            animation: slideIn 0.3s ease;
-        }
-        
-        @keyframes slideIn {
-            from {
-                opacity: 0;
-                transform: translateX(-20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateX(0);
-            }
-        }
-        
-        .alert-warning {
-            background: rgba(245, 158, 11, 0.1);
-            border-color: var(--warning);
-            color: #fbbf24;
-        }
-        
-        .alert-info {
-            background: rgba(59, 130, 246, 0.1);
-            border-color: var(--info);
-            color: #60a5fa;
-        }
-        
-        .alert-success {
-            background: rgba(34, 197, 94, 0.1);
-            border-color: var(--success);
-            color: #4ade80;
-        }
-        
-        .alert-danger {
-            background: rgba(239, 68, 68, 0.1);
-            border-color: var(--danger);
-            color: #f87171;
-        }
-        
-        .progress {
-            display: none;
-            margin: 30px 0;
-        }
-        
-        .progress-bar {
-            width: 100%;
-            height: 8px;
-            background: var(--bg-primary);
-            border-radius: 10px;
-            overflow: hidden;
-            box-shadow: inset 0 2px 4px var(--shadow);
-        }
-        
-        .progress-bar-fill {
-            height: 100%;
-            background: linear-gradient(90deg, var(--primary), var(--primary-light));
-            width: 0%;
-            transition: width 0.3s ease;
-            animation: shimmer 2s infinite;
-        }
-        
-        @keyframes shimmer {
-            0% { background-position: -100% 0; }
-            100% { background-position: 100% 0; }
-        }
-        
-        .progress-text {
-            text-align: center;
-            margin-top: 15px;
-            color: var(--text-secondary);
-            font-weight: 500;
-        }
-        
-        .spinner {
-            display: inline-block;
-            width: 20px;
-            height: 20px;
-            border: 3px solid rgba(255, 255, 255, 0.3);
-            border-top-color: white;
-            border-radius: 50%;
-            animation: spin 1s linear infinite;
-        }
-        
-        @keyframes spin {
-            to { transform: rotate(360deg); }
-        }
-        
-        .results {
-            display: none;
-            margin-top: 40px;
-        }
-        
-        .results h2 {
-            font-size: 2rem;
-            margin-bottom: 30px;
-            color: var(--text-primary);
-        }
-        
-        .summary-card {
-            background: var(--bg-primary);
-            border: 1px solid var(--border);
-            border-radius: 16px;
-            padding: 30px;
-            margin: 20px 0;
-            box-shadow: 0 4px 15px var(--shadow);
-            transition: all 0.3s ease;
-        }
-        
-        .summary-card:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 6px 20px var(--shadow);
-        }
-        
-        .summary-card h3 {
-            font-size: 1.4rem;
-            margin-bottom: 20px;
-            color: var(--text-primary);
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-        
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-        }
-        
-        .stat-item {
-            padding: 20px;
-            background: var(--card-bg);
-            border-radius: 12px;
-            border: 1px solid var(--border);
-            text-align: center;
-            transition: all 0.3s ease;
-        }
-        
-        .stat-item:hover {
-            border-color: var(--primary);
-            transform: translateY(-2px);
-        }
-        
-        .stat-number {
-            font-size: 2.5rem;
-            font-weight: 700;
-            color: var(--primary-light);
-            display: block;
-        }
-        
-        .stat-label {
-            color: var(--text-secondary);
-            font-size: 0.9rem;
-            margin-top: 5px;
-        }
-        
-        .severity-badge {
-            display: inline-block;
-            padding: 6px 12px;
-            border-radius: 8px;
-            font-size: 11px;
-            font-weight: 600;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            margin: 0 5px;
-        }
-        
-        .severity-error {
-            background: rgba(239, 68, 68, 0.2);
-            color: #f87171;
-            border: 1px solid rgba(239, 68, 68, 0.3);
-        }
-        
-        .severity-warning {
-            background: rgba(245, 158, 11, 0.2);
-            color: #fbbf24;
-            border: 1px solid rgba(245, 158, 11, 0.3);
-        }
-        
-        .severity-info {
-            background: rgba(59, 130, 246, 0.2);
-            color: #60a5fa;
-            border: 1px solid rgba(59, 130, 246, 0.3);
-        }
-        
-        .violation-item {
-            background: var(--card-bg);
-            border-left: 4px solid var(--danger);
-            padding: 25px;
-            margin: 15px 0;
-            border-radius: 0 12px 12px 0;
-            box-shadow: 0 4px 15px var(--shadow);
-            transition: all 0.3s ease;
-        }
-        
-        .violation-item:hover {
-            transform: translateX(5px);
-            box-shadow: 0 6px 20px var(--shadow);
-        }
-        
-        .violation-item.warning {
-            border-left-color: var(--warning);
-        }
-        
-        .violation-item.info {
-            border-left-color: var(--info);
-        }
-        
-        .violation-item h4 {
-            color: var(--text-primary);
-            margin-bottom: 15px;
-            font-size: 1.2rem;
-        }
-        
-        .object-info {
-            font-size: 14px;
-            color: var(--text-muted);
-            margin: 8px 0;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-            flex-wrap: wrap;
-        }
-        
-        .category-section {
-            margin-bottom: 40px;
-        }
-        
-        .category-header {
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            padding: 20px 25px;
-            border-radius: 12px;
-            margin-bottom: 20px;
-            box-shadow: 0 4px 15px rgba(99, 102, 241, 0.3);
-        }
-        
-        .category-header h3 {
-            margin: 0;
-            font-size: 1.5rem;
-        }
-        
-        .error {
-            color: var(--danger);
-            margin: 20px 0;
-            padding: 20px;
-            background: rgba(239, 68, 68, 0.1);
-            border-radius: 12px;
-            border: 1px solid rgba(239, 68, 68, 0.3);
-            display: none;
-        }
-        
-        .error:not(:empty) {
-            display: block;
-        }
-        
-        .fix-suggestion {
-            background: rgba(34, 197, 94, 0.1);
-            border: 1px solid rgba(34, 197, 94, 0.3);
-            color: #4ade80;
-            padding: 15px;
-            margin-top: 15px;
-            border-radius: 12px;
-        }
-        
-        .ai-explanation {
-            background: rgba(99, 102, 241, 0.1);
-            border-left: 4px solid var(--primary);
-            padding: 20px;
-            margin: 15px 0;
-            border-radius: 12px;
-            color: var(--text-secondary);
-        }
-        
-        details {
-            margin: 20px 0;
-        }
-        
-        summary {
-            cursor: pointer;
-            font-weight: 600;
-            padding: 15px;
-            background: var(--card-bg);
-            border-radius: 12px;
-            border: 1px solid var(--border);
-            transition: all 0.3s ease;
-            user-select: none;
-        }
-        
-        summary:hover {
-            background: var(--bg-tertiary);
-            border-color: var(--primary);
-        }
-        
-        details[open] summary {
-            margin-bottom: 15px;
-            border-color: var(--primary);
-        }
-        
-        .rules-list {
-            max-height: 500px;
-            overflow-y: auto;
-            padding-right: 10px;
-        }
-        
-        .rules-list::-webkit-scrollbar {
-            width: 8px;
-        }
-        
-        .rules-list::-webkit-scrollbar-track {
-            background: var(--bg-primary);
-            border-radius: 4px;
-        }
-        
-        .rules-list::-webkit-scrollbar-thumb {
-            background: var(--border);
-            border-radius: 4px;
-        }
-        
-        .rules-list::-webkit-scrollbar-thumb:hover {
-            background: var(--bg-tertiary);
-        }
-        
-        .rule-item {
-            padding: 15px;
-            margin: 8px 0;
-            border-left: 3px solid;
-            background: var(--card-bg);
-            border-radius: 0 8px 8px 0;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            transition: all 0.3s ease;
-        }
-        
-        .rule-item:hover {
-            transform: translateX(5px);
-        }
-        
-        .rule-item.passed {
-            border-left-color: var(--success);
-            background: rgba(34, 197, 94, 0.05);
-        }
-        
-        .rule-item.failed {
-            border-left-color: var(--danger);
-            background: rgba(239, 68, 68, 0.05);
-        }
-        
-        @media (max-width: 768px) {
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .main-card {
-                padding: 20px;
-            }
-            
-            .upload-area {
-                padding: 40px 20px;
-            }
-            
-            .stats-grid {
-                grid-template-columns: 1fr;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ css_url }}">
 </head>
 <body>
     <div class="container">
@@ -808,6 +398,19 @@ HTML_TEMPLATE = """
                     </div>
                 </div>
                 
+                <!-- Rule Selection -->
+                <div class="analyzer-selection">
+                    <h3>🎯 Rule Selection</h3>
+                    <p style="color: var(--text-muted); font-size: 0.9rem; margin-bottom: 15px;">
+                        Leave everything unselected to check all rules. Narrowing the selection also skips parsing what those rules don't need.
+                    </p>
+                    <div class="filter-group" id="categoryFilters"></div>
+                    <select id="ruleFilter" name="rules" multiple size="6" class="api-key-input" style="font-family: inherit;"></select>
+                    <small style="color: var(--text-muted); display: block; margin-top: 5px;">
+                        Ctrl/Cmd-click to select individual rules
+                    </small>
+                </div>
+                
                 <!-- Analyze Button -->
                 <div style="text-align: center;">
                     <button type="submit" class="btn" id="analyzeBtn">
@@ -822,7 +425,7 @@ HTML_TEMPLATE = """
                     <div class="progress-bar-fill" id="progressFill"></div>
                 </div>
                 <p class="progress-text">
-                    <span class="spinner"></span> Analyzing your model...
+                    <span class="spinner"></span> <span id="progressText">Uploading your model...</span>
                 </p>
             </div>
             
@@ -844,609 +447,640 @@ HTML_TEMPLATE = """
         </div>
     </div>
 
-    <script>
-        let analysisResults = null;
-        
-        // File upload handling
-        const uploadArea = document.getElementById('uploadArea');
-        const fileInput = document.getElementById('fileInput');
-        
-        uploadArea.addEventListener('dragover', (e) => {
-            e.preventDefault();
-            uploadArea.classList.add('dragover');
-        });
-        
-        uploadArea.addEventListener('dragleave', () => {
-            uploadArea.classList.remove('dragover');
-        });
-        
-        uploadArea.addEventListener('drop', (e) => {
-            e.preventDefault();
-            uploadArea.classList.remove('dragover');
-            fileInput.files = e.dataTransfer.files;
-            updateFileDisplay();
-        });
-        
-        fileInput.addEventListener('change', updateFileDisplay);
-        
-        // Analyzer type selection handling
-        const analyzerRadios = document.querySelectorAll('input[name="analyzer_type"]');
-        const aiWarning = document.getElementById('aiWarning');
-        const apiKeyConfig = document.getElementById('apiKeyConfig');
-        
-        analyzerRadios.forEach(radio => {
-            radio.addEventListener('change', function() {
-                if (this.value === 'ai_enhanced') {
-                    aiWarning.style.display = 'block';
-                    apiKeyConfig.style.display = 'block';
-                } else {
-                    aiWarning.style.display = 'none';
-                    apiKeyConfig.style.display = 'none';
-                }
-            });
-        });
-        
-        // API Key source selection handling
-        const apiKeySourceRadios = document.querySelectorAll('input[name="api_key_source"]');
-        const customApiKeyInput = document.getElementById('customApiKeyInput');
-        
-        apiKeySourceRadios.forEach(radio => {
-            radio.addEventListener('change', function() {
-                if (this.value === 'custom') {
-                    customApiKeyInput.style.display = 'block';
-                } else {
-                    customApiKeyInput.style.display = 'none';
-                }
-            });
-        });
-        
-        function updateFileDisplay() {
-            const files = fileInput.files;
-            if (files.length > 0) {
-                // Check if we have a .SemanticModel structure
-                const fileList = Array.from(files);
-                const hasSemanticModel = fileList.some(file => 
-                    file.webkitRelativePath.includes('.SemanticModel')
-                );
-                const hasDefinition = fileList.some(file => 
-                    file.webkitRelativePath.includes('definition/')
-                );
-                
-                let statusIcon = "✅";
-                let statusText = "Files ready for analysis";
-                let alertClass = "alert-success";
-                
-                if (!hasSemanticModel) {
-                    statusIcon = "⚠️";
-                    statusText = "Warning: No .SemanticModel folder detected";
-                    alertClass = "alert-warning";
-                } else if (!hasDefinition) {
-                    statusIcon = "❌";
-                    statusText = "Error: No definition folder found";
-                    alertClass = "alert-danger";
-                }
-                
-                // Get the root folder name
-                const rootFolder = fileList[0].webkitRelativePath.split('/')[0];
-                
-                uploadArea.innerHTML = `
-                    <div class="upload-icon">${statusIcon}</div>
-                    <h3>Directory Selected</h3>
-                    <p style="color: var(--text-secondary); margin: 15px 0;">
-                        <strong>Folder:</strong> ${rootFolder}
-                    </p>
-                    <div class="alert ${alertClass}" style="display: inline-block; margin: 10px auto;">
-                        ${statusText}
-                    </div>
-                    <p style="font-size: 14px; color: var(--text-muted); margin: 15px 0;">
-                        ${files.length} files selected
-                    </p>
-                    <button type="button" class="btn" id="changeDirBtn">
-                        📂 Choose Different Directory
-                    </button>
-                `;
-                
-                // Re-attach event listener for the new button
-                document.getElementById('changeDirBtn').addEventListener('click', function() {
-                    // Clear the file input
-                    fileInput.value = '';
-                    // Trigger the file picker
-                    fileInput.click();
-                });
-            }
-        }
-        
-        // Form submission
-        document.getElementById('uploadForm').addEventListener('submit', async (e) => {
-            e.preventDefault();
-            
-            const files = fileInput.files;
-            if (files.length === 0) {
-                showError('Please select a directory first');
-                return;
-            }
-            
-            showProgress();
-            
-            const formData = new FormData();
-            for (let file of files) {
-                formData.append('files', file);
-            }
-            
-            // Add analyzer type selection
-            const selectedAnalyzer = document.querySelector('input[name="analyzer_type"]:checked').value;
-            formData.append('analyzer_type', selectedAnalyzer);
-            
-            // Add API key configuration if AI-enhanced is selected
-            if (selectedAnalyzer === 'ai_enhanced') {
-                const apiKeySource = document.querySelector('input[name="api_key_source"]:checked').value;
-                formData.append('api_key_source', apiKeySource);
-                
-                if (apiKeySource === 'custom') {
-                    const customApiKey = document.getElementById('customApiKey').value;
-                    if (customApiKey) {
-                        formData.append('custom_api_key', customApiKey);
-                    }
-                }
-            }
-            
-            try {
-                const response = await fetch('/analyze', {
-                    method: 'POST',
-                    body: formData
-                });
-                
-                if (!response.ok) {
-                    throw new Error(await response.text());
-                }
-                
-                analysisResults = await response.json();
-                displayResults(analysisResults);
-                
-            } catch (error) {
-                showError('Analysis failed: ' + error.message);
-            } finally {
-                hideProgress();
-            }
-        });
-        
-        function showProgress() {
-            document.getElementById('progress').style.display = 'block';
-            document.getElementById('analyzeBtn').disabled = true;
-            document.getElementById('results').style.display = 'none';
-            clearError();
-            
-            // Simulate progress
-            let progress = 0;
-            const interval = setInterval(() => {
-                progress += Math.random() * 15;
-                if (progress > 90) progress = 90;
-                document.getElementById('progressFill').style.width = progress + '%';
-            }, 200);
-            
-            // Store interval for cleanup
-            window.progressInterval = interval;
-        }
-        
-        function hideProgress() {
-            document.getElementById('progress').style.display = 'none';
-            document.getElementById('analyzeBtn').disabled = false;
-            document.getElementById('progressFill').style.width = '100%';
-            
-            if (window.progressInterval) {
-                clearInterval(window.progressInterval);
-            }
-        }
-        
-        function showError(message) {
-            const errorElement = document.getElementById('errorMsg');
-            errorElement.textContent = message;
-            errorElement.style.display = message ? 'block' : 'none';
-            document.getElementById('results').style.display = 'none';
-        }
-        
-        function clearError() {
-            const errorElement = document.getElementById('errorMsg');
-            errorElement.textContent = '';
-            errorElement.style.display = 'none';
-        }
-        
-        function displayResults(results) {
-            clearError();
-            const summary = results.summary;
-            const violations = results.violations;
-            
-            // Analyzer type info
-            let analyzerInfo = '';
-            const analyzerType = results.analyzer_type || 'regular';
-            
-            if (analyzerType === 'ai_enhanced') {
-                analyzerInfo = '<div class="alert alert-success">🤖 <strong>AI-Enhanced Analysis</strong> - Results include strategic recommendations and detailed explanations</div>';
-            } else if (results.ai_fallback_reason) {
-                analyzerInfo = `<div class="alert alert-warning">⚠️ <strong>AI Analysis Failed</strong> - Fell back to regular analysis<br><small>Reason: ${results.ai_fallback_reason}</small></div>`;
-            } else if (results.ai_unavailable_reason) {
-                analyzerInfo = `<div class="alert alert-danger">❌ <strong>AI Analysis Unavailable</strong><br><small>${results.ai_unavailable_reason}</small></div>`;
-            } else {
-                analyzerInfo = '<div class="alert alert-info">⚡ <strong>Regular Analysis</strong> - Fast rule-based checking</div>';
-            }
-            
-            // Display summary
-            const summaryHtml = `
-                ${analyzerInfo}
-                <div class="summary-card">
-                    <h3>📈 Model Overview</h3>
-                    <div class="stats-grid">
-                        <div class="stat-item">
-                            <span class="stat-number">${summary.object_counts.tables}</span>
-                            <span class="stat-label">Tables</span>
-                        </div>
-                        <div class="stat-item">
-                            <span class="stat-number">${summary.object_counts.measures}</span>
-                            <span class="stat-label">Measures</span>
-                        </div>
-                        <div class="stat-item">
-                            <span class="stat-number">${summary.object_counts.columns}</span>
-                            <span class="stat-label">Columns</span>
-                        </div>
-                        <div class="stat-item">
-                            <span class="stat-number">${summary.object_counts.relationships}</span>
-                            <span class="stat-label">Relationships</span>
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="summary-card">
-                    <h3>⚠️ Violations Summary</h3>
-                    <div style="margin-bottom: 20px;">
-                        <div class="stat-item" style="display: inline-block; min-width: 200px;">
-                            <span class="stat-number" style="font-size: 3rem;">${summary.violations.total}</span>
-                            <span class="stat-label">Total Violations</span>
-                        </div>
-                    </div>
-                    <div style="display: flex; gap: 10px; flex-wrap: wrap; justify-content: center;">
-                        ${Object.entries(summary.violations.by_severity).map(([severity, count]) => 
-                            `<span class="severity-badge severity-${severity.toLowerCase()}">${severity}: ${count}</span>`
-                        ).join('')}
-                    </div>
-                </div>
-                
-                <div class="summary-card">
-                    <h3>✅ Rules Checked</h3>
-                    <div class="stats-grid" style="margin-bottom: 20px;">
-                        <div class="stat-item">
-                            <span class="stat-number">${summary.rules_checked.total}</span>
-                            <span class="stat-label">Total Rules</span>
-                        </div>
-                        <div class="stat-item" style="border-color: var(--danger);">
-                            <span class="stat-number" style="color: #f87171;">${summary.rules_checked.rules_with_violations}</span>
-                            <span class="stat-label">With Violations</span>
-                        </div>
-                        <div class="stat-item" style="border-color: var(--success);">
-                            <span class="stat-number" style="color: #4ade80;">${summary.rules_checked.rules_without_violations}</span>
-                            <span class="stat-label">Passed</span>
-                        </div>
-                    </div>
-                    <details>
-                        <summary>
-                            📋 View All Rules Checked (${summary.rules_checked.total})
-                        </summary>
-                        <div class="rules-list" style="margin-top: 15px;">
-                            ${summary.rules_checked.all_rules.map(rule => `
-                                <div class="rule-item ${rule.has_violations ? 'failed' : 'passed'}">
-                                    <div style="flex: 1;">
-                                        <strong style="color: var(--text-primary);">${rule.name}</strong>
-                                        <div style="margin-top: 5px;">
-                                            <span class="severity-badge severity-${rule.severity.toLowerCase()}">${rule.severity}</span>
-                                            <span style="color: var(--text-muted); margin-left: 10px; font-size: 0.9em;">${rule.category}</span>
-                                        </div>
-                                    </div>
-                                    <div style="text-align: right;">
-                                        ${rule.has_violations 
-                                            ? `<span style="color: #f87171; font-weight: bold;">❌ ${rule.violation_count} violation${rule.violation_count > 1 ? 's' : ''}</span>` 
-                                            : `<span style="color: #4ade80; font-weight: bold;">✅ Passed</span>`
-                                        }
-                                    </div>
-                                </div>
-                            `).join('')}
-                        </div>
-                    </details>
-                </div>
-            `;
-            
-            document.getElementById('summarySection').innerHTML = summaryHtml;
-            
-            // Display AI recommendations if available
-            if (results.ai_recommendations && results.ai_enhanced) {
-                const recommendationsHtml = `
-                    <div class="summary-card" style="border: 2px solid var(--primary); background: rgba(99, 102, 241, 0.05);">
-                        <h3>🤖 AI Strategic Recommendations</h3>
-                        <div class="ai-explanation">
-                            <div style="white-space: pre-wrap; line-height: 1.8;">${results.ai_recommendations}</div>
-                        </div>
-                    </div>
-                `;
-                document.getElementById('summarySection').innerHTML += recommendationsHtml;
-            }
-            
-            // Display violations by category
-            const violationsByCategory = {};
-            violations.forEach(violation => {
-                if (!violationsByCategory[violation.category]) {
-                    violationsByCategory[violation.category] = [];
-                }
-                violationsByCategory[violation.category].push(violation);
-            });
-            
-            let violationsHtml = '';
-            Object.entries(violationsByCategory).forEach(([category, categoryViolations]) => {
-                violationsHtml += `
-                    <div class="category-section">
-                        <div class="category-header">
-                            <h3>${category} <span style="opacity: 0.8; font-weight: normal;">(${categoryViolations.length} violations)</span></h3>
-                        </div>
-                `;
-                
-                categoryViolations.forEach(violation => {
-                    violationsHtml += `
-                        <div class="violation-item ${violation.severity.toLowerCase()}">
-                            <h4>${violation.rule_name}</h4>
-                            <div class="object-info">
-                                <span><strong>Object:</strong> ${violation.object_name} (${violation.object_type})</span>
-                                <span class="severity-badge severity-${violation.severity.toLowerCase()}">${violation.severity}</span>
-                                ${violation.ai_enhanced ? '<span class="severity-badge" style="background: rgba(99, 102, 241, 0.2); color: #818cf8; border: 1px solid rgba(99, 102, 241, 0.3);">🤖 AI Enhanced</span>' : ''}
-                            </div>
-                            <div class="object-info"><strong>File:</strong> ${violation.file_path}</div>
-                            <p style="color: var(--text-secondary); margin: 15px 0;">${violation.description}</p>
-                            ${violation.ai_explanation ? `
-                                <div class="ai-explanation">
-                                    <strong style="color: var(--primary-light);">🤖 AI Expert Analysis:</strong>
-                                    <div style="margin-top: 10px; white-space: pre-wrap; line-height: 1.8;">${violation.ai_explanation}</div>
-                                </div>
-                            ` : ''}
-                            ${violation.fix_suggestion ? `
-                                <div class="fix-suggestion">
-                                    <strong>💡 Fix Suggestion:</strong> ${violation.fix_suggestion}
-                                </div>
-                            ` : ''}
-                        </div>
-                    `;
-                });
-                
-                violationsHtml += '</div>';
-            });
-            
-            document.getElementById('violationsSection').innerHTML = violationsHtml;
-            document.getElementById('results').style.display = 'block';
-        }
-        
-        async function downloadReport() {
-            if (!analysisResults) return;
-            
-            try {
-                const response = await fetch('/generate_report', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify(analysisResults)
-                });
-                
-                if (!response.ok) {
-                    throw new Error('Failed to generate report');
-                }
-                
-                const blob = await response.blob();
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = 'TMDL_Analysis_Report.md';
-                document.body.appendChild(a);
-                a.click();
-                window.URL.revokeObjectURL(url);
-                document.body.removeChild(a);
-                
-            } catch (error) {
-                showError('Failed to download report: ' + error.message);
-            }
-        }
-    </script>
+    <script src="{{ js_url }}"></script>
 </body>
 </html>
 """
 
+# Stylesheet and script of the page, loaded once (see static_assets)
+assets = StaticAssets(Path(__file__).parent / 'static')
+
+# The page only changes with its assets, so it is rendered once at startup
+INDEX_HTML = app.jinja_env.from_string(HTML_TEMPLATE).render(
+    css_url=assets.url('app.css'), js_url=assets.url('app.js')).encode('utf-8')
+INDEX_ETAG = content_version(INDEX_HTML)
+
+
 @app.route('/')
 def index():
     """Serve the main web interface"""
-    return render_template_string(HTML_TEMPLATE)
+    response = Response(INDEX_HTML, mimetype='text/html')
+    # Revalidated on every visit, so new asset versions are picked up at once
+    response.cache_control.no_cache = True
+    response.set_etag(INDEX_ETAG)
+    return response.make_conditional(request)
+
+@app.route('/static/<path:filename>')
+def serve_static(filename):
+    """Serve a static asset; URLs carrying the current version are cacheable for good"""
+    asset = assets.get(filename)
+    if asset is None:
+        abort(404)
+    
+    encoding = preferred_encoding()
+    if encoding is not None and len(asset.data) >= app.config['COMPRESS_MIN_SIZE']:
+        response = Response(assets.encode(asset, encoding, compress), mimetype=asset.mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{asset.version}-{encoding}")
+    else:
+        response = Response(asset.data, mimetype=asset.mimetype)
+        response.set_etag(asset.version)
+    response.vary.add('Accept-Encoding')
+    
+    if request.args.get('v') == asset.version:
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/metrics')
+def metrics():
+    """Counters and latency histograms in the Prometheus text format"""
+    return Response(METRICS.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/rules')
+def list_rules():
+    """List the available rules for the rule and category filters"""
+    agent = get_shared_agent()
+    agent.checker.reload_if_changed()
+    return jsonify([
+        {
+            'id': rule.id,
+            'name': rule.name,
+            'category': rule.category,
+            'severity': rule.severity_level.name
+        }
+        for rule in agent.checker.rules
+    ])
+
+def run_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key, analysis_options, progress=None,
+                 cancel=None):
+    """Analyze the model at ``model_path`` within a model file system and return a JSON-ready result
+    
+    A ``cancel`` token stops the analysis with AnalysisCancelled (see cancellation).
+    """
+    if not Path(RULES_FILE).exists():
+        # A server error, unlike the FileNotFoundError of a model without a definition folder
+        raise RuntimeError(f"BPARules.json not found at {RULES_FILE}")
+    shared_agent = get_shared_agent()
+    
+    # Run analysis based on selected analyzer type
+    if analyzer_type == 'ai_enhanced' and AI_AVAILABLE:
+        try:
+            # Use AI-enhanced analyzer
+            # Determine which API key to use
+            openai_api_key = None
+            if api_key_source == 'custom' and custom_api_key:
+                openai_api_key = custom_api_key
+                app.logger.info("Using custom API key provided by user")
+            else:
+                app.logger.info("Using environment/config API key")
+            
+            # The AI analyzer shares the checker and parser; its OpenAI client is pooled per API key
+            agent = AIEnhancedTMDLAnalyzer(RULES_FILE, openai_api_key=openai_api_key,
+                                           checker=shared_agent.checker, parser=shared_agent.parser)
+            result = agent.analyze_model(model_path, fs=fs, progress=progress, cancel=cancel, **analysis_options)
+            # Add metadata to indicate AI analysis was used
+            result['analyzer_type'] = 'ai_enhanced'
+        except AnalysisCancelled:
+            raise
+        except Exception as ai_error:
+            # Fall back to regular analyzer if AI fails
+            app.logger.warning(f"AI-enhanced analysis failed, falling back to regular: {ai_error}")
+            agent = shared_agent
+            result = agent.analyze_model(model_path, fs=fs, progress=progress, cancel=cancel, **analysis_options)
+            result['analyzer_type'] = 'regular'
+            result['ai_fallback_reason'] = str(ai_error)
+    else:
+        # Use regular analyzer
+        agent = shared_agent
+        result = agent.analyze_model(model_path, fs=fs, progress=progress, cancel=cancel, **analysis_options)
+        result['analyzer_type'] = 'regular'
+        if analyzer_type == 'ai_enhanced' and not AI_AVAILABLE:
+            result['ai_unavailable_reason'] = 'AI-enhanced analyzer not available. Please check ai_enhanced_analyzer.py and OpenAI configuration.'
+    
+    # Convert result to JSON serializable format
+    with ANALYSIS_PHASE_SECONDS.time('serialization'):
+        serializable_result = {
+            'summary': result['summary'],
+            'analyzer_type': result.get('analyzer_type', 'regular'),
+            'ai_fallback_reason': result.get('ai_fallback_reason'),
+            'ai_unavailable_reason': result.get('ai_unavailable_reason'),
+            'ai_enhanced': result.get('ai_enhanced', False),
+            'ai_recommendations': result.get('ai_recommendations', ''),
+            'violations': result['violations'].to_records(),
+            'model_path': result['model_path']
+        }
+    
+    return serializable_result
+
+
+def analyze_files(model_path, files, fs_name, file_digests, analyzer_type, api_key_source, custom_api_key,
+                  analysis_options, progress=None):
+    """run_analysis for a model sent to a sandbox worker as a mapping of paths to contents"""
+    fs = MemoryFS(name=fs_name)
+    for path, data in files.items():
+        fs.add_file(path, data, file_digests.get(path))
+    return run_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key, analysis_options, progress)
+
+
+def sandboxed_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key, analysis_options,
+                       file_digests=None, progress=None, cancel=None):
+    """Run an analysis in a sandbox worker; only the model's definition files are sent
+    
+    Cancelling ``cancel`` kills the worker, which stops the analysis (and its OpenAI
+    requests) at once.
+    """
+    prefix = model_path + '/' if model_path else ''
+    files = {path: fs.read_bytes(path) for path in fs.files() if path.startswith(prefix) and is_upload_part(path)}
+    digests = {path: digest for path, digest in (file_digests or {}).items() if path in files}
+    return get_sandbox_pool().run(analyze_files, model_path, files, fs.name, digests, analyzer_type,
+                                  api_key_source, custom_api_key, analysis_options, progress=progress,
+                                  cancel=cancel)
+
+
+# Errors of the uploaded model rather than of the server (e.g. no definition folder,
+# undecodable files), reported as 422 Unprocessable Entity
+MODEL_ERROR_TYPES = {'FileNotFoundError', 'ValueError', 'UnicodeError'}
+
+
+class AnalysisFailed(Exception):
+    """An analysis error with the HTTP status it maps to"""
+    
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def analysis_error_status(error):
+    """HTTP status of an analysis error: 422 for errors of the model, 500 otherwise
+    
+    Errors from a sandbox worker carry the names of their exception classes.
+    """
+    if isinstance(error, SandboxError):
+        error_types = error.error_types
+    else:
+        error_types = [cls.__name__ for cls in type(error).__mro__]
+    return 422 if MODEL_ERROR_TYPES.intersection(error_types) else 500
+
+
+def analysis_key(fs, model_path, analyzer_type, analysis_options, file_digests=None):
+    """Content key of an analysis: the model's TMDL files and paths, the parser and rules
+    versions, the analyzer and the analysis options
+    
+    ``file_digests`` holds the SHA-256 of files already hashed while they were uploaded;
+    other files of the model are read and hashed here.
+    """
+    file_digests = file_digests or {}
+    prefix = model_path + '/' if model_path else ''
+    digests = {}
+    for path in fs.files():
+        if path.startswith(prefix) and is_model_file(path):
+            digest = file_digests.get(path) or hashlib.sha256(fs.read_bytes(path)).hexdigest()
+            digests[path[len(prefix):]] = digest
+    
+    checker = get_shared_agent().checker
+    checker.reload_if_changed()
+    return content_key(digests, model=fs.display_path(model_path), parser=PARSER_VERSION,
+                       rules=checker.rules_version, analyzer=analyzer_type, options=analysis_options)
+
+
+def cached_analysis(key):
+    """Answer an analysis from the result cache: 304 if the browser's copy is current,
+    the cached result with its ETag, or None on a cache miss"""
+    result = results.get(key)
+    record_cache_lookup('result', result is not None)
+    if result is None:
+        return None
+    if request.if_none_match.contains_weak(key):
+        return Response(status=304, headers={'ETag': f'"{key}"'})
+    response = jsonify({'status': 'done', 'result': result_payload(result)})
+    response.set_etag(key)
+    return response
+
+
+def result_payload(result):
+    """What the browser gets for a finished analysis
+    
+    Cached results are sent without their violations, which the browser pages through
+    /results/<id>/violations; results too large for the cache are sent whole, with the
+    violations as a normalized table (see violation_query).
+    """
+    if not result.get('result_id'):
+        payload = {key: value for key, value in result.items() if key != 'violations'}
+        payload['violation_table'] = normalize_violations(result['violations'])
+        return payload
+    payload = {key: value for key, value in result.items() if key != 'violations'}
+    payload['report_url'] = url_for('cached_report', result_id=result['result_id'])
+    payload['violations_url'] = url_for('result_violations', result_id=result['result_id'])
+    return payload
+
+
+def violation_index(result_id):
+    """The violation index of a cached result, built on first use and cached with it"""
+    return results.artifact(result_id, 'violation_index', lambda result: ViolationIndex(result['violations']),
+                            size=lambda index: index.nbytes)
+
+
+def submit_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key, analysis_options,
+                    file_digests=None):
+    """Answer from the result cache when the same model was analyzed before; otherwise
+    queue an analysis of an uploaded model and return its job ID (202)"""
+    key = analysis_key(fs, model_path, analyzer_type, analysis_options, file_digests)
+    response = cached_analysis(key)
+    if response is not None:
+        fs.close()
+        app.logger.info(f"Returning cached analysis {key[:12]}")
+        return response
+    
+    # Cancelled through /jobs/<id>/cancel or when its client goes away (see job_events)
+    cancel = CancellationToken()
+    
+    def work(progress):
+        with fs:
+            # A job cancelled while it was queued stops here
+            cancel.check()
+            try:
+                if app.config['ANALYSIS_SANDBOX']:
+                    result = sandboxed_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key,
+                                                analysis_options, file_digests, progress, cancel)
+                else:
+                    result = run_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key,
+                                          analysis_options, progress, cancel)
+            except (AnalysisCancelled, AnalysisTimeout, AnalysisTooLarge):
+                # Cancelled jobs end 'cancelled'; limits carry their own status (504, 413)
+                raise
+            except Exception as e:
+                raise AnalysisFailed(str(e), analysis_error_status(e)) from e
+        # Results are stored under their content key, so identical uploads find them. An
+        # AI analysis that fell back to the regular analyzer isn't stored, so the next
+        # request for it tries the AI again.
+        degraded = result.get('ai_fallback_reason') or result.get('ai_unavailable_reason')
+        result['result_id'] = None if degraded else results.put(result, key)
+        if result['result_id']:
+            violation_index(key)
+        return result
+    
+    try:
+        job = jobs.submit(work, lane='ai' if analyzer_type == 'ai_enhanced' else JobQueue.DEFAULT_LANE,
+                          on_cancel=cancel.cancel)
+    except JobQueueFull as e:
+        fs.close()
+        return too_many_requests(f"The analyzer is busy ({e}).", e.retry_after)
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'events_url': url_for('job_events', job_id=job.id),
+        'result_url': url_for('job_status', job_id=job.id),
+        'cancel_url': url_for('cancel_job', job_id=job.id)
+    }), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status of an analysis job, with its result once it is done"""
+    job = jobs.get(job_id)
+    if job is None:
+        return "Unknown or expired analysis job", 404
+    
+    state = job.snapshot()
+    response = {'job_id': job.id, 'status': state['status']}
+    if state['status'] == 'done':
+        response['result'] = result_payload(state['result'])
+    elif state['status'] == 'failed':
+        response['error'] = f"Analysis failed: {state['error']}"
+    elif state['status'] == 'cancelled':
+        response['error'] = state['error']
+    response = jsonify(response)
+    if state['status'] == 'done' and state['result'].get('result_id'):
+        response.set_etag(state['result']['result_id'])
+    if state['status'] == 'failed' and state['status_code']:
+        # e.g. 422 for a broken model, 413 when it needs too much memory, 504 when the analysis timed out
+        response.status_code = state['status_code']
+    return response
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream of an analysis job's progress
+    
+    Events are numbered, so a reconnecting EventSource resumes after Last-Event-ID.
+    The stream ends with a 'done', 'failed' or 'cancelled' event. When the last client
+    following an unfinished job disconnects and none reconnects within
+    DISCONNECT_GRACE_SECONDS, the job is cancelled.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return "Unknown or expired analysis job", 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    
+    def stream():
+        try:
+            with closing(job.follow(start)) as events:
+                for item in events:
+                    if item is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    index, event, data = item
+                    yield f"id: {index}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # The server closes the stream when the client goes away
+            if not job.is_finished and job.followers == 0:
+                cancel_if_abandoned(job)
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def cancel_if_abandoned(job):
+    """Cancel ``job`` unless a client follows it again within the grace period
+    
+    EventSource reconnects on its own after a dropped connection, so a closed stream
+    alone doesn't mean the client is gone.
+    """
+    def check():
+        if job.followers == 0 and job.cancel("The client disconnected"):
+            app.logger.info(f"Cancelled analysis job {job.id}: its client disconnected")
+    
+    timer = threading.Timer(app.config['DISCONNECT_GRACE_SECONDS'], check)
+    timer.daemon = True
+    timer.start()
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running analysis job; it stops within one file, rule or OpenAI request"""
+    job = jobs.cancel(job_id, "The analysis was cancelled by the user")
+    if job is None:
+        return "Unknown or expired analysis job", 404
+    state = job.snapshot()
+    return jsonify({'job_id': job.id, 'status': state['status'], 'cancel_requested': state['cancel_requested']}), 202
+
+
+def parse_manifest(manifest):
+    """Validate an upload manifest, a JSON object mapping model file paths to SHA-256 digests
+    
+    Only paths of model files are kept. Raises ValueError for malformed manifests.
+    """
+    if not isinstance(manifest, dict):
+        raise ValueError("the manifest must map file paths to SHA-256 digests")
+    files = {}
+    for path, digest in manifest.items():
+        if not is_sha256_hex(digest):
+            raise ValueError(f"not a SHA-256 digest for {path}: {digest!r}")
+        if is_upload_part(path):
+            files[normalize_path(path)] = digest
+    return files
+
+
+@app.route('/manifest', methods=['POST'])
+def upload_manifest():
+    """Tell the browser which files of an upload the server needs
+    
+    Takes ``{"files": {path: sha256}}`` and returns ``{"missing": [sha256, ...]}``, the
+    digests not in the blob store. The browser then posts the manifest to /analyze with
+    only the missing files.
+    """
+    try:
+        manifest = parse_manifest((request.get_json(silent=True) or {}).get('files'))
+    except ValueError as e:
+        return f"Invalid manifest: {e}", 400
+    missing = blobs.missing(manifest.values())
+    CACHE_REQUESTS.inc('blob', 'hit', amount=len(set(manifest.values())) - len(missing))
+    CACHE_REQUESTS.inc('blob', 'miss', amount=len(missing))
+    return jsonify({'missing': missing})
+
+
+def too_many_requests(reason, retry_after):
+    """429 response asking the client to retry after ``retry_after`` seconds"""
+    return Response(f"{reason} Please try again in {retry_after} seconds.", 429,
+                    mimetype='text/plain', headers={'Retry-After': str(retry_after)})
+
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    """Analyze uploaded TMDL files"""
+    """Queue an analysis of uploaded TMDL files; follow it through /jobs/<id>
+    
+    Clients over their rate limit, or arriving when the queue is full, get 429 with
+    Retry-After. Uploads larger than MAX_CONTENT_LENGTH get 413.
+    """
+    # Checked before the upload is read, so refused requests cost no parsing
+    if rate_limiter is not None:
+        retry_after = rate_limiter.admit(request.remote_addr or 'unknown')
+        if retry_after:
+            return too_many_requests("Too many analyses requested.", retry_after)
+    
+    upload_start = time.perf_counter()
+    UPLOAD_BYTES.inc(amount=request.content_length or 0)
     try:
         files = request.files.getlist('files')
         analyzer_type = request.form.get('analyzer_type', 'regular')
         api_key_source = request.form.get('api_key_source', 'environment')
         custom_api_key = request.form.get('custom_api_key', None)
         
-        if not files:
+        # Optional rule selection; the parser skips whatever the selected rules don't read
+        rule_ids = [rule_id for value in request.form.getlist('rules') for rule_id in value.split(',') if rule_id.strip()]
+        categories = request.form.getlist('categories')
+        analysis_options = {
+            'rule_ids': [rule_id.strip() for rule_id in rule_ids] or None,
+            'categories': categories or None
+        }
+        
+        # With a manifest (see /manifest), files the server already has are not uploaded
+        manifest = None
+        if request.form.get('manifest'):
+            try:
+                manifest = parse_manifest(json.loads(request.form['manifest']))
+            except ValueError as e:
+                return f"Invalid manifest: {e}", 400
+        
+        if not files and not manifest:
             return "No files uploaded", 400
         
-        # Create temporary directory for uploaded files
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Save uploaded files maintaining directory structure
-            for file in files:
-                if file.filename:
-                    # Get the original file path (browsers send the relative path)
-                    original_path = file.filename.replace('\\', '/')  # Normalize path separators
-                    
-                    # Create the full file path in temp directory
-                    file_path = os.path.join(temp_dir, original_path)
-                    
-                    # Create directories if needed
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    file.save(file_path)
-            
-            # Find the model directory (look for .SemanticModel folder with definition subfolder)
-            model_path = None
-            
-            # First, look for any .SemanticModel directory
-            for root, dirs, files_list in os.walk(temp_dir):
-                for dir_name in dirs:
-                    if dir_name.endswith('.SemanticModel'):
-                        potential_model_path = os.path.join(root, dir_name)
-                        definition_path = os.path.join(potential_model_path, 'definition')
-                        if os.path.exists(definition_path):
-                            model_path = potential_model_path
-                            break
-                if model_path:
-                    break
-            
-            # If not found, look for any directory with 'definition' folder
-            if not model_path:
-                for root, dirs, files_list in os.walk(temp_dir):
-                    if 'definition' in dirs:
-                        model_path = root
-                        break
-            
-            if not model_path:
-                # Debug: List the uploaded structure
-                debug_info = []
-                for root, dirs, files_list in os.walk(temp_dir):
-                    level = root.replace(temp_dir, '').count(os.sep)
-                    indent = ' ' * 2 * level
-                    debug_info.append(f"{indent}{os.path.basename(root)}/")
-                    subindent = ' ' * 2 * (level + 1)
-                    for file in files_list:
-                        debug_info.append(f"{subindent}{file}")
-                
-                debug_structure = '\n'.join(debug_info)
-                return f"No valid TMDL model found. Please ensure you upload a directory ending with '.SemanticModel' that contains a 'definition' folder.\n\nUploaded structure:\n{debug_structure}\n\n📖 See TROUBLESHOOTING.md for detailed help with folder structure and upload issues.", 400
-            
-            # Get rules file path - now in data folder
-            project_root = Path(__file__).parent.parent
-            rules_file = str(project_root / 'data' / 'BPARules.json')
-            if not Path(rules_file).exists():
-                return f"BPARules.json not found at {rules_file}", 500
-            
-            # Run analysis based on selected analyzer type
-            if analyzer_type == 'ai_enhanced' and AI_AVAILABLE:
+        # A single .zip/.tar archive of the .SemanticModel folder is read straight from the upload
+        if manifest is None and len(files) == 1 and files[0].filename.lower().endswith(ARCHIVE_SUFFIXES):
+            archive = files[0]
+            fs = open_archive_fs(archive.read(), secure_filename(archive.filename))
+            ANALYSIS_PHASE_SECONDS.observe(time.perf_counter() - upload_start, 'upload_save')
+            with ANALYSIS_PHASE_SECONDS.time('model_discovery'):
+                model_path = find_model_root(fs)
+            if model_path is None:
+                fs.close()
+                return f"No valid TMDL model found in {archive.filename}. Please ensure the archive contains a folder ending with '.SemanticModel' that contains a 'definition' folder.", 400
+            return submit_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key, analysis_options)
+        
+        # Build the model tree in memory from the uploaded TMDL parts (UploadRequest kept
+        # only those in memory and dropped the rest while the request was parsed)
+        fs = MemoryFS(name='upload')
+        file_digests = {}
+        skipped_files = 0
+        for file in files:
+            if file.filename and is_upload_part(file.filename):
                 try:
-                    # Use AI-enhanced analyzer
-                    # Determine which API key to use
-                    openai_api_key = None
-                    if api_key_source == 'custom' and custom_api_key:
-                        openai_api_key = custom_api_key
-                        app.logger.info("Using custom API key provided by user")
-                    else:
-                        app.logger.info("Using environment/config API key")
-                    
-                    agent = AIEnhancedTMDLAnalyzer(rules_file, openai_api_key=openai_api_key)
-                    result = agent.analyze_model(model_path)
-                    # Add metadata to indicate AI analysis was used
-                    result['analyzer_type'] = 'ai_enhanced'
-                except Exception as ai_error:
-                    # Fall back to regular analyzer if AI fails
-                    app.logger.warning(f"AI-enhanced analysis failed, falling back to regular: {ai_error}")
-                    agent = TMDLBestPracticesAgent(rules_file)
-                    result = agent.analyze_model(model_path)
-                    result['analyzer_type'] = 'regular'
-                    result['ai_fallback_reason'] = str(ai_error)
-            else:
-                # Use regular analyzer
-                agent = TMDLBestPracticesAgent(rules_file)
-                result = agent.analyze_model(model_path)
-                result['analyzer_type'] = 'regular'
-                if analyzer_type == 'ai_enhanced' and not AI_AVAILABLE:
-                    result['ai_unavailable_reason'] = 'AI-enhanced analyzer not available. Please check ai_enhanced_analyzer.py and OpenAI configuration.'
-            
-            # Convert result to JSON serializable format
-            serializable_result = {
-                'summary': result['summary'],
-                'analyzer_type': result.get('analyzer_type', 'regular'),
-                'ai_fallback_reason': result.get('ai_fallback_reason'),
-                'ai_unavailable_reason': result.get('ai_unavailable_reason'),
-                'ai_enhanced': result.get('ai_enhanced', False),
-                'ai_recommendations': result.get('ai_recommendations', ''),
-                'violations': [
-                    {
-                        'rule_id': v.rule_id,
-                        'rule_name': v.rule_name,
-                        'category': v.category,
-                        'severity': v.severity.name,
-                        'description': v.description,
-                        'object_name': v.object_name,
-                        'object_type': v.object_type,
-                        'file_path': v.file_path,
-                        'fix_suggestion': v.fix_suggestion,
-                        'ai_explanation': getattr(v, 'properties', {}).get('ai_explanation', ''),
-                        'ai_enhanced': getattr(v, 'properties', {}).get('ai_enhanced', False)
-                    }
-                    for v in result['violations']
-                ],
-                'model_path': result['model_path']
-            }
-            
-            return jsonify(serializable_result)
-            
+                    path = normalize_path(file.filename)
+                except ValueError as e:
+                    return f"Invalid upload path: {e}", 400
+                data = file.read()
+                digest = file.stream.sha256.hexdigest() if isinstance(file.stream, HashingUpload) else None
+                digest = blobs.put(data, digest)
+                if manifest is not None and manifest.get(path) != digest:
+                    return f"Uploaded file {path} does not match its manifest entry", 400
+                fs.add_file(path, data, digest)
+                file_digests[path] = digest
+            elif file.filename:
+                skipped_files += 1
+        if skipped_files:
+            app.logger.info(f"Skipped {skipped_files} uploaded files that are not TMDL files")
+        
+        # Take the files that weren't uploaded from the blob store
+        if manifest:
+            missing = set()
+            for path, digest in manifest.items():
+                if path in file_digests:
+                    continue
+                data = blobs.get(digest)
+                if data is None:
+                    missing.add(digest)
+                else:
+                    fs.add_file(path, data, digest)
+                    file_digests[path] = digest
+            if missing:
+                # Evicted since the manifest was checked; the browser uploads these and retries
+                return jsonify({'missing': sorted(missing)}), 409
+        
+        ANALYSIS_PHASE_SECONDS.observe(time.perf_counter() - upload_start, 'upload_save')
+        
+        # Find the model directory (a .SemanticModel folder with a definition subfolder)
+        with ANALYSIS_PHASE_SECONDS.time('model_discovery'):
+            model_path = find_model_root(fs)
+        
+        if model_path is None:
+            # Debug: List the uploaded structure
+            debug_structure = '\n'.join(fs.files()) or '(no .tmdl files)'
+            return f"No valid TMDL model found. Please ensure you upload a directory ending with '.SemanticModel' that contains a 'definition' folder.\n\nUploaded TMDL files:\n{debug_structure}\n\n📖 See TROUBLESHOOTING.md for detailed help with folder structure and upload issues.", 400
+        
+        return submit_analysis(model_path, fs, analyzer_type, api_key_source, custom_api_key, analysis_options,
+                               file_digests)
+    
+    except RequestEntityTooLarge as e:
+        return e.description, 413
     except Exception as e:
         app.logger.error(f"Analysis error: {traceback.format_exc()}")
         return f"Analysis failed: {str(e)}", 500
 
+@app.route('/results/<result_id>/violations')
+def result_violations(result_id):
+    """A page of a cached result's violations
+    
+    Query parameters: ``rule``, ``severity``, ``category`` and ``table`` filter on those
+    attributes (case-insensitive), ``q`` searches object, table, rule and file names, and
+    ``offset``/``limit`` select the page. Returns the matching total and the page as a
+    normalized violation table.
+    """
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(app.config['MAX_VIOLATIONS_PAGE'], max(1, int(request.args.get('limit', 100))))
+    except ValueError:
+        return "offset and limit must be integers", 400
+    
+    index = violation_index(result_id)
+    if index is None:
+        return "Unknown or expired analysis result; please run the analysis again", 404
+    
+    filters = {name: request.args.get(name, '') for name in ViolationIndex.FILTERS}
+    total, page = index.query(filters, request.args.get('q', ''), offset, limit)
+    return jsonify({'total': total, 'offset': offset, 'limit': limit, 'violation_table': normalize_violations(page)})
+
+
+def render_markdown_report(data):
+    """Render the Markdown report of a JSON-ready analysis result
+    
+    The violations are either records or, as posted back by the browser, a normalized
+    violation table.
+    """
+    records = data['violations'] if 'violations' in data else denormalize_violations(data['violation_table'])
+    # Rebuild the rule-normalized violation store for report generation
+    result = {
+        'summary': data['summary'],
+        'violations': ViolationStore.from_records(records),
+        'model_path': data['model_path']
+    }
+    return get_shared_agent().generate_report(result).encode('utf-8')
+
+
+def render_json_report(data):
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+# Report format: (MIME type, download name, renderer)
+REPORT_FORMATS = {
+    'md': ('text/markdown', 'TMDL_Analysis_Report.md', render_markdown_report),
+    'json': ('application/json', 'TMDL_Analysis_Report.json', render_json_report)
+}
+
+
+def report_response(content, report_format):
+    mimetype, filename, _ = REPORT_FORMATS[report_format]
+    return app.response_class(
+        content,
+        mimetype=mimetype,
+        headers={"Content-disposition": f"attachment; filename={filename}"}
+    )
+
+
+@app.route('/generate_report/<result_id>')
+def cached_report(result_id):
+    """Download the report of a cached analysis result (?format=md or json)
+    
+    Each format is rendered on the first download and served from the cache afterwards.
+    """
+    report_format = request.args.get('format', 'md')
+    if report_format not in REPORT_FORMATS:
+        return f"Unknown report format: {report_format} (expected md or json)", 400
+    
+    # The compressed report is cached too, as its own artifact
+    encoding = preferred_encoding()
+    render = REPORT_FORMATS[report_format][2]
+    try:
+        if encoding:
+            content = results.artifact(result_id, f"{report_format}.{encoding}",
+                                       lambda result: compress(render(result), encoding))
+        else:
+            content = results.artifact(result_id, report_format, render)
+    except Exception as e:
+        app.logger.error(f"Report generation error: {traceback.format_exc()}")
+        return f"Report generation failed: {str(e)}", 500
+    if content is None:
+        return "Unknown or expired analysis result; please run the analysis again", 404
+    
+    response = report_response(content, report_format)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
 @app.route('/generate_report', methods=['POST'])
 def generate_report():
-    """Generate and download a detailed report"""
+    """Generate and download a detailed report from posted results
+    
+    Used for results that are not in the result cache (e.g. ones too large for it).
+    """
     try:
-        data = request.get_json()
-        
-        # Create a temporary TMDLBestPracticesAgent to use its report generation
-        project_root = Path(__file__).parent.parent
-        rules_file = str(project_root / 'data' / 'BPARules.json')
-        agent = TMDLBestPracticesAgent(rules_file)
-        
-        # Reconstruct violations objects for report generation
-        from tmdl_analyzer import Violation, Severity
-        violations = []
-        for v_data in data['violations']:
-            violation = Violation(
-                rule_id=v_data['rule_id'],
-                rule_name=v_data['rule_name'],
-                category=v_data['category'],
-                severity=Severity[v_data['severity']],
-                description=v_data['description'],
-                object_name=v_data['object_name'],
-                object_type=v_data['object_type'],
-                file_path=v_data['file_path'],
-                fix_suggestion=v_data.get('fix_suggestion')
-            )
-            violations.append(violation)
-        
-        # Reconstruct result object
-        result = {
-            'summary': data['summary'],
-            'violations': violations,
-            'model_path': data['model_path']
-        }
-        
-        # Generate report
-        report_content = agent.generate_report(result)
-        
-        # Return as downloadable file
-        return app.response_class(
-            report_content,
-            mimetype='text/markdown',
-            headers={"Content-disposition": "attachment; filename=TMDL_Analysis_Report.md"}
-        )
-        
+        return report_response(render_markdown_report(request.get_json()), 'md')
     except Exception as e:
         app.logger.error(f"Report generation error: {traceback.format_exc()}")
         return f"Report generation failed: {str(e)}", 500
 
 if __name__ == '__main__':
     # Check if BPARules.json exists
-    project_root = Path(__file__).parent.parent
-    rules_file = project_root / 'data' / 'BPARules.json'
-    if not rules_file.exists():
-        print(f"Warning: BPARules.json not found at {rules_file}")
+    if not Path(RULES_FILE).exists():
+        print(f"Warning: BPARules.json not found at {RULES_FILE}")
         print("Please ensure the data/BPARules.json file exists.")
     
     print("Starting TMDL Best Practices Analyzer Web Interface...")
@@ -0,0 +1,36 @@
+"""Shared test helpers: the bundled rules file and builders for small models"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+from tmdl_analyzer import TMDLColumn, TMDLMeasure, TMDLObject
+
+RULES_FILE = str(Path(__file__).parent.parent / 'data' / 'BPARules.json')
+
+
+def measure(name: str, expression: str, table: str = 'Sales', **fields) -> TMDLMeasure:
+    """An in-memory measure of ``table``"""
+    return TMDLMeasure(name=name, object_type='Measure', expression=expression, table_name=table, **fields)
+
+
+def column(name: str, data_type: str, table: str = 'Sales', **fields) -> TMDLColumn:
+    """An in-memory column of ``table``"""
+    return TMDLColumn(name=name, object_type='Column', data_type=data_type, table_name=table, **fields)
+
+
+def model_objects(measures: Iterable[TMDLMeasure] = (), columns: Iterable[TMDLColumn] = (),
+                  **collections: List[TMDLObject]) -> Dict[str, List[TMDLObject]]:
+    """Parsed-model collections, as the parser returns them, holding the given objects"""
+    objects = {'tables': [], 'measures': list(measures), 'columns': list(columns), 'relationships': []}
+    objects.update(collections)
+    return objects
+
+
+def write_model(root: Union[str, Path], files: Dict[str, str]) -> Path:
+    """Write ``files`` (path relative to ``root`` -> TMDL content) and return ``root``"""
+    root = Path(root)
+    for path, content in files.items():
+        file_path = root / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content, encoding='utf-8')
+    return root
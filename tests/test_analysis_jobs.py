@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Test the bounded analysis job queue and its event stream"""
+
+import threading
+
+from analysis_jobs import JobQueue, JobQueueFull
+
+
+def test_job_events_and_result():
+    """A job's events are replayed to followers, ending with its outcome"""
+    queue = JobQueue(max_workers=1, max_pending=0)
+    
+    def work(progress):
+        progress('parsed', {'object_counts': {'tables': 2}})
+        return {'violations': 3}
+    
+    job = queue.submit(work)
+    events = [(event, data) for _, event, data in filter(None, job.follow())]
+    assert [event for event, _ in events] == ['queued', 'running', 'parsed', 'done']
+    assert job.status == 'done' and job.result == {'violations': 3}
+    assert queue.get(job.id) is job
+    assert job.snapshot()['status'] == 'done' and job.snapshot()['result'] == {'violations': 3}
+    
+    # Following from an event index resumes after it
+    assert [event for _, event, _ in filter(None, job.follow(3))] == ['done']
+    queue.shutdown()
+
+
+def test_failed_job():
+    queue = JobQueue(max_workers=1, max_pending=0)
+    
+    def work(progress):
+        raise ValueError("broken model")
+    
+    job = queue.submit(work)
+    events = [event for _, event, _ in filter(None, job.follow())]
+    assert events[-1] == 'failed'
+    assert job.status == 'failed' and job.error == 'broken model'
+    assert job.snapshot()['error'] == 'broken model'
+    queue.shutdown()
+
+
+def test_queue_is_bounded():
+    """Submissions beyond the running and pending limits are refused"""
+    queue = JobQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    
+    def work(progress):
+        release.wait(5)
+    
+    queue.submit(work)
+    queue.submit(work)
+    try:
+        queue.submit(work)
+        assert False, "expected JobQueueFull"
+    except JobQueueFull:
+        pass
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_lanes_have_their_own_limits():
+    """A full lane refuses jobs with a Retry-After estimate while other lanes still accept"""
+    queue = JobQueue(max_workers=1, max_pending=0, lanes={'ai': (1, 0)})
+    release = threading.Event()
+    
+    def work(progress):
+        release.wait(5)
+    
+    queue.submit(work, lane='ai')
+    try:
+        queue.submit(work, lane='ai')
+        assert False, "expected JobQueueFull"
+    except JobQueueFull as e:
+        assert e.retry_after >= 1
+    job = queue.submit(work)
+    release.set()
+    list(job.follow())
+    
+    # Finished jobs free their place
+    release.clear()
+    queue.submit(work)
+    release.set()
+    queue.shutdown()
+
+
+if __name__ == "__main__":
+    test_job_events_and_result()
+    test_failed_job()
+    test_queue_is_bounded()
+    test_lanes_have_their_own_limits()
+    print("Analysis jobs: PASS")
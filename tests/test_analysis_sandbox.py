@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Test that sandboxed analyses are stopped at their limits without losing the pool"""
+
+import time
+
+from analysis_jobs import JobQueue
+from analysis_sandbox import (RESOURCE_LIMITS_AVAILABLE, AnalysisTimeout, AnalysisTooLarge, SandboxError,
+                              SandboxPool)
+
+
+# Work run in the sandbox must be importable by the worker processes
+
+def count_objects(count, progress=None):
+    for index in range(count):
+        progress('parsed', {'objects': index + 1})
+    return {'objects': count}
+
+
+def sleep(seconds, progress=None):
+    time.sleep(seconds)
+
+
+def spin(progress=None):
+    while True:
+        pass
+
+
+def allocate(size, progress=None):
+    return len(bytearray(size))
+
+
+def fail(progress=None):
+    raise ValueError("broken model")
+
+
+def missing_definition(progress=None):
+    raise FileNotFoundError("Definition folder not found")
+
+
+def crash(progress=None):
+    raise RuntimeError("internal error")
+
+
+def expect(error, work, pool, *args):
+    try:
+        pool.run(work, *args)
+    except error as e:
+        return e
+    raise AssertionError(f"{work.__name__} did not raise {error.__name__}")
+
+
+def test_results_and_progress_are_relayed():
+    pool = SandboxPool(1, timeout=30)
+    try:
+        events = []
+        assert pool.run(count_objects, 3, progress=lambda event, data: events.append(data['objects'])) == {'objects': 3}
+        assert events == [1, 2, 3]
+        assert str(expect(SandboxError, fail, pool)) == "broken model"
+        assert pool.run(count_objects, 1, progress=lambda *_: None) == {'objects': 1}
+    finally:
+        pool.shutdown()
+
+
+def test_limits_stop_the_analysis_and_recycle_the_worker():
+    pool = SandboxPool(1, timeout=1, cpu_seconds=1, memory_bytes=512 * 1024 * 1024)
+    try:
+        assert expect(AnalysisTimeout, sleep, pool, 5).status_code == 504
+        if RESOURCE_LIMITS_AVAILABLE:
+            pool.timeout = 30
+            assert 'CPU time' in str(expect(AnalysisTimeout, spin, pool))
+            assert expect(AnalysisTooLarge, allocate, pool, 1024 * 1024 * 1024).status_code == 413
+        assert pool.run(allocate, 1024) == 1024
+    finally:
+        pool.shutdown()
+
+
+def test_failed_job_keeps_the_status_code():
+    queue = JobQueue(max_workers=1)
+    
+    def work(progress):
+        raise AnalysisTimeout("too slow")
+    
+    job = queue.submit(work)
+    events = [item for item in job.follow() if item]
+    assert job.status_code == 504
+    assert events[-1][1:] == ('failed', {'error': 'too slow', 'status': 504})
+    queue.shutdown()
+
+
+def test_error_types_cross_the_pipe():
+    """Errors of the model map to 422 and other failures to 500, in the sandbox or not"""
+    import web_interface
+    
+    pool = SandboxPool(1, timeout=30)
+    try:
+        error = expect(SandboxError, missing_definition, pool)
+        assert error.error_types[:2] == ('FileNotFoundError', 'OSError')
+        assert web_interface.analysis_error_status(error) == 422
+        assert web_interface.analysis_error_status(expect(SandboxError, fail, pool)) == 422
+        assert web_interface.analysis_error_status(expect(SandboxError, crash, pool)) == 500
+    finally:
+        pool.shutdown()
+    assert web_interface.analysis_error_status(UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'bad')) == 422
+    assert web_interface.analysis_error_status(KeyError('tables')) == 500
+
+
+if __name__ == "__main__":
+    test_results_and_progress_are_relayed()
+    test_limits_stop_the_analysis_and_recycle_the_worker()
+    test_failed_job_keeps_the_status_code()
+    test_error_types_cross_the_pipe()
+    print("Analysis sandbox: PASS")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Test annotation parsing and rule suppression through the ignore index"""
+
+from model_helpers import RULES_FILE
+from tmdl_analyzer import (BestPracticesChecker, IgnoreIndex, SummaryAccumulator,
+                           TMDLModel, TMDLParser)
+
+TABLE_TMDL = """table Sales
+
+	measure Ratio = [A] / [B]
+		formatString: 0.00
+		annotation BestPracticeAnalyzer_IgnoreRules = {"RuleIDs":["USE_THE_DIVIDE_FUNCTION_FOR_DIVISION"]}
+
+	measure Other = [A] / [B]
+		formatString: 0.00
+
+	column Amount
+		dataType: double
+		annotation SummarizationSetBy = Automatic
+
+		sourceColumn: Amount
+
+	column Price
+		dataType: double
+
+	annotation PBI_ResultType = Table
+"""
+
+
+def parse_table():
+    """Parse the measures and columns of the sample table"""
+    table = TMDLParser().parse_table_content(TABLE_TMDL, 'Sales.tmdl')
+    return table, table.measures, table.columns
+
+
+def test_annotations_do_not_cut_objects():
+    """Annotations belong to their object and no longer end it early"""
+    table, measures, columns = parse_table()
+    
+    assert [m.name for m in measures] == ['Ratio', 'Other']
+    assert 'BestPracticeAnalyzer_IgnoreRules' in measures[0].annotations
+    assert columns[0].annotations == {'SummarizationSetBy': 'Automatic'}
+    assert columns[0].source_column == 'Amount'
+    assert table.annotations == {'PBI_ResultType': 'Table'}
+
+
+def test_object_and_model_suppression():
+    """Object annotations suppress one object; model annotations suppress everywhere"""
+    _, measures, columns = parse_table()
+    model = TMDLModel(name='Model', object_type='Model', annotations={
+        IgnoreIndex.ANNOTATION: '{"RuleIDs":["AVOID_FLOATING_POINT_DATA_TYPES"]}'
+    })
+    objects = {'model': [model], 'tables': [], 'measures': measures, 'columns': columns, 'relationships': []}
+    
+    checker = BestPracticesChecker(RULES_FILE)
+    summary = SummaryAccumulator(checker.rules)
+    violations = checker.check_objects(objects, summary)
+    
+    divide = [v.object_name for v in violations.filter(rule_id='USE_THE_DIVIDE_FUNCTION_FOR_DIVISION')]
+    assert divide == ['Other']
+    assert len(violations.filter(rule_id='AVOID_FLOATING_POINT_DATA_TYPES')) == 0
+    assert summary.suppressed == {'USE_THE_DIVIDE_FUNCTION_FOR_DIVISION': 1, 'AVOID_FLOATING_POINT_DATA_TYPES': 2}
+
+
+def test_lenient_rule_ids():
+    """Rule IDs are read from JSON and from slightly malformed values"""
+    assert IgnoreIndex.parse_rule_ids('{"RuleIDs":["A_RULE","B_RULE"]}') == ['A_RULE', 'B_RULE']
+    assert IgnoreIndex.parse_rule_ids('{"RuleIDs":["A_RULE",]}') == ['A_RULE']
+
+
+if __name__ == "__main__":
+    test_annotations_do_not_cut_objects()
+    test_object_and_model_suppression()
+    test_lenient_rule_ids()
+    print("Annotations: PASS")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Test that cancelled analyses stop within one file, rule or sandbox poll and free their worker"""
+
+import threading
+import time
+
+import web_interface
+from analysis_jobs import JobQueue
+from analysis_sandbox import SandboxPool
+from cancellation import AnalysisCancelled, CancellationToken
+from model_fs import MemoryFS
+from model_helpers import RULES_FILE
+from tmdl_analyzer import TMDLBestPracticesAgent
+
+MODEL_FILES = {
+    'Sales.SemanticModel/definition/model.tmdl': b"model Model\n",
+    'Sales.SemanticModel/definition/tables/Sales.tmdl': (
+        b"table Sales\n\n\tmeasure Ratio = [A] / [B]\n\n\tcolumn Amount\n\t\tdataType: double\n"
+    ),
+    'Sales.SemanticModel/definition/tables/Returns.tmdl': b"table Returns\n\n\tcolumn Amount\n\t\tdataType: double\n"
+}
+
+
+# Work run in the sandbox must be importable by the worker processes
+
+def sleep(seconds, progress=None):
+    time.sleep(seconds)
+    return seconds
+
+
+def build_fs():
+    fs = MemoryFS(name='upload')
+    for path, data in MODEL_FILES.items():
+        fs.add_file(path, data)
+    return fs
+
+
+def expect_cancelled(call):
+    try:
+        call()
+    except AnalysisCancelled:
+        return
+    raise AssertionError("expected AnalysisCancelled")
+
+
+def test_analysis_stops_within_one_rule():
+    agent = TMDLBestPracticesAgent(RULES_FILE)
+    cancel = CancellationToken()
+    events = []
+    
+    def progress(event, data):
+        events.append(event)
+        if event == 'rule_checked':
+            cancel.cancel()
+    
+    expect_cancelled(lambda: agent.analyze_model('Sales.SemanticModel', fs=build_fs(), progress=progress,
+                                                 cancel=cancel))
+    assert events.count('rule_checked') == 1 and 'checked' not in events
+    
+    # Cancelled before parsing: no table file is read
+    expect_cancelled(lambda: agent.parser.parse_model(build_fs(), 'Sales.SemanticModel', cancel=cancel))
+
+
+def test_cancelled_jobs():
+    """Running and queued jobs end 'cancelled'; queued work still runs to release what it holds"""
+    queue = JobQueue(max_workers=1, max_pending=1)
+    tokens = [CancellationToken(), CancellationToken()]
+    started = threading.Event()
+    
+    def work(token):
+        def run(progress):
+            started.set()
+            token.wait(5)
+            token.check()
+        return run
+    
+    running = queue.submit(work(tokens[0]), on_cancel=tokens[0].cancel)
+    started.wait(5)
+    queued = queue.submit(work(tokens[1]), on_cancel=tokens[1].cancel)
+    assert queue.cancel(queued.id).cancel_requested
+    assert running.cancel("Stopped by the test")
+    
+    for job in (running, queued):
+        assert [event for _, event, _ in filter(None, job.follow())][-1] == 'cancelled'
+        assert job.status == 'cancelled'
+    assert running.error == "Stopped by the test"
+    assert not running.cancel()
+    queue.shutdown()
+
+
+def test_sandbox_kills_cancelled_work():
+    pool = SandboxPool(1, timeout=30)
+    try:
+        cancel = CancellationToken()
+        threading.Timer(0.2, cancel.cancel).start()
+        start = time.monotonic()
+        expect_cancelled(lambda: pool.run(sleep, 30, cancel=cancel))
+        assert time.monotonic() - start < 5
+        
+        # The killed worker was replaced
+        assert pool.run(sleep, 0, cancel=CancellationToken()) == 0
+    finally:
+        pool.shutdown()
+
+
+def test_cancel_endpoint_and_disconnect():
+    client = web_interface.app.test_client()
+    
+    def submit():
+        cancel = CancellationToken()
+        
+        def work(progress):
+            cancel.wait(5)
+            cancel.check()
+        return web_interface.jobs.submit(work, on_cancel=cancel.cancel)
+    
+    job = submit()
+    response = client.post(f'/jobs/{job.id}/cancel')
+    assert response.status_code == 202 and response.get_json()['cancel_requested']
+    assert client.get(f'/jobs/{job.id}/events').get_data(as_text=True).rstrip().split('\n')[-2] == 'event: cancelled'
+    assert client.get(f'/jobs/{job.id}').get_json()['status'] == 'cancelled'
+    assert client.post('/jobs/unknown/cancel').status_code == 404
+    
+    # A client that stops following is taken as gone once the grace period passes
+    grace = web_interface.app.config['DISCONNECT_GRACE_SECONDS']
+    web_interface.app.config['DISCONNECT_GRACE_SECONDS'] = 0.1
+    try:
+        job = submit()
+        response = client.get(f'/jobs/{job.id}/events', buffered=False)
+        next(response.response)
+        response.close()
+        deadline = time.monotonic() + 5
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert job.status == 'cancelled' and job.error == "The client disconnected"
+    finally:
+        web_interface.app.config['DISCONNECT_GRACE_SECONDS'] = grace
+
+
+if __name__ == "__main__":
+    test_analysis_stops_within_one_rule()
+    test_cancelled_jobs()
+    test_sandbox_kills_cancelled_work()
+    test_cancel_endpoint_and_disconnect()
+    print("Cancellation: PASS")
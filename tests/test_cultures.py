@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Test that culture files are indexed up front and parsed only on access"""
+
+import tempfile
+
+from model_helpers import RULES_FILE, write_model
+from tmdl_analyzer import BestPracticesChecker, ParseProjection, TMDLParser
+
+CULTURE_TMDL = """cultureInfo fr-FR
+
+	linguisticMetadata =
+			{
+			  "Version": "1.0.0",
+			  "Language": "fr-FR"
+			}
+		contentType: json
+
+	translations
+		model Model
+			table Sales
+				translatedCaption: Ventes
+				measure Revenue
+					translatedCaption: Chiffre d'affaires
+"""
+
+
+# A model with one table and one culture file
+MODEL_FILES = {
+    'definition/tables/Sales.tmdl': "table Sales\n\n\tmeasure Revenue = SUM(Sales[Amount])\n",
+    'definition/cultures/fr-FR.tmdl': CULTURE_TMDL
+}
+
+
+def test_cultures_are_lazy():
+    """Checking rules never reads culture files; accessing their data does"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        objects = TMDLParser().parse_model_directory(str(write_model(temp_dir, MODEL_FILES)))
+        culture = objects['cultures'][0]
+        assert culture.name == 'fr-FR'
+        assert culture.size == len(CULTURE_TMDL.encode('utf-8'))
+        assert not culture.is_loaded
+        
+        BestPracticesChecker(RULES_FILE).check_objects(objects)
+        assert not culture.is_loaded
+        
+        assert culture.translations == {
+            'model Model/table Sales': {'translatedCaption': 'Ventes'},
+            'model Model/table Sales/measure Revenue': {'translatedCaption': "Chiffre d'affaires"}
+        }
+        assert culture.linguistic_metadata.startswith('{\n  "Version"')
+        assert culture.is_loaded
+
+
+def test_projection_skips_cultures():
+    """Rules that don't read cultures don't even index them"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        projection = ParseProjection({'measures': {'expression'}})
+        objects = TMDLParser().parse_model_directory(str(write_model(temp_dir, MODEL_FILES)), projection)
+    assert objects['cultures'] == []
+
+
+if __name__ == "__main__":
+    test_cultures_are_lazy()
+    test_projection_skips_cultures()
+    print("Cultures: PASS")
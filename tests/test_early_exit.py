@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Test fail-fast and top-N checking with cost-ordered rules"""
+
+from model_helpers import RULES_FILE, column, measure, model_objects
+from tmdl_analyzer import BestPracticesChecker, Severity, SummaryAccumulator
+
+
+def violating_model():
+    """Build a model violating both ERROR and WARNING rules"""
+    return model_objects(measures=[measure(f'M{i}', '[A] / [B]') for i in range(5)],
+                         columns=[column(f'C{i}', 'double') for i in range(5)])
+
+
+def test_rule_order():
+    """Rules should be ordered by severity first, then by cost"""
+    checker = BestPracticesChecker(RULES_FILE)
+    ordered = checker.ordered_rules()
+    severities = [rule.severity for rule in ordered]
+    assert severities == sorted(severities, reverse=True)
+    
+    warnings = [rule.id for rule in ordered if rule.severity_level == Severity.WARNING]
+    assert warnings.index('AVOID_FLOATING_POINT_DATA_TYPES') < warnings.index('USE_THE_DIVIDE_FUNCTION_FOR_DIVISION')
+
+
+def test_fail_fast():
+    """Fail-fast should stop at the first ERROR-severity violation"""
+    checker = BestPracticesChecker(RULES_FILE)
+    summary = SummaryAccumulator(checker.rules)
+    violations = checker.check_objects(violating_model(), summary, fail_fast=True)
+    
+    assert len(violations) == 1
+    assert violations[0].severity == Severity.ERROR
+    assert summary.stopped_early
+    assert len(summary.evaluated_rules) < len(checker.rules)
+
+
+def test_max_violations_per_rule():
+    """Each rule should stop after the requested number of violations"""
+    checker = BestPracticesChecker(RULES_FILE)
+    summary = SummaryAccumulator(checker.rules)
+    violations = checker.check_objects(violating_model(), summary, max_violations_per_rule=2)
+    
+    for rule_violations in violations.group_by_rule().values():
+        assert len(rule_violations) <= 2
+    assert 'AVOID_FLOATING_POINT_DATA_TYPES' in summary.truncated_rules
+    assert len(summary.evaluated_rules) == len(checker.rules)
+
+
+if __name__ == "__main__":
+    test_rule_order()
+    test_fail_fast()
+    test_max_violations_per_rule()
+    print("Early exit modes: PASS")
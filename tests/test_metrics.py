@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test the Prometheus metrics and the /metrics endpoint"""
+
+import io
+
+import web_interface
+from metrics import Counter, Histogram, Registry
+
+MODEL_FILES = {
+    'Sales.SemanticModel/definition/model.tmdl': b"model Metrics\n",
+    'Sales.SemanticModel/definition/tables/Sales.tmdl': (
+        b"table Sales\n\n\tmeasure Ratio = [A] / [B]\n\n\tcolumn Amount\n\t\tdataType: double\n"
+    )
+}
+
+
+def test_text_format():
+    registry = Registry()
+    requests = Counter('requests_total', 'Requests', ['route'], registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0), registry=registry)
+    requests.inc('/a')
+    requests.inc('/a', amount=2)
+    latency.observe(0.05, '/a')
+    latency.observe(0.5, '/a')
+    latency.observe(5, '/a')
+    
+    lines = registry.render().splitlines()
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{route="/a"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_drain_and_merge():
+    """A worker's registry is drained into the parent's, each value once"""
+    worker, parent = Registry(), Registry()
+    (worker_parsed, worker_phases), (parent_parsed, parent_phases) = [
+        (Counter('parsed_total', 'Parsed', registry=registry),
+         Histogram('phase_seconds', 'Phases', ['phase'], registry=registry))
+        for registry in (worker, parent)
+    ]
+    
+    worker_parsed.inc(amount=5)
+    worker_phases.observe(0.2, 'parse')
+    parent.merge(worker.drain())
+    assert worker.drain() == {}
+    worker_parsed.inc()
+    parent.merge(worker.drain())
+    
+    assert parent_parsed.value() == 6
+    assert parent_phases.count('parse') == 1
+
+def test_metrics_endpoint():
+    client = web_interface.app.test_client()
+    files = [(io.BytesIO(content), path) for path, content in MODEL_FILES.items()]
+    job = client.post('/analyze', data={'files': files}, content_type='multipart/form-data').get_json()
+    client.get(job['events_url']).get_data()  # Read the stream to the end of the analysis
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    for phase in ('upload_save', 'model_discovery', 'parse', 'rule_check', 'summary', 'serialization'):
+        assert f'tmdl_analysis_phase_seconds_count{{phase="{phase}"}}' in text
+    assert 'tmdl_http_requests_total{route="/analyze",method="POST",status="202"}' in text
+    assert 'tmdl_http_request_duration_seconds_bucket{route="/jobs/<job_id>/events",le="+Inf"}' in text
+    assert 'tmdl_objects_parsed_total{collection="measures"}' in text
+    assert 'tmdl_violations_found_total{severity="ERROR"}' in text
+    assert 'tmdl_cache_hit_ratio{cache="result"}' in text
+
+
+if __name__ == "__main__":
+    test_text_format()
+    test_drain_and_merge()
+    test_metrics_endpoint()
+    print("Metrics: PASS")
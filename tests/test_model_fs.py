@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Test parsing models from folders, archives and in-memory files"""
+
+import io
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+
+from model_fs import DirectoryFS, MemoryFS, TarFS, ZipFS, find_model_root, normalize_path
+from model_helpers import write_model
+from tmdl_analyzer import ParseCache, ParseProjection, TMDLParser
+
+MODEL_FILES = {
+    'Sales.SemanticModel/definition/model.tmdl': "model Model\n\tculture: en-US\n",
+    'Sales.SemanticModel/definition/tables/Sales.tmdl': (
+        "table Sales\n\n"
+        "\tmeasure Revenue = SUM(Sales[Amount])\n\n"
+        "\tcolumn Amount\n\t\tdataType: double\n\t\tsourceColumn: Amount\n"
+    ),
+    'Sales.SemanticModel/definition/relationships.tmdl': (
+        "relationship r1\n\tfromColumn: Sales.CustomerKey\n\ttoColumn: Customer.CustomerKey\n"
+    ),
+    'Sales.SemanticModel/.pbi/cache.abf': "not a TMDL file"
+}
+
+
+def counts(objects):
+    """Number of parsed objects per non-empty collection"""
+    return {name: len(items) for name, items in objects.items() if items}
+
+
+def zip_bytes(files=MODEL_FILES) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for path, content in files.items():
+            archive.writestr(path, content)
+    return buffer.getvalue()
+
+
+def tar_bytes() -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for path, content in MODEL_FILES.items():
+            data = content.encode('utf-8')
+            info = tarfile.TarInfo(path)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_all_backends_parse_the_same_model():
+    """Directory, zip, tar, tar stream and memory backends yield the same objects"""
+    parser = TMDLParser()
+    expected = {'model': 1, 'tables': 1, 'columns': 1, 'data_columns': 1, 'measures': 1, 'relationships': 1}
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write_model(temp_dir, MODEL_FILES)
+        assert counts(parser.parse_model(DirectoryFS(temp_dir))) == expected
+        assert counts(parser.parse_model_directory(str(Path(temp_dir) / 'Sales.SemanticModel'))) == expected
+    
+    file_systems = [
+        MemoryFS(MODEL_FILES),
+        ZipFS(zip_bytes(), name='model.zip'),
+        TarFS(tar_bytes(), name='model.tar.gz'),
+        TarFS(io.BytesIO(tar_bytes()), name='<stdin>', stream=True, include=lambda path: path.endswith('.tmdl'))
+    ]
+    for fs in file_systems:
+        with fs:
+            assert find_model_root(fs) == 'Sales.SemanticModel'
+            objects = parser.parse_model(fs, 'Sales.SemanticModel')
+            assert counts(objects) == expected
+            assert objects['measures'][0].expression == 'SUM(Sales[Amount])'
+    
+    zip_objects = parser.parse_model(ZipFS(zip_bytes(), name='model.zip'))
+    assert zip_objects['tables'][0].file_path == 'model.zip/Sales.SemanticModel/definition/tables/Sales.tmdl'
+
+
+def test_pbip_archive_parses_the_semantic_model():
+    """A PBIP project's .Report folder also has a definition folder; the model's is parsed"""
+    files = dict(MODEL_FILES)
+    files['Sales.Report/definition/report.json'] = "{}"
+    files['Sales.Report/definition/pages/Overview/page.json'] = "{}"
+    parser = TMDLParser()
+    
+    with ZipFS(zip_bytes(files), name='Sales.zip') as fs:
+        assert find_model_root(fs) == 'Sales.SemanticModel'
+        assert find_model_root(fs, 'Sales.Report') == 'Sales.Report'
+        objects = parser.parse_model(fs)
+        assert objects['tables'][0].file_path == 'Sales.zip/Sales.SemanticModel/definition/tables/Sales.tmdl'
+        assert len(objects['measures']) == 1 and len(objects['relationships']) == 1
+
+
+def test_memory_fs_layout():
+    """Directories are implied by file paths; paths can't escape the root"""
+    fs = MemoryFS({'a\\b\\c.tmdl': 'x', './a/d.tmdl': 'y'})
+    assert sorted(fs.listdir('a')) == ['b', 'd.tmdl']
+    assert fs.isdir('a/b') and fs.isfile('a/b/c.tmdl')
+    assert fs.read_text('a/d.tmdl') == 'y' and fs.size('a/b/c.tmdl') == 1
+    
+    try:
+        normalize_path('../etc/passwd')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_parse_cache_reuses_files_with_known_digests():
+    """Files whose digest the file system knows are parsed once per projection"""
+    cache = ParseCache()
+    parser = TMDLParser(parse_cache=cache)
+    fs = MemoryFS(name='upload')
+    for index, (path, content) in enumerate(MODEL_FILES.items()):
+        fs.add_file(path, content, digest=f"{index:064x}")
+    
+    first = parser.parse_model(fs, 'Sales.SemanticModel')
+    misses = cache.misses
+    second = parser.parse_model(fs, 'Sales.SemanticModel')
+    assert cache.misses == misses and cache.hits == misses
+    assert second['tables'][0] is first['tables'][0]
+    assert counts(second) == counts(first)
+    
+    projection = ParseProjection({'tables': set(), 'measures': {'expression'}})
+    projected = parser.parse_model(fs, 'Sales.SemanticModel', projection)
+    assert projected['tables'][0] is not first['tables'][0]
+    assert projected['columns'] == []
+
+
+if __name__ == "__main__":
+    test_all_backends_parse_the_same_model()
+    test_pbip_archive_parses_the_semantic_model()
+    test_memory_fs_layout()
+    test_parse_cache_reuses_files_with_known_digests()
+    print("Model file systems: PASS")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Test that the parser builds the typed model graph and rules resolve scopes by index"""
+
+import tempfile
+
+from model_helpers import RULES_FILE, write_model
+from tmdl_analyzer import BestPracticesChecker, TMDLParser
+
+SALES_TMDL = """table Sales
+
+	/// Revenue over cost
+	measure Margin = [Revenue] / [Cost]
+		formatString: 0.00%
+
+		kpi
+			targetExpression = 0.3
+			statusExpression = IF([Margin] > 0.3, 1, -1)
+
+	measure 'Net ''Sales''' =
+			VAR total = SUM(Sales[Amount])
+			RETURN
+				total
+		isHidden
+
+	column Amount
+		dataType: double
+		sourceColumn: Amount
+
+	column 'Amount x2' = [Amount] * 2
+		dataType: double
+
+	hierarchy Calendar
+		level Year
+			column: Year
+		level Month
+			column: Month
+
+	partition Sales = m
+		mode: import
+		source =
+				let
+				    Source = Sql.Database("server", "db")
+				in
+				    Source
+"""
+
+CALC_TMDL = """table Calc
+
+	column Value
+		dataType: int64
+		sourceColumn: [Value]
+
+	partition Calc = calculated
+		mode: import
+		source = GENERATESERIES(1, 10)
+"""
+
+TIME_TMDL = """table 'Time Intelligence'
+
+	calculationGroup
+		precedence: 2
+
+		calculationItem YTD = CALCULATE(SELECTEDMEASURE(), DATESYTD('Date'[Date]))
+
+		calculationItem Ratio =
+				IFERROR(SELECTEDMEASURE() / 2, 0)
+			formatStringDefinition = "0.00"
+
+	column Name
+		dataType: string
+		sourceColumn: Name
+"""
+
+ROLE_TMDL = """role Reader
+	modelPermission: read
+
+	member user@contoso.com
+
+	tablePermission Sales = [Region] = "West"
+"""
+
+RELATIONSHIPS_TMDL = """relationship 7d1c
+	fromColumn: Sales.'Customer Key'
+	toColumn: 'Customer Table'.'Customer Key'
+	isActive: false
+"""
+
+
+# A small model's definition folder
+MODEL_FILES = {
+    'definition/model.tmdl': "model Model\n\tculture: en-US\n",
+    'definition/relationships.tmdl': RELATIONSHIPS_TMDL,
+    'definition/roles/Reader.tmdl': ROLE_TMDL,
+    'definition/tables/Sales.tmdl': SALES_TMDL,
+    'definition/tables/Calc.tmdl': CALC_TMDL,
+    'definition/tables/Time Intelligence.tmdl': TIME_TMDL
+}
+
+
+def test_model_graph():
+    """Every object type lands in its own collection with a link to its parent"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        objects = TMDLParser().parse_model_directory(str(write_model(temp_dir, MODEL_FILES)))
+    
+    assert objects['model'][0].culture == 'en-US'
+    sales = next(t for t in objects['tables'] if t.name == 'Sales')
+    
+    margin, net_sales = sales.measures
+    assert net_sales.name == "Net 'Sales'"
+    assert net_sales.expression == "VAR total = SUM(Sales[Amount])\nRETURN\n\ttotal"
+    assert net_sales.is_hidden
+    assert margin.kpi is objects['kpis'][0] and margin.kpi.parent is margin
+    assert margin.kpi.status_expression == 'IF([Margin] > 0.3, 1, -1)'
+    
+    assert sorted(c.name for c in objects['data_columns']) == ['Amount', 'Name']
+    assert [c.name for c in objects['calculated_columns']] == ['Amount x2']
+    assert [c.name for c in objects['calculated_table_columns']] == ['Value']
+    assert [t.name for t in objects['calculated_tables']] == ['Calc']
+    assert objects['calculated_tables'][0].expression == 'GENERATESERIES(1, 10)'
+    
+    assert [level.column for level in objects['levels']] == ['Year', 'Month']
+    assert objects['levels'][0].parent is objects['hierarchies'][0]
+    
+    partition = next(p for p in objects['partitions'] if p.table_name == 'Sales')
+    assert partition.source_type == 'm' and partition.mode == 'import'
+    start, end = partition.query_span
+    assert SALES_TMDL[start:end].strip().startswith('let')
+    assert partition.query.startswith('let\n    Source = Sql.Database')
+    
+    group = objects['calculation_groups'][0]
+    assert group.precedence == 2 and group.parent.name == 'Time Intelligence'
+    assert [item.name for item in group.calculation_items] == ['YTD', 'Ratio']
+    assert objects['calculation_items'][1].expression == 'IFERROR(SELECTEDMEASURE() / 2, 0)'
+    assert objects['calculation_items'][1].format_string_expression == '"0.00"'
+    
+    role = objects['roles'][0]
+    assert role.model_permission == 'read' and role.members == ['user@contoso.com']
+    assert objects['table_permissions'][0].expression == '[Region] = "West"'
+    assert objects['table_permissions'][0].parent is role
+    
+    relationship = objects['relationships'][0]
+    assert (relationship.from_table, relationship.from_column) == ('Sales', 'Customer Key')
+    assert (relationship.to_table, relationship.to_column) == ('Customer Table', 'Customer Key')
+    assert not relationship.is_active
+
+
+def test_scope_lookup():
+    """Rule scopes resolve to their collections instead of matching names"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        objects = TMDLParser().parse_model_directory(str(write_model(temp_dir, MODEL_FILES)))
+    
+    checker = BestPracticesChecker(RULES_FILE)
+    scoped = checker._get_objects_by_scope('Measure, CalculatedColumn', objects)
+    assert sorted(o.name for o in scoped) == ['Amount x2', 'Margin', "Net 'Sales'"]
+    assert checker._get_objects_by_scope('CalculatedTable', objects) == objects['calculated_tables']
+    
+    violations = checker.check_objects(objects)
+    iferror = [v.object_name for v in violations.filter(rule_id='AVOID_USING_THE_IFERROR_FUNCTION')]
+    assert iferror == []
+    divide = [(v.object_type, v.object_name) for v in violations.filter(rule_id='USE_THE_DIVIDE_FUNCTION_FOR_DIVISION')]
+    assert ('Measure', 'Margin') in divide
+    
+    # Projections include the containing collection of nested scopes
+    projection = checker.projection_for([r for r in checker.rules if r.id == 'DAX_COLUMNS_FULLY_QUALIFIED'])
+    assert projection.wants('kpis') and projection.wants('measures')
+    assert projection.wants('table_permissions') and projection.wants('roles')
+    assert projection.wants_property('calculation_groups', 'expression')
+    assert not projection.wants('columns')
+
+
+if __name__ == "__main__":
+    test_model_graph()
+    test_scope_lookup()
+    print("Model graph: PASS")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Test the per-client token buckets and the 429 responses of /analyze"""
+
+import io
+import time
+
+import web_interface
+from rate_limit import RateLimiter
+
+
+def test_token_bucket():
+    """A client may send a burst, then one request per refill; clients don't share buckets"""
+    limiter = RateLimiter(rate=10.0, burst=2)
+    assert limiter.acquire('a') == 0 and limiter.acquire('a') == 0
+    wait = limiter.acquire('a')
+    assert 0 < wait <= 0.1
+    assert limiter.acquire('b') == 0
+    
+    time.sleep(wait + 0.01)
+    assert limiter.acquire('a') == 0
+    assert limiter.admit('a') == 1  # Retry-After is in whole seconds, at least 1
+
+
+def test_idle_clients_are_pruned():
+    limiter = RateLimiter(rate=1000.0, burst=1, max_clients=2)
+    limiter.acquire('a')
+    limiter.acquire('b')
+    time.sleep(0.01)
+    limiter.acquire('c')
+    assert len(limiter) == 1
+
+
+def test_client_table_is_bounded():
+    """A flood of distinct clients within the refill window evicts the least recently seen"""
+    limiter = RateLimiter.per_minute(1, burst=1, max_clients=100)
+    limiter.acquire('regular')
+    for index in range(5000):
+        limiter.acquire(f'10.0.{index // 256}.{index % 256}')
+        if index == 50:
+            assert limiter.acquire('regular') > 0  # Seen again, so kept; still limited
+    assert len(limiter) == 100
+    assert limiter.acquire('10.0.19.135') > 0  # Among the most recent: still limited
+    assert limiter.acquire('10.0.0.0') == 0  # Evicted: starts over with a full bucket
+
+
+def test_analyze_is_rate_limited():
+    """Requests over the limit get 429 with Retry-After before the upload is read"""
+    previous = web_interface.rate_limiter
+    web_interface.rate_limiter = RateLimiter.per_minute(1, burst=1)
+    try:
+        client = web_interface.app.test_client()
+        data = {'files': [(io.BytesIO(b"model Model\n"), 'Empty.SemanticModel/model.tmdl')]}
+        assert client.post('/analyze', data=data, content_type='multipart/form-data').status_code == 400
+        
+        data = {'files': [(io.BytesIO(b"model Model\n"), 'Empty.SemanticModel/model.tmdl')]}
+        response = client.post('/analyze', data=data, content_type='multipart/form-data')
+        assert response.status_code == 429
+        assert 1 <= int(response.headers['Retry-After']) <= 60
+        
+        # Other clients have their own bucket
+        data = {'files': [(io.BytesIO(b"model Model\n"), 'Empty.SemanticModel/model.tmdl')]}
+        response = client.post('/analyze', data=data, content_type='multipart/form-data',
+                               environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        assert response.status_code == 400
+    finally:
+        web_interface.rate_limiter = previous
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_idle_clients_are_pruned()
+    test_client_table_is_bounded()
+    test_analyze_is_rate_limited()
+    print("Rate limit: PASS")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Test the byte-size bounded result cache and its rendered artifacts"""
+
+from result_cache import ResultCache, content_key
+
+
+def test_lru_eviction_by_size():
+    """The least recently used results are dropped once the byte budget is exceeded"""
+    cache = ResultCache(max_bytes=100)
+    first = cache.put({'data': 'a' * 30})
+    second = cache.put({'data': 'b' * 30})
+    assert cache.get(first) is not None  # first is now the most recently used
+    third = cache.put({'data': 'c' * 30})
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+    assert cache.total_bytes <= 100
+    assert cache.put({'data': 'x' * 200}) is None
+
+
+def test_artifacts_render_once():
+    """Artifacts are rendered on first use, counted in the cache size and reused"""
+    cache = ResultCache(max_bytes=1000)
+    result_id = cache.put({'violations': [1, 2, 3]})
+    size = cache.total_bytes
+    calls = []
+    
+    def render(result):
+        calls.append(result)
+        return b"# Report\n" + str(len(result['violations'])).encode()
+    
+    assert cache.artifact(result_id, 'md', render) == b"# Report\n3"
+    assert cache.artifact(result_id, 'md', render) == b"# Report\n3"
+    assert len(calls) == 1
+    assert cache.total_bytes == size + len(b"# Report\n3")
+    assert cache.artifact('missing', 'md', render) is None
+
+
+def test_content_key():
+    """Keys depend on file contents, paths and settings, not on the order files arrived in"""
+    files = {'definition/model.tmdl': 'aa', 'definition/tables/Sales.tmdl': 'bb'}
+    key = content_key(files, rules='v1')
+    assert key == content_key(dict(reversed(list(files.items()))), rules='v1')
+    assert key != content_key(files, rules='v2')
+    assert key != content_key({'definition/model.tmdl': 'aa', 'definition/tables/Other.tmdl': 'bb'}, rules='v1')
+
+
+if __name__ == "__main__":
+    test_lru_eviction_by_size()
+    test_artifacts_render_once()
+    test_content_key()
+    print("Result cache: PASS")
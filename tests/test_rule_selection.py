@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Test rule selection and projection pushdown into the parser"""
+
+import tempfile
+
+from model_helpers import RULES_FILE, write_model
+from tmdl_analyzer import BestPracticesChecker, TMDLBestPracticesAgent, TMDLParser
+
+TABLE_TMDL = """table Sales
+
+	measure Ratio = [A] / [B]
+		formatString: 0.00
+
+	column Amount
+		dataType: double
+		sourceColumn: Amount
+"""
+
+RELATIONSHIPS_TMDL = """relationship r1
+	fromColumn: Sales.Amount
+	toColumn: Other.Amount
+"""
+
+
+# A minimal model definition folder
+MODEL_FILES = {'definition/tables/Sales.tmdl': TABLE_TMDL, 'definition/relationships.tmdl': RELATIONSHIPS_TMDL}
+
+
+def test_select_rules():
+    """Rules can be selected by ID or by category"""
+    checker = BestPracticesChecker(RULES_FILE)
+    assert [r.id for r in checker.select_rules(['AVOID_FLOATING_POINT_DATA_TYPES'])] == ['AVOID_FLOATING_POINT_DATA_TYPES']
+    assert all(r.category == 'Performance' for r in checker.select_rules(categories=['performance']))
+    assert len(checker.select_rules()) == len(checker.rules)
+    
+    try:
+        checker.select_rules(['NOT_A_RULE'])
+        assert False, "Unknown rule IDs should be rejected"
+    except ValueError:
+        pass
+
+
+def test_column_only_projection():
+    """A column-only rule set should not parse measures or relationships"""
+    checker = BestPracticesChecker(RULES_FILE)
+    projection = checker.projection_for(checker.select_rules(['AVOID_FLOATING_POINT_DATA_TYPES']))
+    assert projection.wants('columns')
+    assert not projection.wants('measures')
+    assert not projection.wants('relationships')
+    
+    with tempfile.TemporaryDirectory() as root:
+        write_model(root, MODEL_FILES)
+        parser = TMDLParser()
+        
+        projected = parser.parse_model_directory(root, projection)
+        assert projected['measures'] == []
+        assert projected['relationships'] == []
+        assert projected['columns'][0].data_type == 'double'
+        assert projected['columns'][0].source_column == ''
+        
+        full = parser.parse_model_directory(root)
+        assert len(full['measures']) == 1
+        assert len(full['relationships']) == 1
+        assert full['columns'][0].source_column == 'Amount'
+
+
+def test_skipped_collections_are_not_counted():
+    """Collections a rule selection didn't parse are left out of the counts, not reported as 0"""
+    agent = TMDLBestPracticesAgent(RULES_FILE)
+    with tempfile.TemporaryDirectory() as root:
+        write_model(root, MODEL_FILES)
+        counts = agent.analyze_model(root, rule_ids=['AVOID_FLOATING_POINT_DATA_TYPES'])['summary']['object_counts']
+        assert counts['tables'] == 1 and counts['columns'] == 1
+        assert 'measures' not in counts and 'relationships' not in counts
+        
+        report = agent.generate_report(agent.analyze_model(root, rule_ids=['AVOID_FLOATING_POINT_DATA_TYPES']))
+        assert "- Measures: not parsed" in report
+        
+        counts = agent.analyze_model(root)['summary']['object_counts']
+        assert counts['measures'] == 1 and counts['relationships'] == 1 and counts['roles'] == 0
+
+
+if __name__ == "__main__":
+    test_select_rules()
+    test_column_only_projection()
+    test_skipped_collections_are_not_counted()
+    print("Rule selection: PASS")
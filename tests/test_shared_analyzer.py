@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Test that one checker can serve concurrent analyses and reloads changed rules"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from model_helpers import RULES_FILE
+from tmdl_analyzer import BestPracticesChecker, TMDLParser
+
+TABLE_TMDL = """table Sales
+
+	measure Ratio = [A] / [B]
+
+	measure Safe = IFERROR([A] / [B], 0)
+
+	column Amount
+		dataType: double
+"""
+
+
+def write_rules(path: Path, rules, mtime_ns: int) -> None:
+    path.write_text(json.dumps(rules), encoding='utf-8')
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_rules_reload_when_file_changes():
+    """Rules are re-read only after the file changes; a broken file keeps the old rules"""
+    all_rules = json.loads(Path(RULES_FILE).read_text(encoding='utf-8'))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rules_file = Path(temp_dir) / 'rules.json'
+        write_rules(rules_file, all_rules[:2], 1_000_000_000)
+        checker = BestPracticesChecker(str(rules_file))
+        assert len(checker.rules) == 2
+        assert not checker.reload_if_changed()
+        
+        write_rules(rules_file, all_rules[:3], 2_000_000_000)
+        assert checker.reload_if_changed()
+        assert [rule.id for rule in checker.rules] == [rule['ID'] for rule in all_rules[:3]]
+        
+        rules_file.write_text('[{"ID": ', encoding='utf-8')
+        os.utime(rules_file, ns=(3_000_000_000, 3_000_000_000))
+        assert not checker.reload_if_changed()
+        assert len(checker.rules) == 3
+
+
+def test_concurrent_checks_match_serial_check():
+    """Analyses sharing a checker get the same violations as one run alone"""
+    checker = BestPracticesChecker(RULES_FILE)
+    objects = {'tables': [], 'measures': [], 'columns': []}
+    table = TMDLParser().parse_table_content(TABLE_TMDL, 'Sales.tmdl')
+    objects['tables'].append(table)
+    objects['measures'].extend(table.measures)
+    objects['columns'].extend(table.columns)
+    
+    def violation_keys(_):
+        return sorted((v.rule_id, v.object_name) for v in checker.check_objects(objects))
+    
+    expected = violation_keys(None)
+    assert ('USE_THE_DIVIDE_FUNCTION_FOR_DIVISION', 'Ratio') in expected
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(violation_keys, range(32)))
+    assert all(result == expected for result in results)
+
+
+if __name__ == "__main__":
+    test_rules_reload_when_file_changes()
+    test_concurrent_checks_match_serial_check()
+    print("Shared analyzer: PASS")
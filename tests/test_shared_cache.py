@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Test the SQLite cache shared by web workers and command line runs"""
+
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from model_fs import DirectoryFS, MemoryFS
+from model_helpers import write_model
+from result_cache import ResultCache
+from shared_cache import SharedCache
+from tmdl_analyzer import PARSER_VERSION, ParseCache, TMDLParser, decode_parsed, encode_parsed
+
+MODEL_FILES = {
+    'Sales.SemanticModel/definition/model.tmdl': "model Model\n",
+    'Sales.SemanticModel/definition/tables/Sales.tmdl': (
+        "table Sales\n\n\tmeasure Revenue = SUM(Sales[Amount])\n\n\tcolumn Amount\n\t\tdataType: double\n"
+    )
+}
+
+
+def test_values_are_evicted_least_recently_read_first():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SharedCache(Path(temp_dir) / 'cache.db', max_bytes=300, touch_interval=0)
+        cache.put('test', 'a', b'a' * 100)
+        cache.put('test', 'b', b'b' * 100)
+        cache.put('test', 'a', b'A' * 120)
+        assert cache.total_bytes() == 220
+        
+        # Reading 'b' makes 'a' the least recently read entry
+        assert cache.get('test', 'b') == b'b' * 100
+        cache.put('test', 'c', b'c' * 100)
+        assert cache.get('test', 'a') is None and cache.get('test', 'b') == b'b' * 100
+        assert cache.total_bytes() == 200 and len(cache) == 2
+        assert not cache.put('test', 'big', b'x' * 301)
+        
+        # Another connection to the same file sees the entries
+        assert SharedCache(cache.path).get('test', 'c') == b'c' * 100
+
+
+def test_concurrent_writers():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SharedCache(Path(temp_dir) / 'cache.db', max_bytes=50 * 1000)
+        
+        def write(index):
+            return cache.put('test', str(index), bytes(1000))
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert all(pool.map(write, range(200)))
+        assert len(cache) == 50 and cache.total_bytes() == 50 * 1000
+
+
+def test_parses_are_shared_across_paths():
+    """A file parsed from disk is reused for the same content uploaded elsewhere"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write_model(temp_dir, MODEL_FILES)
+        shared = SharedCache(Path(temp_dir) / 'cache.db')
+        
+        on_disk = TMDLParser(parse_cache=ParseCache(shared=shared)).parse_model(DirectoryFS(temp_dir), 'Sales.SemanticModel')
+        upload_cache = ParseCache(shared=shared)
+        uploaded = TMDLParser(parse_cache=upload_cache).parse_model(MemoryFS(MODEL_FILES, name='upload'),
+                                                                   'Sales.SemanticModel')
+        assert upload_cache.misses == 0 and upload_cache.hits >= 2
+        
+        measure = uploaded['measures'][0]
+        assert measure.expression == on_disk['measures'][0].expression
+        assert measure.file_path == 'upload/Sales.SemanticModel/definition/tables/Sales.tmdl'
+        assert uploaded['tables'][0].file_path == measure.file_path
+        assert measure.parent is uploaded['tables'][0]
+
+
+def test_parses_are_stored_as_versioned_data():
+    """Shared parses are JSON under the parser version; other entries are not loaded"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shared = SharedCache(Path(temp_dir) / 'cache.db')
+        parsed = TMDLParser(parse_cache=ParseCache(shared=shared)).parse_model(MemoryFS(MODEL_FILES), 'Sales.SemanticModel')
+        table = parsed['tables'][0]
+        copy = decode_parsed(encode_parsed(table))
+        assert copy == table and copy.columns[0].parent is copy and copy.measures[0].parent is copy
+        
+        keys = [row[0] for row in shared._connection().execute("SELECT key FROM entries WHERE namespace = 'parse'")]
+        assert keys and all(key.startswith(f"v{PARSER_VERSION}:") for key in keys)
+        
+        # Entries that aren't data this parser wrote are treated as misses
+        for key in keys:
+            shared.put('parse', key, b'\x80\x04not json')
+        cache = ParseCache(shared=shared)
+        reparsed = TMDLParser(parse_cache=cache).parse_model(MemoryFS(MODEL_FILES), 'Sales.SemanticModel')
+        assert cache.hits == 0 and reparsed['measures'][0].expression == parsed['measures'][0].expression
+
+
+def test_results_are_shared_between_caches():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shared = SharedCache(Path(temp_dir) / 'cache.db')
+        result_id = ResultCache(shared=shared).put({'violations': [], 'model_path': 'm'}, 'key')
+        other = ResultCache(shared=shared)
+        assert other.get(result_id) == {'violations': [], 'model_path': 'm'}
+        assert other.artifact(result_id, 'md', lambda result: result['model_path'].encode()) == b'm'
+        assert other.get('missing') is None
+
+
+if __name__ == "__main__":
+    test_values_are_evicted_least_recently_read_first()
+    test_concurrent_writers()
+    test_parses_are_shared_across_paths()
+    test_parses_are_stored_as_versioned_data()
+    test_results_are_shared_between_caches()
+    print("Shared cache: PASS")
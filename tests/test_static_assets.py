@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Test that the page links versioned static assets that browsers can cache"""
+
+import gzip
+import re
+
+import web_interface
+
+
+def test_index_links_versioned_assets():
+    """The page is pre-rendered and revalidated by ETag"""
+    client = web_interface.app.test_client()
+    page = client.get('/')
+    assert page.status_code == 200 and page.cache_control.no_cache
+    html = page.get_data(as_text=True)
+    assert '<style>' not in html and '<script>' not in html
+    assert re.search(r'href="/static/app\.css\?v=[0-9a-f]{16}"', html)
+    assert re.search(r'src="/static/app\.js\?v=[0-9a-f]{16}"', html)
+    
+    etag = page.headers['ETag']
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_assets_are_cached_and_compressed():
+    """Versioned URLs are immutable; the content hash is the ETag"""
+    client = web_interface.app.test_client()
+    url = web_interface.assets.url('app.js')
+    script = client.get(url)
+    assert script.status_code == 200 and script.mimetype == 'application/javascript'
+    assert script.cache_control.immutable and script.cache_control.max_age == web_interface.app.config['STATIC_MAX_AGE']
+    assert b'function showViolations' in script.data
+    assert client.get(url, headers={'If-None-Match': script.headers['ETag']}).status_code == 304
+    
+    # An outdated version is served, but must be revalidated
+    stale = client.get('/static/app.js?v=0')
+    assert stale.cache_control.no_cache and not stale.cache_control.immutable
+    
+    style = client.get(web_interface.assets.url('app.css'), headers={'Accept-Encoding': 'gzip'})
+    assert style.mimetype == 'text/css' and style.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(style.data) == web_interface.assets.get('app.css').data
+    assert client.get('/static/missing.js').status_code == 404
+
+
+if __name__ == "__main__":
+    test_index_links_versioned_assets()
+    test_assets_are_cached_and_compressed()
+    print("Static assets: PASS")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Test that the single-pass summary accumulator matches the violation list"""
+
+from model_helpers import RULES_FILE, column, measure, model_objects
+from tmdl_analyzer import TMDLBestPracticesAgent
+
+
+def test_summary_accumulator():
+    """The accumulated summary should agree with a plain count of the violations"""
+    agent = TMDLBestPracticesAgent(RULES_FILE)
+    # A small model with known violations
+    objects = model_objects(
+        measures=[measure('Ratio', '[A] / [B]', file_path='tables/Sales.tmdl'),
+                  measure('Safe', 'IFERROR([A], 0)', format_string='0', file_path='tables/Sales.tmdl')],
+        columns=[column('Amount', 'double', file_path='tables/Sales.tmdl'),
+                 column('Price', 'double', table='Product', file_path='tables/Product.tmdl')]
+    )
+    
+    from tmdl_analyzer import SummaryAccumulator
+    accumulator = SummaryAccumulator(agent.checker.rules)
+    violations = agent.checker.check_objects(objects, accumulator)
+    summary = agent._generate_summary(objects, violations, accumulator)
+    
+    # Same result when the summary is rebuilt from the violation list alone
+    assert summary == agent._generate_summary(objects, violations)
+    
+    counts = summary['violations']
+    assert counts['total'] == len(violations)
+    assert sum(counts['by_severity'].values()) == len(violations)
+    assert sum(counts['by_category'].values()) == len(violations)
+    assert counts['by_table'] == {'Sales': 4, 'Product': 1}
+    assert counts['by_file'] == {'tables/Sales.tmdl': 4, 'tables/Product.tmdl': 1}
+    assert counts['by_rule_object_type']['AVOID_FLOATING_POINT_DATA_TYPES'] == {'Column': 2}
+    assert counts['by_rule']['AVOID_FLOATING_POINT_DATA_TYPES']['count'] == 2
+    
+    rules_checked = summary['rules_checked']
+    assert rules_checked['rules_with_violations'] == len(counts['by_rule'])
+    assert rules_checked['rules_with_violations'] + rules_checked['rules_without_violations'] == rules_checked['total']
+    print("Summary accumulator: PASS")
+
+
+if __name__ == "__main__":
+    test_summary_accumulator()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Test filtering and paging violation records through the violation index"""
+
+from violation_query import ViolationIndex, denormalize_violations, normalize_violations
+
+
+def record(rule_id, severity, category, table, name):
+    return {
+        'rule_id': rule_id, 'rule_name': rule_id.replace('_', ' ').title(), 'category': category,
+        'severity': severity, 'object_name': name, 'object_type': 'Measure', 'table_name': table,
+        'file_path': f"definition/tables/{table}.tmdl"
+    }
+
+
+RECORDS = [
+    record('USE_DIVIDE', 'WARNING', 'DAX Expressions', 'Sales', 'Margin %'),
+    record('USE_DIVIDE', 'WARNING', 'DAX Expressions', 'Budget', 'Variance %'),
+    record('FLOAT_TYPES', 'ERROR', 'Performance', 'Sales', 'Amount'),
+    record('FORMAT_STRING', 'INFO', 'Formatting', 'Sales', 'Revenue'),
+    record('FLOAT_TYPES', 'ERROR', 'Performance', 'Budget', 'Target')
+]
+
+
+def test_filters_combine():
+    """Filters match case-insensitively, combine with AND and keep the result order"""
+    index = ViolationIndex(RECORDS)
+    total, page = index.query({'table': 'sales'})
+    assert total == 3 and [v['object_name'] for v in page] == ['Margin %', 'Amount', 'Revenue']
+    total, page = index.query({'table': 'Budget', 'severity': 'error'})
+    assert total == 1 and page[0]['object_name'] == 'Target'
+    assert index.query({'rule': 'NOT_A_RULE'}) == (0, [])
+    assert index.query({'unknown': 'x'})[0] == len(RECORDS)
+
+
+def test_search_and_paging():
+    """Free text searches names and files; offset and limit page the matches"""
+    index = ViolationIndex(RECORDS)
+    total, page = index.query(q='%')
+    assert total == 2 and {v['object_name'] for v in page} == {'Margin %', 'Variance %'}
+    total, page = index.query(q='budget.tmdl')
+    assert total == 2
+    total, page = index.query(offset=1, limit=2)
+    assert total == len(RECORDS) and page == RECORDS[1:3]
+
+
+def test_normalized_table_round_trip():
+    """Rule fields are stored once per rule and restored for every row"""
+    records = [dict(record, description='Long rule description', fix_suggestion=None,
+                    ai_explanation='', ai_enhanced=False) for record in RECORDS]
+    table = normalize_violations(records)
+    assert len(table['rules']) == 3 and len(table['rows']) == len(records)
+    assert table['rows'][1][0] == table['rows'][0][0]
+    assert denormalize_violations(table) == records
+
+
+if __name__ == "__main__":
+    test_filters_combine()
+    test_search_and_paging()
+    test_normalized_table_round_trip()
+    print("Violation queries: PASS")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Test the columnar, rule-normalized violation store"""
+
+from tmdl_analyzer import (BestPracticeRule, Severity, TMDLColumn, TMDLMeasure,
+                           Violation, ViolationStore)
+
+
+def build_store():
+    """Build a store with two rules and three violations"""
+    store = ViolationStore()
+    floating = store.add_rule(BestPracticeRule(
+        id='AVOID_FLOATING_POINT_DATA_TYPES', name='Floating point', category='Performance',
+        description='Avoid Double', severity=2, scope='DataColumn', expression='', fix_expression='Decimal'))
+    iferror = store.add_rule(BestPracticeRule(
+        id='AVOID_USING_THE_IFERROR_FUNCTION', name='IFERROR', category='DAX Expressions',
+        description='Avoid IFERROR', severity=3, scope='Measure', expression=''))
+    
+    amount = TMDLColumn(name='Amount', object_type='Column', file_path='Sales.tmdl', table_name='Sales')
+    price = TMDLColumn(name='Price', object_type='Column', file_path='Product.tmdl', table_name='Product')
+    safe = TMDLMeasure(name='Safe', object_type='Measure', file_path='Sales.tmdl', table_name='Sales')
+    
+    store.add(floating, amount)
+    store.add(iferror, safe)
+    store.add(floating, price)
+    return store
+
+
+def test_list_access():
+    """The store should behave like a list of Violation objects"""
+    store = build_store()
+    
+    assert len(store) == 3
+    assert len(store.rules) == 2
+    assert isinstance(store[0], Violation)
+    assert store[0].description == 'Avoid Double'
+    assert store[-1].object_name == 'Price'
+    assert [v.object_name for v in store[:2]] == ['Amount', 'Safe']
+    assert [v.severity for v in store] == [Severity.WARNING, Severity.ERROR, Severity.WARNING]
+
+
+def test_group_and_filter():
+    """Grouping and filtering should return subsets sharing the rule table"""
+    store = build_store()
+    
+    groups = store.group_by_rule()
+    assert list(groups) == ['AVOID_FLOATING_POINT_DATA_TYPES', 'AVOID_USING_THE_IFERROR_FUNCTION']
+    assert len(groups['AVOID_FLOATING_POINT_DATA_TYPES']) == 2
+    assert groups['AVOID_FLOATING_POINT_DATA_TYPES'].rules is store.rules
+    
+    assert [v.object_name for v in store.filter(severity='ERROR')] == ['Safe']
+    assert [v.object_name for v in store.filter(table='Sales')] == ['Amount', 'Safe']
+    assert len(store.filter(category='Performance', table='Product')) == 1
+    assert list(store.group_by_category()) == ['Performance', 'DAX Expressions']
+
+
+def test_rule_properties_and_records():
+    """Rule-level properties should be shared by every violation of the rule"""
+    store = build_store()
+    store.set_rule_properties('AVOID_FLOATING_POINT_DATA_TYPES', {'ai_explanation': 'Use Decimal', 'ai_enhanced': True})
+    
+    assert store[2].properties['ai_explanation'] == 'Use Decimal'
+    assert store[1].properties == {}
+    
+    records = store.to_records()
+    rebuilt = ViolationStore.from_records(records)
+    assert len(rebuilt.rules) == 2
+    assert [r['object_name'] for r in rebuilt.to_records()] == ['Amount', 'Safe', 'Price']
+    assert records[0]['ai_enhanced'] is True
+
+
+def test_rebuilt_objects_are_stored_once():
+    """An object with several violations is one entry of the object table after a round trip"""
+    store = build_store()
+    extra = store.add_rule(BestPracticeRule(
+        id='HIDE_FOREIGN_KEYS', name='Hide foreign keys', category='Formatting',
+        description='Hide keys', severity=2, scope='DataColumn', expression=''))
+    store.add(extra, store.objects[0])
+    assert len(store.objects) == 3
+    
+    rebuilt = ViolationStore.from_records(store.to_records())
+    assert len(rebuilt) == 4 and len(rebuilt.objects) == 3
+    assert [v.object_name for v in rebuilt] == ['Amount', 'Safe', 'Price', 'Amount']
+    
+    # Same name in another table is another object
+    rebuilt.add_violation(Violation(
+        rule_id='HIDE_FOREIGN_KEYS', rule_name='Hide foreign keys', category='Formatting',
+        severity=Severity.WARNING, description='Hide keys', object_name='Amount', object_type='Column',
+        file_path='Returns.tmdl', table_name='Returns'))
+    assert len(rebuilt.objects) == 4
+
+
+if __name__ == "__main__":
+    test_list_access()
+    test_group_and_filter()
+    test_rule_properties_and_records()
+    test_rebuilt_objects_are_stored_once()
+    print("Violation store: PASS")
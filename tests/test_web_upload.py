@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Test that /analyze builds the model in memory from uploaded TMDL parts and runs it as a job"""
+
+import gzip
+import hashlib
+import io
+import json
+
+import web_interface
+from violation_query import denormalize_violations
+from web_interface import DiscardedUpload, UploadRequest
+
+MODEL_FILES = {
+    'Sales.SemanticModel/definition/model.tmdl': b"model Model\n",
+    'Sales.SemanticModel/definition/tables/Sales.tmdl': (
+        b"table Sales\n\n\tmeasure Ratio = [A] / [B]\n\n\tcolumn Amount\n\t\tdataType: double\n"
+    ),
+    'Sales.SemanticModel/.pbi/cache.abf': b"\0" * 4096
+}
+
+
+def test_non_tmdl_parts_are_dropped():
+    """Only TMDL parts are buffered; other parts go to a counting sink"""
+    request = UploadRequest.from_values()
+    assert isinstance(request._get_file_stream(100, None, 'x/definition/model.tmdl'), io.BytesIO)
+    sink = request._get_file_stream(100, None, 'x/.pbi/cache.abf')
+    assert isinstance(sink, DiscardedUpload)
+    sink.write(b"abc")
+    sink.seek(0)
+    assert sink.size == 3 and sink.read() == b""
+
+
+def follow_job(client, response):
+    """Read a job's event stream to the end and return the event names and the job status"""
+    assert response.status_code == 202
+    job = response.get_json()
+    stream = client.get(job['events_url']).get_data(as_text=True)
+    events = [line[len('event: '):] for line in stream.splitlines() if line.startswith('event: ')]
+    return events, client.get(job['result_url']).get_json()
+
+
+def test_analyze_in_memory():
+    """The uploaded folder is analyzed without touching the disk"""
+    client = web_interface.app.test_client()
+    files = [(io.BytesIO(content), path) for path, content in MODEL_FILES.items()]
+    response = client.post('/analyze', data={'files': files}, content_type='multipart/form-data')
+    events, status = follow_job(client, response)
+    assert events[0] == 'queued' and events[-1] == 'done'
+    assert {'parsed', 'rule_checked', 'checked'} <= set(events)
+    assert status['status'] == 'done'
+    result = status['result']
+    assert result['model_path'] == 'upload/Sales.SemanticModel'
+    assert result['summary']['object_counts']['measures'] == 1
+    
+    # Only the summary is sent; violations are paged from the cached result
+    assert 'violations' not in result
+    page = client.get(result['violations_url']).get_json()
+    violations = denormalize_violations(page['violation_table'])
+    assert page['total'] == result['summary']['violations']['total'] == len(violations)
+    assert {v['rule_id'] for v in violations} >= {'USE_THE_DIVIDE_FUNCTION_FOR_DIVISION',
+                                                  'AVOID_FLOATING_POINT_DATA_TYPES'}
+    page = client.get(result['violations_url'] + '?severity=error&rule=USE_THE_DIVIDE_FUNCTION_FOR_DIVISION&limit=1').get_json()
+    assert page['limit'] == 1
+    assert all(v['object_name'] == 'Ratio' for v in denormalize_violations(page['violation_table']))
+    
+    # Responses are gzip-compressed when the client accepts it
+    compressed = client.get(result['violations_url'], headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(compressed.data)) == client.get(result['violations_url']).get_json()
+    report = client.get(result['report_url'], headers={'Accept-Encoding': 'gzip'})
+    assert report.headers['Content-Encoding'] == 'gzip' and b'# TMDL Best Practices' in gzip.decompress(report.data)
+    assert client.get('/results/missing/violations').status_code == 404
+    
+    # The report is rendered from the cached result; nothing is posted back
+    report = client.get(result['report_url'])
+    assert report.status_code == 200 and report.mimetype == 'text/markdown'
+    assert b'Model: upload/Sales.SemanticModel' in report.data
+    report_json = client.get(result['report_url'] + '?format=json').get_json()
+    assert report_json['result_id'] == result['result_id']
+    assert client.get('/generate_report/missing').status_code == 404
+
+
+def test_identical_upload_is_served_from_cache():
+    """Re-uploading the same model skips the analysis and can be revalidated by ETag"""
+    client = web_interface.app.test_client()
+    
+    def upload(files, **headers):
+        data = {'files': [(io.BytesIO(content), path) for path, content in files.items()]}
+        return client.post('/analyze', data=data, content_type='multipart/form-data', headers=headers)
+    
+    model_files = dict(MODEL_FILES)
+    model_files['Sales.SemanticModel/definition/model.tmdl'] = b"model Cached\n"
+    events, status = follow_job(client, upload(model_files))
+    result_id = status['result']['result_id']
+    
+    # Upload order doesn't change the content key
+    cached = upload(dict(reversed(list(model_files.items()))))
+    assert cached.status_code == 200
+    assert cached.headers['ETag'] == f'"{result_id}"'
+    assert cached.get_json()['result']['summary'] == status['result']['summary']
+    
+    assert upload(model_files, **{'If-None-Match': f'"{result_id}"'}).status_code == 304
+    
+    changed = dict(model_files)
+    changed['Sales.SemanticModel/definition/model.tmdl'] = b"model Changed\n"
+    events, status = follow_job(client, upload(changed, **{'If-None-Match': f'"{result_id}"'}))
+    assert status['result']['result_id'] != result_id
+
+
+def test_root_level_models_get_their_own_results():
+    """A model whose definition folder is at the root of the upload is keyed by its files too"""
+    client = web_interface.app.test_client()
+    
+    def upload(table_tmdl):
+        files = {'definition/model.tmdl': b"model Model\n", 'definition/tables/Sales.tmdl': table_tmdl}
+        data = {'files': [(io.BytesIO(content), path) for path, content in files.items()]}
+        response = client.post('/analyze', data=data, content_type='multipart/form-data')
+        assert response.status_code == 202
+        return follow_job(client, response)[1]['result']
+    
+    first = upload(b"table Sales\n\n\tmeasure Ratio = [A] / [B]\n")
+    second = upload(b"table Sales\n\n\tcolumn Amount\n\t\tdataType: double\n")
+    assert first['result_id'] != second['result_id']
+    assert first['summary']['object_counts'] != second['summary']['object_counts']
+
+
+def test_degraded_ai_results_are_not_cached():
+    """An AI analysis that ran on the regular analyzer is redone, not served from the cache"""
+    client = web_interface.app.test_client()
+    model_files = dict(MODEL_FILES)
+    model_files['Sales.SemanticModel/definition/model.tmdl'] = b"model Degraded\n"
+    
+    def upload():
+        data = {'files': [(io.BytesIO(content), path) for path, content in model_files.items()],
+                'analyzer_type': 'ai_enhanced'}
+        return client.post('/analyze', data=data, content_type='multipart/form-data')
+    
+    # Analyze in this process, where the AI analyzer is made unavailable
+    ai_available, sandbox = web_interface.AI_AVAILABLE, web_interface.app.config['ANALYSIS_SANDBOX']
+    web_interface.AI_AVAILABLE, web_interface.app.config['ANALYSIS_SANDBOX'] = False, False
+    try:
+        events, status = follow_job(client, upload())
+        result = status['result']
+        assert result['ai_unavailable_reason']
+        assert not result.get('result_id') and 'violation_table' in result
+        assert upload().status_code == 202
+    finally:
+        web_interface.AI_AVAILABLE, web_interface.app.config['ANALYSIS_SANDBOX'] = ai_available, sandbox
+
+
+def test_delta_upload_sends_only_missing_files():
+    """With a manifest, files the server already has are taken from its blob store"""
+    client = web_interface.app.test_client()
+    model_files = {path: content for path, content in MODEL_FILES.items() if path.endswith('.tmdl')}
+    model_files['Sales.SemanticModel/definition/model.tmdl'] = b"model Delta\n"
+    manifest = {path: hashlib.sha256(content).hexdigest() for path, content in model_files.items()}
+    
+    def upload(paths):
+        data = {'files': [(io.BytesIO(model_files[path]), path) for path in paths],
+                'manifest': json.dumps(manifest)}
+        return client.post('/analyze', data=data, content_type='multipart/form-data')
+    
+    def missing():
+        return client.post('/manifest', json={'files': manifest}).get_json()['missing']
+    
+    # First upload: send whatever the server is missing
+    needed = [path for path in model_files if manifest[path] in missing()]
+    follow_job(client, upload(needed))
+    assert missing() == []
+    
+    # After an edit only the changed file is missing and sent
+    model_path = 'Sales.SemanticModel/definition/model.tmdl'
+    model_files[model_path] = b"model Delta\n\tculture: en-US\n"
+    manifest[model_path] = hashlib.sha256(model_files[model_path]).hexdigest()
+    assert missing() == [manifest[model_path]]
+    events, status = follow_job(client, upload([model_path]))
+    assert status['result']['summary']['object_counts']['measures'] == 1
+    
+    # Files the server doesn't have must be sent
+    manifest['Sales.SemanticModel/definition/tables/Other.tmdl'] = 'f' * 64
+    response = upload([])
+    assert response.status_code == 409 and response.get_json()['missing'] == ['f' * 64]
+    
+    # Uploaded content must match the manifest
+    manifest[model_path] = '0' * 64
+    assert upload([model_path]).status_code == 400
+
+
+def test_oversized_non_tmdl_part_is_rejected():
+    """Large files the analyzer never reads are rejected while they are received"""
+    client = web_interface.app.test_client()
+    limit = web_interface.app.config['MAX_SKIPPED_PART_SIZE']
+    files = [(io.BytesIO(content), path) for path, content in MODEL_FILES.items()]
+    files.append((io.BytesIO(b"\0" * (limit + 1)), 'Sales.SemanticModel/.pbi/big.abf'))
+    response = client.post('/analyze', data={'files': files}, content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert b'big.abf' in response.data
+
+
+def test_unknown_job():
+    client = web_interface.app.test_client()
+    assert client.get('/jobs/missing').status_code == 404
+    assert client.get('/jobs/missing/events').status_code == 404
+
+
+if __name__ == "__main__":
+    test_non_tmdl_parts_are_dropped()
+    test_analyze_in_memory()
+    test_identical_upload_is_served_from_cache()
+    test_root_level_models_get_their_own_results()
+    test_degraded_ai_results_are_not_cached()
+    test_delta_upload_sends_only_missing_files()
+    test_oversized_non_tmdl_part_is_rejected()
+    test_unknown_job()
+    print("Web upload: PASS")